@@ -83,6 +83,38 @@ def test_strptime():
     got = datetime.datetime.strptime(string, format)
     assert expected == got
 
+def test_strftime_strptime_common_formats():
+    import time
+    dt = datetime.datetime(2004, 12, 1, 13, 2, 47, 1234)
+    for format in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S.%f', '%d/%m/%Y',
+                   '%Y%m%d %%', '%Y-%m-%d %a', '%H:%M:%S %Z%z']:
+        string = dt.strftime(format)
+        assert string == time.strftime(format.replace('%f', '001234'),
+                                       dt.timetuple())
+        assert dt.date().strftime(format) == time.strftime(
+            format.replace('%f', '000000'), dt.date().timetuple())
+    got = datetime.datetime.strptime('2004-12-1  3:2:7.5', '%Y-%m-%d %H:%M:%S.%f')
+    assert got == datetime.datetime(2004, 12, 1, 3, 2, 7, 500000)
+    with pytest.raises(ValueError) as excinfo:
+        datetime.datetime.strptime('2004-12-01 13', '%Y-%m-%d')
+    assert str(excinfo.value) == 'unconverted data remains:  13'
+    with pytest.raises(ValueError):
+        datetime.datetime.strptime('2003-02-29', '%Y-%m-%d')
+    with pytest.raises(ValueError):
+        datetime.datetime(1899, 1, 1).strftime('%Y-%m-%d')
+
+def test_add_timedelta():
+    dt = datetime.datetime(2004, 12, 31, 23, 59, 59, 999999)
+    assert dt + datetime.timedelta(microseconds=1) == datetime.datetime(2005, 1, 1)
+    assert dt - datetime.timedelta(days=366, seconds=-1) == datetime.datetime(
+        2004, 1, 1, 0, 0, 0, 999999)
+    assert dt + datetime.timedelta(hours=-24) == datetime.datetime(
+        2004, 12, 30, 23, 59, 59, 999999)
+    with pytest.raises(OverflowError):
+        datetime.datetime.max + datetime.timedelta(microseconds=1)
+    with pytest.raises(OverflowError):
+        datetime.datetime.min - datetime.timedelta(microseconds=1)
+
 def test_datetime_rounding():
     b = 0.0000001
     a = 0.9999994
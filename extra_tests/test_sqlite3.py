@@ -234,6 +234,40 @@ def test_description_after_fetchall(con):
     cur.execute("select 42").fetchall()
     assert cur.description is not None
 
+def test_fetch_rows(con):
+    cur = con.cursor()
+    cur.execute("create table test(a, b, c, d)")
+    cur.executemany("insert into test values (?, ?, ?, ?)",
+                    [(i, i / 2.0, u"t%d" % i, None) for i in range(10)])
+    cur.execute("insert into test values (?, ?, ?, ?)",
+                (2 ** 40, -0.5, u"\xe9", buffer(b"\x00blob")))
+    cur.execute("select * from test order by a")
+    assert cur.fetchone() == (0, 0.0, u"t0", None)
+    assert cur.fetchmany(3) == [(i, i / 2.0, u"t%d" % i, None)
+                                for i in range(1, 4)]
+    cur.arraysize = 2
+    assert len(cur.fetchmany()) == 2
+    rows = cur.fetchall()
+    assert len(rows) == 5
+    assert rows[-1][:3] == (2 ** 40, -0.5, u"\xe9")
+    assert str(rows[-1][3]) == b"\x00blob"
+    assert cur.fetchall() == []
+    assert cur.fetchmany(5) == []
+    cur.row_factory = lambda cursor, row: row[0]
+    assert cur.execute("select a from test where a < 3").fetchall() == [
+        0, 1, 2]
+
+@pypy_only
+def test_statement_cache_lru():
+    con = _sqlite3.connect(':memory:', cached_statements=2)
+    con.execute("select 1")
+    con.execute("select 2")
+    con.execute("select 1")
+    con.execute("select 3")
+    # "select 2" was the least recently used one
+    assert list(con._statement_cache.cache) == ["select 1", "select 3"]
+    con.close()
+
 def test_executemany_lastrowid(con):
     cur = con.cursor()
     cur.execute("create table test(a)")
@@ -190,7 +190,10 @@ class _StatementCache(object):
         else:
             if stat._in_use:
                 stat = Statement(self.connection, sql)
-                self.cache[sql] = stat
+            # move it to the end: the least recently used statements
+            # are the ones removed when the cache is full
+            del self.cache[sql]
+            self.cache[sql] = stat
         return stat
 
 
@@ -770,7 +773,19 @@ class Cursor(object):
 
             self.__row_cast_map.append(converter)
 
+    def __allocate_row_buffers(self):
+        # filled by _pypy_sqlite3_column_values(), which reads a whole row
+        # in a single call instead of several calls per column
+        num_cols = _lib.sqlite3_column_count(self.__statement._statement)
+        self.__row_types = _ffi.new("int[]", num_cols)
+        self.__row_ints = _ffi.new("sqlite3_int64[]", num_cols)
+        self.__row_doubles = _ffi.new("double[]", num_cols)
+        self.__row_data = _ffi.new("const void *[]", num_cols)
+        self.__row_sizes = _ffi.new("int[]", num_cols)
+
     def __fetch_one_row(self):
+        if not self.__connection._detect_types:
+            return self.__fetch_row_values()
         num_cols = _lib.sqlite3_data_count(self.__statement._statement)
         row = newlist_hint(num_cols)
         for i in xrange(num_cols):
@@ -808,6 +823,32 @@ class Cursor(object):
             row.append(val)
         return tuple(row)
 
+    def __fetch_row_values(self):
+        statement = self.__statement._statement
+        num_cols = _lib.sqlite3_data_count(statement)
+        types = self.__row_types
+        data = self.__row_data
+        sizes = self.__row_sizes
+        _lib._pypy_sqlite3_column_values(statement, num_cols, types,
+                                         self.__row_ints, self.__row_doubles,
+                                         data, sizes)
+        text_factory = self.__connection.text_factory
+        row = newlist_hint(num_cols)
+        for i in xrange(num_cols):
+            typ = types[i]
+            if typ == _lib.SQLITE_INTEGER:
+                val = int(self.__row_ints[i])
+            elif typ == _lib.SQLITE_FLOAT:
+                val = self.__row_doubles[i]
+            elif typ == _lib.SQLITE_TEXT:
+                val = text_factory(_ffi.buffer(data[i], sizes[i])[:])
+            elif typ == _lib.SQLITE_BLOB:
+                val = _BLOB_TYPE(_ffi.buffer(data[i], sizes[i])[:])
+            else:
+                val = None
+            row.append(val)
+        return tuple(row)
+
     def __execute(self, multiple, sql, many_params):
         self.__locked = True
         self._reset = False
@@ -862,6 +903,7 @@ class Cursor(object):
                     if multiple:
                         raise ProgrammingError("executemany() can only execute DML statements.")
                     self.__build_row_cast_map()
+                    self.__allocate_row_buffers()
                     self.__next_row = self.__fetch_one_row()
                 elif ret == _lib.SQLITE_DONE:
                     if not multiple:
@@ -960,6 +1002,10 @@ class Cursor(object):
         if self.row_factory is not None:
             next_row = self.row_factory(self, next_row)
 
+        self.__step()
+        return next_row
+
+    def __step(self):
         ret = _lib.sqlite3_step(self.__statement._statement)
         if ret == _lib.SQLITE_ROW:
             self.__next_row = self.__fetch_one_row()
@@ -967,7 +1013,27 @@ class Cursor(object):
             self.__statement._reset()
             if ret != _lib.SQLITE_DONE:
                 raise self.__connection._get_exception(ret)
-        return next_row
+
+    def __fetch_rows(self, size):
+        # like calling next() up to 'size' times (or until the end if
+        # 'size' <= 0), but with the checks done only once
+        self.__check_cursor()
+        self.__check_reset()
+        lst = []
+        if not self.__statement:
+            return lst
+        row_factory = self.row_factory
+        while size <= 0 or len(lst) < size:
+            try:
+                next_row = self.__next_row
+            except AttributeError:
+                break
+            del self.__next_row
+            if row_factory is not None:
+                next_row = row_factory(self, next_row)
+            self.__step()
+            lst.append(next_row)
+        return lst
 
     if sys.version_info[0] < 3:
         next = __next__
@@ -979,15 +1045,10 @@ class Cursor(object):
     def fetchmany(self, size=None):
         if size is None:
             size = self.arraysize
-        lst = []
-        for row in self:
-            lst.append(row)
-            if len(lst) == size:
-                break
-        return lst
+        return self.__fetch_rows(size)
 
     def fetchall(self):
-        return list(self)
+        return self.__fetch_rows(0)
 
     def __get_connection(self):
         self.__check_cursor()
@@ -156,6 +156,9 @@ sqlite3_int64 sqlite3_column_int64(sqlite3_stmt*, int iCol);
 const unsigned char *sqlite3_column_text(sqlite3_stmt*, int iCol);
 const void *sqlite3_column_text16(sqlite3_stmt*, int iCol);
 int sqlite3_column_type(sqlite3_stmt*, int iCol);
+void _pypy_sqlite3_column_values(sqlite3_stmt*, int ncols, int *types,
+                                 sqlite3_int64 *ints, double *doubles,
+                                 const void **data, int *sizes);
 const char *sqlite3_column_decltype(sqlite3_stmt*,int);
 
 void sqlite3_progress_handler(sqlite3*, int, int(*)(void*), void*);
@@ -259,7 +262,39 @@ else:
         libraries=libraries,
     )
 
-_ffi.set_source("_sqlite3_cffi", "#include <sqlite3.h>", **extra_args)
+_ffi.set_source("_sqlite3_cffi", """
+#include <sqlite3.h>
+
+/* Read all the columns of the current row with a single call from
+   Python.  The 'data' pointers are only valid until the next step. */
+static void _pypy_sqlite3_column_values(sqlite3_stmt *statement, int ncols,
+                                        int *types, sqlite3_int64 *ints,
+                                        double *doubles, const void **data,
+                                        int *sizes)
+{
+    int i;
+    for (i = 0; i < ncols; i++) {
+        int typ = sqlite3_column_type(statement, i);
+        types[i] = typ;
+        switch (typ) {
+        case SQLITE_INTEGER:
+            ints[i] = sqlite3_column_int64(statement, i);
+            break;
+        case SQLITE_FLOAT:
+            doubles[i] = sqlite3_column_double(statement, i);
+            break;
+        case SQLITE_TEXT:
+            data[i] = sqlite3_column_text(statement, i);
+            sizes[i] = sqlite3_column_bytes(statement, i);
+            break;
+        case SQLITE_BLOB:
+            data[i] = sqlite3_column_blob(statement, i);
+            sizes[i] = sqlite3_column_bytes(statement, i);
+            break;
+        }
+    }
+}
+""", **extra_args)
 
 
 if __name__ == "__main__":
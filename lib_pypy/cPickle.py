@@ -12,6 +12,9 @@ import marshal, struct, sys
 try: from __pypy__ import builtinify
 except ImportError: builtinify = lambda f: f
 
+try: from _pickle import Saver as _Saver, loads as _loads_buffer
+except ImportError: _Saver = _loads_buffer = None
+
 # These are purely informational; no code uses these.
 format_version = "2.0"                  # File format version we write
 compatible_formats = ["1.0",            # Original protocol 0
@@ -111,6 +114,33 @@ class Pickler(PythonPickler):
         self.memo[id(None)] = None   # cPickle starts counting at one
         return PythonPickler.memoize(self, obj)
 
+    def dump(self, obj):
+        # the builtin types are saved at interp-level by _pickle.Saver,
+        # unless save() or persistent_id() are overridden, in the class
+        # or on the instance
+        if (_Saver is None or
+                type(self).save.im_func is not PythonPickler.save.im_func or
+                type(self).persistent_id.im_func is not
+                    PythonPickler.persistent_id.im_func or
+                type(self).dispatch is not PythonPickler.dispatch or
+                'save' in self.__dict__ or
+                'persistent_id' in self.__dict__):
+            return PythonPickler.dump(self, obj)
+        saver = _Saver(self.write, self.memo, self.proto, bool(self.fast),
+                       self._save_generic)
+        write = self.write
+        self.write = saver.write
+        self.save = saver.save
+        try:
+            PythonPickler.dump(self, obj)
+        finally:
+            del self.save
+            self.write = write
+        saver.flush()
+
+    def _save_generic(self, obj):
+        PythonPickler.save(self, obj)
+
     def getvalue(self):
         return self.__f and self.__f.getvalue()
 
@@ -364,6 +394,9 @@ class Unpickler(object):
     def _instantiate(self, klass, k):
         args = tuple(self.stack[k+1:])
         del self.stack[k:]
+        self.append(self._make_instance(klass, args))
+
+    def _make_instance(self, klass, args):
         instantiated = 0
         if (not args and
                 type(klass) is ClassType and
@@ -382,7 +415,7 @@ class Unpickler(object):
             except TypeError, err:
                 raise TypeError, "in constructor for %s: %s" % (
                     klass.__name__, str(err)), sys.exc_info()[2]
-        self.append(value)
+        return value
 
     def load_inst(self):
         module = self.readline()[:-1]
@@ -428,17 +461,19 @@ class Unpickler(object):
     dispatch[EXT4] = load_ext4
 
     def get_extension(self, code):
+        self.append(self._get_extension(code))
+
+    def _get_extension(self, code):
         nil = []
         obj = _extension_cache.get(code, nil)
         if obj is not nil:
-            self.append(obj)
-            return
+            return obj
         key = _inverted_registry.get(code)
         if not key:
             raise ValueError("unregistered extension code %d" % code)
         obj = self.find_class(*key)
         _extension_cache[code] = obj
-        self.append(obj)
+        return obj
 
     def find_class(self, module, name):
         if self.find_global is None:
@@ -536,7 +571,10 @@ class Unpickler(object):
     def load_build(self):
         stack = self.stack
         state = stack.pop()
-        inst = stack[-1]
+        self._build(stack[-1], state)
+    dispatch[BUILD] = load_build
+
+    def _build(self, inst, state):
         setstate = getattr(inst, "__setstate__", None)
         if setstate:
             setstate(state)
@@ -570,7 +608,6 @@ class Unpickler(object):
         if slotstate:
             for k, v in slotstate.items():
                 setattr(inst, k, v)
-    dispatch[BUILD] = load_build
 
     def load_mark(self):
         self.append(self.mark)
@@ -623,5 +660,11 @@ def load(f):
     return Unpickler(f).load()
 
 def loads(str):
+    if _loads_buffer is not None and isinstance(str, (bytes, buffer,
+                                                      bytearray, memoryview)):
+        # load directly from the buffer, without a StringIO
+        u = Unpickler.__new__(Unpickler)
+        u.memo = {}
+        return _loads_buffer(str, u)
     f = StringIO(str)
     return Unpickler(f).load()
@@ -184,6 +184,15 @@ def _build_struct_time(y, m, d, hh, mm, ss, dstflag):
     dnum = _days_before_month(y, m) + d
     return _timemodule.struct_time((y, m, d, hh, mm, ss, wday, dnum, dstflag))
 
+# Order-preserving packing of the fields into a single int, used to compare
+# and hash dates and naive datetimes without building tuples or strings.
+def _pack_date(y, m, d):
+    return (y << 9) | (m << 5) | d
+
+def _pack_datetime(y, m, d, hh, mm, ss, us):
+    return (((((((_pack_date(y, m, d) << 5) | hh) << 6) | mm) << 6) | ss)
+            << 20) | us
+
 def _format_time(hh, mm, ss, us):
     # Skip trailing microseconds when us==0.
     result = "%02d:%02d:%02d" % (hh, mm, ss)
@@ -252,6 +261,131 @@ def _wrap_strftime(object, format, timetuple):
     newformat = "".join(newformat)
     return _timemodule.strftime(newformat, timetuple)
 
+# The strftime() and strptime() directives that don't depend on the locale
+# nor on the platform: their index in (year, month, day, hour, minute, second,
+# microsecond), and how to format and to parse them.  The regexps are the
+# ones of _strptime.TimeRE.
+_FAST_DIRECTIVES = {
+    'Y': (0, '%04d', r"(\d\d\d\d)"),
+    'm': (1, '%02d', r"(1[0-2]|0[1-9]|[1-9])"),
+    'd': (2, '%02d', r"(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])"),
+    'H': (3, '%02d', r"(2[0-3]|[0-1]\d|\d)"),
+    'M': (4, '%02d', r"([0-5]\d|\d)"),
+    'S': (5, '%02d', r"(6[0-1]|[0-5]\d|\d)"),
+    'f': (6, '%06d', r"([0-9]{1,6})"),
+}
+_FAST_FORMATS_MAX = 100
+_fast_strftime_formats = {}
+_fast_strptime_formats = {}
+
+def _parse_fast_format(format):
+    """Split a format made only of _FAST_DIRECTIVES into a list of literal
+    strings and of _FAST_DIRECTIVES entries, or return None."""
+    if '\0' in format:
+        return None
+    parts = []
+    i, n = 0, len(format)
+    start = 0
+    while i < n:
+        if format[i] != '%':
+            i += 1
+            continue
+        if i + 1 == n:
+            return None
+        ch = format[i + 1]
+        if ch == '%':
+            parts.append(format[start:i + 1])
+        elif ch in _FAST_DIRECTIVES:
+            parts.append(format[start:i])
+            parts.append(_FAST_DIRECTIVES[ch])
+        else:
+            return None
+        i += 2
+        start = i
+    parts.append(format[start:])
+    return parts
+
+def _cache_fast_format(cache, format, compiled):
+    if len(cache) >= _FAST_FORMATS_MAX:
+        cache.clear()
+    cache[format] = compiled
+    return compiled
+
+def _fast_strftime(format, fields):
+    """strftime() for the formats made only of _FAST_DIRECTIVES, without
+    calling time.strftime().  Returns None for the other formats."""
+    if type(format) is not str:
+        return None
+    try:
+        compiled = _fast_strftime_formats[format]
+    except KeyError:
+        parts = _parse_fast_format(format)
+        if parts is None:
+            compiled = None
+        else:
+            template = []
+            indices = []
+            for part in parts:
+                if isinstance(part, tuple):
+                    template.append(part[1])
+                    indices.append(part[0])
+                else:
+                    template.append(part.replace('%', '%%'))
+            compiled = ''.join(template), indices
+        _cache_fast_format(_fast_strftime_formats, format, compiled)
+    if compiled is None or fields[0] < _MINYEARFMT:
+        return None
+    template, indices = compiled
+    return template % tuple([fields[i] for i in indices])
+
+def _fast_strptime(date_string, format):
+    """strptime() for the formats made only of _FAST_DIRECTIVES, matching
+    like _strptime does, without its locale checks and time.struct_time.
+    Returns the (year, month, day, hour, minute, second, microsecond)
+    fields, or None for the other formats and for the errors, which are
+    left to _strptime to report."""
+    if type(format) is not str or type(date_string) is not str:
+        return None
+    try:
+        compiled = _fast_strptime_formats[format]
+    except KeyError:
+        import re
+        parts = _parse_fast_format(format)
+        compiled = None
+        if parts is not None:
+            pattern = []
+            indices = []
+            for part in parts:
+                if isinstance(part, tuple):
+                    if part[0] in indices:
+                        break     # redefinition of a group: error
+                    pattern.append(part[2])
+                    indices.append(part[0])
+                elif any(c.isalpha() for c in part):
+                    break         # matched case-insensitively
+                else:
+                    part = re.escape(re.sub(r'\s+', ' ', part))
+                    pattern.append(part.replace('\\ ', r'\s+'))
+            else:
+                compiled = re.compile(''.join(pattern)), indices
+        _cache_fast_format(_fast_strptime_formats, format, compiled)
+    if compiled is None:
+        return None
+    regex, indices = compiled
+    found = regex.match(date_string)
+    if found is None or found.end() != len(date_string):
+        return None
+    fields = [1900, 1, 1, 0, 0, 0, 0]
+    for i in range(len(indices)):
+        value = found.group(i + 1)
+        if indices[i] == 6:
+            value += "0" * (6 - len(value))
+        fields[indices[i]] = int(value)
+    if (fields[0] < MINYEAR or fields[5] > 59 or
+            fields[2] > _days_in_month(fields[0], fields[1])):
+        return None
+    return fields
+
 # Just raise TypeError if the arg isn't None or a string.
 def _check_tzname(name):
     if name is not None and not isinstance(name, str):
@@ -783,6 +917,10 @@ class date(dateinterop):
 
     def strftime(self, format):
         "Format using strftime()."
+        s = _fast_strftime(format, (self._year, self._month, self._day,
+                                    0, 0, 0, 0))
+        if s is not None:
+            return s
         return _wrap_strftime(self, format, self.timetuple())
 
     def __format__(self, fmt):
@@ -899,14 +1037,14 @@ class date(dateinterop):
 
     def _cmp(self, other):
         assert isinstance(other, date)
-        y, m, d = self._year, self._month, self._day
-        y2, m2, d2 = other._year, other._month, other._day
-        return _cmp((y, m, d), (y2, m2, d2))
+        return _cmp(_pack_date(self._year, self._month, self._day),
+                    _pack_date(other._year, other._month, other._day))
 
     def __hash__(self):
         "Hash."
         if self._hashcode == -1:
-            self._hashcode = hash(self._getstate())
+            self._hashcode = hash(_pack_date(self._year, self._month,
+                                             self._day))
         return self._hashcode
 
     # Computations
@@ -1546,6 +1684,15 @@ class datetime(date):
                 y, m, d, hh, mm, ss, 0, ignore_overflow=True)
         return _build_struct_time(y, m, d, hh, mm, ss, 0)
 
+    def strftime(self, format):
+        "Format using strftime()."
+        s = _fast_strftime(format, (self._year, self._month, self._day,
+                                    self._hour, self._minute, self._second,
+                                    self._microsecond))
+        if s is not None:
+            return s
+        return _wrap_strftime(self, format, self.timetuple())
+
     def date(self):
         "Return the date part."
         return date(self._year, self._month, self._day)
@@ -1626,6 +1773,14 @@ class datetime(date):
         Optional argument sep specifies the separator between date and
         time, default 'T'.
         """
+        if self._tzinfo is None:
+            if self._microsecond:
+                return "%04d-%02d-%02d%c%02d:%02d:%02d.%06d" % (
+                    self._year, self._month, self._day, sep, self._hour,
+                    self._minute, self._second, self._microsecond)
+            return "%04d-%02d-%02d%c%02d:%02d:%02d" % (
+                self._year, self._month, self._day, sep, self._hour,
+                self._minute, self._second)
         s = ("%04d-%02d-%02d%c" % (self._year, self._month, self._day, sep) +
              _format_time(self._hour, self._minute, self._second,
                           self._microsecond))
@@ -1663,6 +1818,9 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        fields = _fast_strptime(date_string, format)
+        if fields is not None:
+            return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
@@ -1793,12 +1951,12 @@ class datetime(date):
             base_compare = myoff == otoff
 
         if base_compare:
-            return _cmp((self._year, self._month, self._day,
-                         self._hour, self._minute, self._second,
-                         self._microsecond),
-                        (other._year, other._month, other._day,
-                         other._hour, other._minute, other._second,
-                         other._microsecond))
+            return _cmp(_pack_datetime(self._year, self._month, self._day,
+                                       self._hour, self._minute, self._second,
+                                       self._microsecond),
+                        _pack_datetime(other._year, other._month, other._day,
+                                       other._hour, other._minute,
+                                       other._second, other._microsecond))
         if myoff is None or otoff is None:
             raise TypeError("can't compare offset-naive and offset-aware datetimes")
         # XXX What follows could be done more efficiently...
@@ -1808,15 +1966,22 @@ class datetime(date):
         return diff and 1 or 0
 
     def _add_timedelta(self, other, factor):
-        result = _normalize_datetime(
-            self._year,
-            self._month,
-            self._day + other.days * factor,
-            self._hour,
-            self._minute,
-            self._second + other.seconds * factor,
-            self._microsecond + other.microseconds * factor)
-        return datetime(result, tzinfo=self._tzinfo)
+        # only go through the calendar if the day changes
+        seconds = (self._hour * 3600 + self._minute * 60 + self._second +
+                   other._seconds * factor)
+        seconds, us = _normalize_pair(
+            seconds, self._microsecond + other._microseconds * factor,
+            1000000)
+        days, seconds = _normalize_pair(
+            other._days * factor, seconds, _SECONDS_PER_DAY)
+        if days:
+            y, m, d = _normalize_date(self._year, self._month,
+                                      self._day + days)
+        else:
+            y, m, d = self._year, self._month, self._day
+        hh, seconds = divmod(seconds, 3600)
+        mm, ss = divmod(seconds, 60)
+        return datetime((y, m, d, hh, mm, ss, us), tzinfo=self._tzinfo)
 
     def __add__(self, other):
         "Add a datetime and a timedelta."
@@ -1853,7 +2018,9 @@ class datetime(date):
         if self._hashcode == -1:
             tzoff = self._utcoffset()
             if tzoff is None:
-                self._hashcode = hash(self._getstate()[0])
+                self._hashcode = hash(_pack_datetime(
+                    self._year, self._month, self._day, self._hour,
+                    self._minute, self._second, self._microsecond))
             else:
                 days = _ymd2ord(self.year, self.month, self.day)
                 seconds = self.hour * 3600 + (self.minute - tzoff) * 60 + self.second
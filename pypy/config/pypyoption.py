@@ -32,11 +32,12 @@ working_modules = default_modules.copy()
 working_modules.update([
     "_socket", "unicodedata", "mmap", "fcntl", "_locale", "pwd",
     "select", "zipimport", "_lsprof", "signal", "_rawffi", "termios",
-    "zlib", "bz2", "struct", "_md5", "_sha", "_minimal_curses",
+    "zlib", "bz2", "struct", "_md5", "_sha", "_sha256", "_sha512",
+    "_minimal_curses",
     "cStringIO", "thread", "itertools", "pyexpat", "cpyext", "array",
     "binascii", "_multiprocessing", '_warnings', "_collections",
     "_multibytecodec", "micronumpy", "_continuation", "_cffi_backend",
-    "_csv", "_cppyy", "_pypyjson", "_jitlog",
+    "_csv", "_cppyy", "_pypyjson", "_pickle", "_jitlog",
     # "_hashlib", "crypt"
 ])
 
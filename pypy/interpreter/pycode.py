@@ -52,6 +52,7 @@ def make_signature(code):
 class CodeHookCache(object):
     def __init__(self, space):
         self._code_hook = None
+        self._warmup_profile = None     # see pypyjit/interp_warmup.py
 
 class PyCode(eval.Code):
     "CPython-style code objects."
@@ -64,6 +65,10 @@ class PyCode(eval.Code):
                           "w_globals?",
                           "cell_families[*]"]
 
+    # the loops to trace as soon as this code runs, from the warm-up
+    # profile loaded by pypyjit.load_warmup_profile()
+    jit_warmup_positions = None
+
     def __init__(self, space,  argcount, nlocals, stacksize, flags,
                      code, consts, names, varnames, filename,
                      name, firstlineno, lnotab, freevars, cellvars,
@@ -107,7 +112,10 @@ class PyCode(eval.Code):
         return True
 
     def new_code_hook(self):
-        code_hook = self.space.fromcache(CodeHookCache)._code_hook
+        cache = self.space.fromcache(CodeHookCache)
+        if cache._warmup_profile is not None:
+            cache._warmup_profile.new_code(self)
+        code_hook = cache._code_hook
         if code_hook is not None:
             try:
                 self.space.call_function(code_hook, self)
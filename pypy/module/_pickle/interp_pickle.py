@@ -0,0 +1,430 @@
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rstruct.ieee import float_pack
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.objspace.std.boolobject import W_BoolObject
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.dictmultiobject import W_DictObject
+from pypy.objspace.std.floatobject import W_FloatObject, float_repr
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.listobject import W_ListObject
+from pypy.objspace.std.unicodeobject import W_UnicodeObject
+from pypy.module._pickle import opcodes
+
+
+def write_int32(builder, x):
+    builder.append(chr(x & 0xff))
+    builder.append(chr((x >> 8) & 0xff))
+    builder.append(chr((x >> 16) & 0xff))
+    builder.append(chr((x >> 24) & 0xff))
+
+def encode_long(bigint):
+    """Two's complement little-endian encoding of a long, as done by
+    pickle.encode_long(): the shortest one, and '' for 0L."""
+    if bigint.sign == 0:
+        return ''
+    if bigint.sign > 0:
+        nbits = bigint.bit_length()
+    else:
+        nbits = bigint.invert().bit_length()
+    return bigint.tobytes((nbits >> 3) + 1, 'little', True)
+
+
+class W_Saver(W_Root):
+    """ Saves the builtin types for a cPickle.Pickler: None, bool, int,
+    long, float, str, unicode, tuple, list and dict, with the same opcodes
+    as pickle.Pickler.  Everything else, as well as the subclasses of these
+    types, is passed to 'w_fallback', which is the generic save() of the
+    Pickler.  The memo is the Pickler's memo dict, so that both sides agree
+    on it.  The output is buffered, and passed to 'w_write' in chunks. """
+
+    BATCHSIZE = 1000
+    FLUSH_SIZE = 64 * 1024
+
+    def __init__(self, space, w_write, w_memo, proto, fast, w_fallback):
+        self.space = space
+        self.w_write = w_write
+        self.w_memo = w_memo
+        self.proto = proto
+        self.bin = proto >= 1
+        self.fast = fast
+        self.w_fallback = w_fallback
+        self.memo_started = False
+        self.depth = 0
+        self.builder = StringBuilder()
+
+    @unwrap_spec(data='bytes')
+    def descr_write(self, space, data):
+        self.builder.append(data)
+
+    def descr_flush(self, space):
+        self.flush()
+
+    def descr_save(self, space, w_obj):
+        self.save(w_obj)
+
+    def flush(self):
+        if self.builder.getlength() > 0:
+            data = self.builder.build()
+            self.builder = StringBuilder()
+            self.space.call_function(self.w_write, self.space.newbytes(data))
+
+    # ____________________________________________________________
+    # the memo
+
+    def memo_get(self, w_obj):
+        """ If w_obj is in the memo, write a GET for it and return True. """
+        space = self.space
+        w_x = space.finditem(self.w_memo, space.id(w_obj))
+        if w_x is None or not space.is_true(w_x):
+            return False
+        index = space.int_w(space.getitem(w_x, space.newint(0)))
+        self.write_get(index)
+        return True
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        space = self.space
+        if not self.memo_started:
+            # cPickle starts counting at one
+            space.setitem(self.w_memo, space.id(space.w_None), space.w_None)
+            self.memo_started = True
+        index = space.len_w(self.w_memo)
+        self.write_put(index)
+        space.setitem(self.w_memo, space.id(w_obj),
+                      space.newtuple([space.newint(index), w_obj]))
+
+    def write_get(self, index):
+        builder = self.builder
+        if not self.bin:
+            builder.append(opcodes.GET)
+            builder.append(str(index))
+            builder.append('\n')
+        elif index < 256:
+            builder.append(opcodes.BINGET)
+            builder.append(chr(index))
+        else:
+            builder.append(opcodes.LONG_BINGET)
+            write_int32(builder, index)
+
+    def write_put(self, index):
+        builder = self.builder
+        if not self.bin:
+            builder.append(opcodes.PUT)
+            builder.append(str(index))
+            builder.append('\n')
+        elif index < 256:
+            builder.append(opcodes.BINPUT)
+            builder.append(chr(index))
+        else:
+            builder.append(opcodes.LONG_BINPUT)
+            write_int32(builder, index)
+
+    # ____________________________________________________________
+
+    def save(self, w_obj):
+        space = self.space
+        if self.builder.getlength() >= self.FLUSH_SIZE:
+            self.flush()
+        if space.is_w(w_obj, space.w_None):
+            self.builder.append(opcodes.NONE)
+        elif type(w_obj) is W_BoolObject:
+            self.save_bool(space.is_true(w_obj))
+        elif type(w_obj) is W_IntObject:
+            self.save_int(space.int_w(w_obj))
+        elif type(w_obj) is W_FloatObject:
+            self.save_float(space.float_w(w_obj))
+        elif space.is_w(space.type(w_obj), space.w_long):
+            self.save_long(w_obj)
+        elif type(w_obj) is W_BytesObject:
+            if not self.memo_get(w_obj):
+                self.save_bytes(w_obj)
+        elif type(w_obj) is W_UnicodeObject and self.bin:
+            if not self.memo_get(w_obj):
+                self.save_unicode(w_obj)
+        elif space.is_w(space.type(w_obj), space.w_tuple):
+            if not self.memo_get(w_obj):
+                self.enter()
+                self.save_tuple(w_obj)
+                self.leave()
+        elif type(w_obj) is W_ListObject:
+            if not self.memo_get(w_obj):
+                self.enter()
+                self.save_list(w_obj)
+                self.leave()
+        elif (type(w_obj) is W_DictObject and
+                w_obj.getitem_str('__name__') is None):
+            # dicts with a '__name__' may be the __dict__ of a module,
+            # which is saved differently by the fallback
+            if not self.memo_get(w_obj):
+                self.enter()
+                self.save_dict(w_obj)
+                self.leave()
+        else:
+            space.call_function(self.w_fallback, w_obj)
+
+    def enter(self):
+        self.depth += 1
+        if self.depth > self.space.sys.recursionlimit:
+            raise oefmt(self.space.w_RuntimeError,
+                        "maximum recursion depth exceeded while pickling "
+                        "an object")
+
+    def leave(self):
+        self.depth -= 1
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            if value:
+                self.builder.append(opcodes.NEWTRUE)
+            else:
+                self.builder.append(opcodes.NEWFALSE)
+        else:
+            if value:
+                self.builder.append(opcodes.TRUE)
+            else:
+                self.builder.append(opcodes.FALSE)
+
+    def save_int(self, x):
+        builder = self.builder
+        if self.bin:
+            if 0 <= x <= 0xff:
+                builder.append(opcodes.BININT1)
+                builder.append(chr(x))
+                return
+            if 0 <= x <= 0xffff:
+                builder.append(opcodes.BININT2)
+                builder.append(chr(x & 0xff))
+                builder.append(chr(x >> 8))
+                return
+            high_bits = x >> 31
+            if high_bits == 0 or high_bits == -1:
+                builder.append(opcodes.BININT)
+                write_int32(builder, x)
+                return
+        builder.append(opcodes.INT)
+        builder.append(str(x))
+        builder.append('\n')
+
+    def save_float(self, x):
+        builder = self.builder
+        if self.bin:
+            builder.append(opcodes.BINFLOAT)
+            value = float_pack(x, 8)
+            for i in range(7, -1, -1):
+                builder.append(chr(intmask((value >> (i * 8)) & 0xff)))
+        else:
+            builder.append(opcodes.FLOAT)
+            builder.append(float_repr(x))
+            builder.append('\n')
+
+    def save_long(self, w_obj):
+        space = self.space
+        builder = self.builder
+        if self.proto >= 2:
+            data = encode_long(space.bigint_w(w_obj))
+            n = len(data)
+            if n < 256:
+                builder.append(opcodes.LONG1)
+                builder.append(chr(n))
+            else:
+                builder.append(opcodes.LONG4)
+                write_int32(builder, n)
+            builder.append(data)
+        else:
+            builder.append(opcodes.LONG)
+            builder.append(space.text_w(space.repr(w_obj)))
+            builder.append('\n')
+
+    def save_bytes(self, w_obj):
+        space = self.space
+        builder = self.builder
+        if self.bin:
+            s = space.bytes_w(w_obj)
+            n = len(s)
+            if n < 256:
+                builder.append(opcodes.SHORT_BINSTRING)
+                builder.append(chr(n))
+            else:
+                builder.append(opcodes.BINSTRING)
+                write_int32(builder, n)
+            builder.append(s)
+        else:
+            builder.append(opcodes.STRING)
+            builder.append(space.text_w(space.repr(w_obj)))
+            builder.append('\n')
+        self.memoize(w_obj)
+
+    def save_unicode(self, w_obj):
+        # only for protocols >= 1; protocol 0 is left to the fallback
+        s = self.space.utf8_w(w_obj)
+        self.builder.append(opcodes.BINUNICODE)
+        write_int32(self.builder, len(s))
+        self.builder.append(s)
+        self.memoize(w_obj)
+
+    def save_tuple(self, w_tuple):
+        space = self.space
+        builder = self.builder
+        items_w = space.fixedview(w_tuple)
+        n = len(items_w)
+        if n == 0:
+            if self.proto:
+                builder.append(opcodes.EMPTY_TUPLE)
+            else:
+                builder.append(opcodes.MARK)
+                builder.append(opcodes.TUPLE)
+            return
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            # the tuple is recursive if saving its items saved it
+            if self.memo_get_after_items(w_tuple, opcodes.POP * n):
+                return
+            builder = self.builder    # may have been flushed
+            if n == 1:
+                builder.append(opcodes.TUPLE1)
+            elif n == 2:
+                builder.append(opcodes.TUPLE2)
+            else:
+                builder.append(opcodes.TUPLE3)
+            self.memoize(w_tuple)
+            return
+        builder.append(opcodes.MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        if self.proto:
+            pop = opcodes.POP_MARK
+        else:
+            # POP_MARK is not available
+            pop = opcodes.POP * (n + 1)
+        if self.memo_get_after_items(w_tuple, pop):
+            return
+        self.builder.append(opcodes.TUPLE)
+        self.memoize(w_tuple)
+
+    def memo_get_after_items(self, w_tuple, pop):
+        space = self.space
+        if space.finditem(self.w_memo, space.id(w_tuple)) is None:
+            return False
+        self.builder.append(pop)
+        return self.memo_get(w_tuple)
+
+    def save_list(self, w_list):
+        space = self.space
+        if self.bin:
+            self.builder.append(opcodes.EMPTY_LIST)
+        else:
+            self.builder.append(opcodes.MARK)
+            self.builder.append(opcodes.LIST)
+        self.memoize(w_list)
+        # fast paths for the lists of unboxed ints and floats
+        intlist = space.listview_int(w_list)
+        if intlist is not None:
+            n = len(intlist)
+            start = 0
+            while start < n:
+                stop = self.start_batch(start, n)
+                for i in range(start, stop):
+                    self.save_int(intlist[i])
+                    self.end_item(opcodes.APPEND)
+                self.end_batch(start, stop, opcodes.APPEND, opcodes.APPENDS)
+                start = stop
+            return
+        floatlist = space.listview_float(w_list)
+        if floatlist is not None:
+            n = len(floatlist)
+            start = 0
+            while start < n:
+                stop = self.start_batch(start, n)
+                for i in range(start, stop):
+                    self.save_float(floatlist[i])
+                    self.end_item(opcodes.APPEND)
+                self.end_batch(start, stop, opcodes.APPEND, opcodes.APPENDS)
+                start = stop
+            return
+        assert isinstance(w_list, W_ListObject)
+        items_w = w_list.getitems_copy()
+        n = len(items_w)
+        start = 0
+        while start < n:
+            stop = self.start_batch(start, n)
+            for i in range(start, stop):
+                self.save(items_w[i])
+                self.end_item(opcodes.APPEND)
+            self.end_batch(start, stop, opcodes.APPEND, opcodes.APPENDS)
+            start = stop
+
+    def start_batch(self, start, n):
+        """ Start a batch of items from index 'start' of a container of
+        length 'n', and return where the batch stops.  With protocol 0,
+        every item is its own batch and is followed by an APPEND or a
+        SETITEM; otherwise, batches of more than one item are written
+        between a MARK and an APPENDS or a SETITEMS, like
+        pickle.Pickler._batch_appends() and _batch_setitems(). """
+        if not self.bin:
+            return n
+        stop = min(start + self.BATCHSIZE, n)
+        if stop - start > 1:
+            self.builder.append(opcodes.MARK)
+        return stop
+
+    def end_item(self, op):
+        if not self.bin:
+            self.builder.append(op)
+
+    def end_batch(self, start, stop, op, batch_op):
+        if self.bin:
+            if stop - start > 1:
+                self.builder.append(batch_op)
+            else:
+                self.builder.append(op)
+
+    def save_dict(self, w_dict):
+        if self.bin:
+            self.builder.append(opcodes.EMPTY_DICT)
+        else:
+            self.builder.append(opcodes.MARK)
+            self.builder.append(opcodes.DICT)
+        self.memoize(w_dict)
+        assert isinstance(w_dict, W_DictObject)
+        n = w_dict.length()
+        iterator = w_dict.iteritems()
+        start = 0
+        while start < n:
+            stop = self.start_batch(start, n)
+            for i in range(start, stop):
+                w_key, w_value = iterator.next_item()
+                if w_key is None:
+                    # the dict changed size during iteration
+                    raise oefmt(self.space.w_RuntimeError,
+                                "dictionary changed size during iteration")
+                self.save(w_key)
+                self.save(w_value)
+                self.end_item(opcodes.SETITEM)
+            self.end_batch(start, stop, opcodes.SETITEM, opcodes.SETITEMS)
+            start = stop
+
+
+@unwrap_spec(proto=int, fast=bool)
+def W_Saver___new__(space, w_subtype, w_write, w_memo, proto, fast,
+                    w_fallback):
+    w_saver = space.allocate_instance(W_Saver, w_subtype)
+    saver = space.interp_w(W_Saver, w_saver)
+    W_Saver.__init__(saver, space, w_write, w_memo, proto, fast, w_fallback)
+    return w_saver
+
+
+W_Saver.typedef = TypeDef(
+    '_pickle.Saver',
+    __new__ = interp2app(W_Saver___new__),
+    save = interp2app(W_Saver.descr_save),
+    write = interp2app(W_Saver.descr_write),
+    flush = interp2app(W_Saver.descr_flush),
+    __doc__ = """Saver(write, memo, proto, fast, fallback)
+
+Saves the builtin types for cPickle.Pickler.""")
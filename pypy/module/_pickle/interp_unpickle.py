@@ -0,0 +1,373 @@
+from rpython.rlib import rutf8
+from rpython.rlib.rarithmetic import string_to_int
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rstring import ParseStringError, ParseStringOverflowError
+from rpython.rlib.rstruct.ieee import unpack_float
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.objspace.std.dictmultiobject import W_DictObject
+from pypy.objspace.std.listobject import W_ListObject
+from pypy.module._pickle import opcodes
+
+
+def unpickling_error(space, msg):
+    w_pickle = space.call_function(space.builtin.get('__import__'),
+                                   space.newtext('pickle'))
+    w_UnpicklingError = space.getattr(w_pickle,
+                                      space.newtext('UnpicklingError'))
+    return OperationError(w_UnpicklingError, space.newtext(msg))
+
+
+class Loader(object):
+    """ Loads a pickle from a buffer, without copying it.  This is the loop
+    of cPickle.Unpickler.load(), with the same semantics; the opcodes that
+    need to call back into the Python code (GLOBAL, REDUCE, BUILD...) call
+    the methods of 'w_unpickler', a cPickle.Unpickler.  The marks are kept
+    on a separate stack, like in CPython's cPickle. """
+
+    def __init__(self, space, buf, w_unpickler):
+        self.space = space
+        self.buf = buf
+        self.length = buf.getlength()
+        self.pos = 0
+        self.w_unpickler = w_unpickler
+        self.stack_w = []
+        self.marks = []
+        self.memo = {}
+
+    # ____________________________________________________________
+    # reading
+
+    def read(self, n):
+        pos = self.pos
+        if n < 0 or pos + n > self.length:
+            raise OperationError(self.space.w_EOFError, self.space.w_None)
+        self.pos = pos + n
+        return self.buf.getslice(pos, 1, n)
+
+    def read_byte(self):
+        pos = self.pos
+        if pos >= self.length:
+            raise OperationError(self.space.w_EOFError, self.space.w_None)
+        self.pos = pos + 1
+        return ord(self.buf.getitem(pos))
+
+    def read_int32(self):
+        x = self.read_byte()
+        x |= self.read_byte() << 8
+        x |= self.read_byte() << 16
+        last = self.read_byte()
+        if last >= 0x80:
+            last -= 0x100
+        return x | (last << 24)
+
+    def readline(self):
+        """ Return the next line, without its final newline. """
+        pos = self.pos
+        end = pos
+        while True:
+            if end >= self.length:
+                raise OperationError(self.space.w_EOFError, self.space.w_None)
+            if self.buf.getitem(end) == '\n':
+                break
+            end += 1
+        self.pos = end + 1
+        return self.buf.getslice(pos, 1, end - pos)
+
+    # ____________________________________________________________
+    # the stack
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) <= self.last_mark():
+            raise unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w.pop()
+
+    def top(self):
+        if len(self.stack_w) <= self.last_mark():
+            raise unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w[-1]
+
+    def last_mark(self):
+        if not self.marks:
+            return 0
+        return self.marks[-1]
+
+    def pop_mark(self):
+        """ Remove the topmost mark and return the items above it. """
+        if not self.marks:
+            raise unpickling_error(self.space, "could not find MARK")
+        k = self.marks.pop()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    # ____________________________________________________________
+
+    def load(self):
+        space = self.space
+        while True:
+            op = chr(self.read_byte())
+            if op == opcodes.STOP:
+                break
+            elif op == opcodes.MARK:
+                self.marks.append(len(self.stack_w))
+            elif op == opcodes.NONE:
+                self.push(space.w_None)
+            elif op == opcodes.NEWTRUE:
+                self.push(space.w_True)
+            elif op == opcodes.NEWFALSE:
+                self.push(space.w_False)
+            elif op == opcodes.BININT:
+                self.push(space.newint(self.read_int32()))
+            elif op == opcodes.BININT1:
+                self.push(space.newint(self.read_byte()))
+            elif op == opcodes.BININT2:
+                x = self.read_byte()
+                self.push(space.newint(x | (self.read_byte() << 8)))
+            elif op == opcodes.INT:
+                self.load_int()
+            elif op == opcodes.LONG:
+                self.push(space.call_function(space.w_long,
+                        space.newbytes(self.readline()), space.newint(0)))
+            elif op == opcodes.LONG1:
+                self.load_long(self.read_byte())
+            elif op == opcodes.LONG4:
+                self.load_long(self.read_int32())
+            elif op == opcodes.FLOAT:
+                self.push(space.call_function(space.w_float,
+                                              space.newbytes(self.readline())))
+            elif op == opcodes.BINFLOAT:
+                self.push(space.newfloat(unpack_float(self.read(8), True)))
+            elif op == opcodes.STRING:
+                self.load_string()
+            elif op == opcodes.BINSTRING:
+                self.push(space.newbytes(self.read(self.read_int32())))
+            elif op == opcodes.SHORT_BINSTRING:
+                self.push(space.newbytes(self.read(self.read_byte())))
+            elif op == opcodes.UNICODE:
+                w_data = space.newbytes(self.readline())
+                self.push(space.call_method(w_data, 'decode',
+                                            space.newtext('raw-unicode-escape')))
+            elif op == opcodes.BINUNICODE:
+                self.load_binunicode()
+            elif op == opcodes.EMPTY_TUPLE:
+                self.push(space.newtuple([]))
+            elif op == opcodes.TUPLE:
+                self.push(space.newtuple(self.pop_mark()[:]))
+            elif op == opcodes.TUPLE1:
+                w_a = self.pop()
+                self.push(space.newtuple([w_a]))
+            elif op == opcodes.TUPLE2:
+                w_b = self.pop()
+                w_a = self.pop()
+                self.push(space.newtuple([w_a, w_b]))
+            elif op == opcodes.TUPLE3:
+                w_c = self.pop()
+                w_b = self.pop()
+                w_a = self.pop()
+                self.push(space.newtuple([w_a, w_b, w_c]))
+            elif op == opcodes.EMPTY_LIST:
+                self.push(space.newlist([]))
+            elif op == opcodes.LIST:
+                self.push(space.newlist(self.pop_mark()))
+            elif op == opcodes.EMPTY_DICT:
+                self.push(space.newdict())
+            elif op == opcodes.DICT:
+                items_w = self.pop_mark()
+                w_dict = space.newdict()
+                self.setitems(w_dict, items_w)
+                self.push(w_dict)
+            elif op == opcodes.APPEND:
+                w_item = self.pop()
+                w_list = self.top()
+                if type(w_list) is W_ListObject:
+                    w_list.append(w_item)
+                else:
+                    space.call_method(w_list, 'append', w_item)
+            elif op == opcodes.APPENDS:
+                w_items = space.newlist(self.pop_mark())
+                w_list = self.top()
+                if type(w_list) is W_ListObject:
+                    w_list.extend(w_items)
+                else:
+                    space.call_method(w_list, 'extend', w_items)
+            elif op == opcodes.SETITEM:
+                w_value = self.pop()
+                w_key = self.pop()
+                self.setitem(self.top(), w_key, w_value)
+            elif op == opcodes.SETITEMS:
+                items_w = self.pop_mark()
+                self.setitems(self.top(), items_w)
+            elif op == opcodes.POP:
+                if len(self.stack_w) > self.last_mark():
+                    self.stack_w.pop()
+                elif self.marks:
+                    # like cPickle: POP discards a mark too
+                    self.marks.pop()
+                else:
+                    raise unpickling_error(space,
+                                           "unpickling stack underflow")
+            elif op == opcodes.POP_MARK:
+                self.pop_mark()
+            elif op == opcodes.DUP:
+                self.push(self.top())
+            elif op == opcodes.GET:
+                self.memo_get(self.parse_memo_key(self.readline()))
+            elif op == opcodes.BINGET:
+                self.memo_get(self.read_byte())
+            elif op == opcodes.LONG_BINGET:
+                self.memo_get(self.read_int32())
+            elif op == opcodes.PUT:
+                self.memo[self.parse_memo_key(self.readline())] = self.top()
+            elif op == opcodes.BINPUT:
+                self.memo[self.read_byte()] = self.top()
+            elif op == opcodes.LONG_BINPUT:
+                self.memo[self.read_int32()] = self.top()
+            elif op == opcodes.PROTO:
+                proto = self.read_byte()
+                if not 0 <= proto <= opcodes.HIGHEST_PROTOCOL:
+                    raise oefmt(space.w_ValueError,
+                                "unsupported pickle protocol: %d", proto)
+            else:
+                self.load_callback(op)
+        return self.pop()
+
+    def load_callback(self, op):
+        """ The opcodes that call back into the Unpickler. """
+        space = self.space
+        w_unpickler = self.w_unpickler
+        if op == opcodes.GLOBAL:
+            w_module = space.newbytes(self.readline())
+            w_name = space.newbytes(self.readline())
+            self.push(space.call_method(w_unpickler, 'find_class',
+                                        w_module, w_name))
+        elif op == opcodes.REDUCE:
+            w_args = self.pop()
+            w_func = self.pop()
+            self.push(space.call(w_func, w_args))
+        elif op == opcodes.NEWOBJ:
+            w_args = self.pop()
+            w_cls = self.pop()
+            w_new = space.getattr(w_cls, space.newtext('__new__'))
+            args_w = [w_cls] + space.fixedview(w_args)
+            self.push(space.call(w_new, space.newtuple(args_w)))
+        elif op == opcodes.BUILD:
+            w_state = self.pop()
+            space.call_method(w_unpickler, '_build', self.top(), w_state)
+        elif op == opcodes.INST:
+            w_module = space.newbytes(self.readline())
+            w_name = space.newbytes(self.readline())
+            w_klass = space.call_method(w_unpickler, 'find_class',
+                                        w_module, w_name)
+            w_args = space.newtuple(self.pop_mark()[:])
+            self.push(space.call_method(w_unpickler, '_make_instance',
+                                        w_klass, w_args))
+        elif op == opcodes.OBJ:
+            items_w = self.pop_mark()
+            if not items_w:
+                raise unpickling_error(space, "unpickling stack underflow")
+            w_args = space.newtuple(items_w[1:])
+            self.push(space.call_method(w_unpickler, '_make_instance',
+                                        items_w[0], w_args))
+        elif op == opcodes.EXT1:
+            self.load_extension(self.read_byte())
+        elif op == opcodes.EXT2:
+            x = self.read_byte()
+            self.load_extension(x | (self.read_byte() << 8))
+        elif op == opcodes.EXT4:
+            self.load_extension(self.read_int32())
+        elif op == opcodes.PERSID:
+            w_pid = space.newbytes(self.readline())
+            self.push(space.call_method(w_unpickler, 'persistent_load',
+                                        w_pid))
+        elif op == opcodes.BINPERSID:
+            w_pid = self.pop()
+            self.push(space.call_method(w_unpickler, 'persistent_load',
+                                        w_pid))
+        else:
+            raise unpickling_error(space, "invalid load key, %s." %
+                                   space.text_w(space.repr(
+                                       space.newbytes(op))))
+
+    def load_int(self):
+        space = self.space
+        data = self.readline()
+        if data == opcodes.FALSE[1:-1]:
+            self.push(space.w_False)
+        elif data == opcodes.TRUE[1:-1]:
+            self.push(space.w_True)
+        else:
+            self.push(space.call_function(space.w_int, space.newbytes(data)))
+
+    def load_long(self, n):
+        data = self.read(n)
+        result = rbigint.frombytes(data, 'little', True)
+        self.push(self.space.newlong_from_rbigint(result))
+
+    def load_string(self):
+        space = self.space
+        rep = self.readline()
+        if (len(rep) < 2 or rep[0] != rep[len(rep) - 1] or
+                (rep[0] != "'" and rep[0] != '"')):
+            raise oefmt(space.w_ValueError, "insecure string pickle")
+        end = len(rep) - 1
+        assert end >= 1
+        w_rep = space.newbytes(rep[1:end])
+        self.push(space.call_method(w_rep, 'decode',
+                                    space.newtext('string-escape')))
+
+    def load_binunicode(self):
+        space = self.space
+        data = self.read(self.read_int32())
+        try:
+            length = rutf8.check_utf8(data, True)
+        except rutf8.CheckError:
+            # let the codec raise the error
+            self.push(space.call_method(space.newbytes(data), 'decode',
+                                        space.newtext('utf-8')))
+        else:
+            self.push(space.newutf8(data, length))
+
+    def load_extension(self, code):
+        space = self.space
+        self.push(space.call_method(self.w_unpickler, '_get_extension',
+                                    space.newint(code)))
+
+    def setitem(self, w_dict, w_key, w_value):
+        if type(w_dict) is W_DictObject:
+            w_dict.setitem(w_key, w_value)
+        else:
+            self.space.setitem(w_dict, w_key, w_value)
+
+    def setitems(self, w_dict, items_w):
+        if len(items_w) & 1:
+            raise unpickling_error(self.space,
+                                   "odd number of items for DICT or SETITEMS")
+        for i in range(0, len(items_w), 2):
+            self.setitem(w_dict, items_w[i], items_w[i + 1])
+
+    def parse_memo_key(self, data):
+        try:
+            return string_to_int(data)
+        except (ParseStringError, ParseStringOverflowError):
+            raise unpickling_error(self.space,
+                                   "invalid memo key %s" % (data,))
+
+    def memo_get(self, key):
+        try:
+            w_obj = self.memo[key]
+        except KeyError:
+            raise OperationError(self.space.w_KeyError,
+                                 self.space.newtext(str(key)))
+        self.push(w_obj)
+
+
+def loads(space, w_data, w_unpickler):
+    """loads(data, unpickler)
+
+Load a pickle from a string or buffer, without copying it.  The opcodes
+that call back into Python code call the methods of 'unpickler'."""
+    buf = space.readbuf_w(w_data)
+    return Loader(space, buf, w_unpickler).load()
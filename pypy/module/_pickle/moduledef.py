@@ -0,0 +1,12 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """RPython speedups for cPickle: saving and loading the builtin types
+    at interp-level."""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'Saver' : 'interp_pickle.W_Saver',
+        'loads' : 'interp_unpickle.loads',
+        }
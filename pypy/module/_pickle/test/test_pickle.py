@@ -0,0 +1,169 @@
+class AppTestPickle:
+    spaceconfig = dict(usemodules=['_pickle', 'struct', 'binascii'])
+
+    def w_import_cPickle(self):
+        import cPickle
+        assert cPickle._Saver is not None
+        return cPickle
+
+    def test_same_output_as_pickle(self):
+        import pickle, StringIO
+        cPickle = self.import_cPickle()
+        class SlowPickler(cPickle.Pickler):
+            # not using the interp-level Saver
+            def save(self, obj):
+                cPickle.Pickler.save(self, obj)
+        values = [None, True, False, 0, 1, 255, 256, 65535, 65536, -1,
+                  2 ** 31 - 1, -2 ** 31, 2 ** 40, -2 ** 40, 0L, 1L, -1L,
+                  255L, 2 ** 100, -2 ** 100, 1.5, -0.0, 1e300, '',
+                  'abc', 'a\n\'"\x00\xff', 'x' * 300, u'abc', u'\xe9\u1234',
+                  (), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4), [], [1, 2, 3],
+                  [1.5, 2.5], ['a', 'b'], {}, {'a': 1}]
+        for proto in range(3):
+            for value in values:
+                data = cPickle.dumps(value, proto)
+                f = StringIO.StringIO()
+                SlowPickler(f, proto).dump(value)
+                assert data == f.getvalue()
+                assert cPickle.loads(data) == value
+                assert type(cPickle.loads(data)) is type(value)
+                assert pickle.loads(data) == value
+
+    def test_batches(self):
+        cPickle = self.import_cPickle()
+        for value in [range(2500), map(float, range(2500)),
+                      map(str, range(2500)), dict.fromkeys(range(2500))]:
+            for proto in range(3):
+                data = cPickle.dumps(value, proto)
+                assert cPickle.loads(data) == value
+            if isinstance(value, list):
+                assert data.count('e') >= 3     # APPENDS
+            else:
+                assert data.count('u') >= 3     # SETITEMS
+
+    def test_memo_shared(self):
+        cPickle = self.import_cPickle()
+        for proto in range(3):
+            s = 'shared string'
+            l = [1, 2]
+            value = [s, s, l, (l, s), {'k': l}]
+            result = cPickle.loads(cPickle.dumps(value, proto))
+            assert result == value
+            assert result[0] is result[1]
+            assert result[2] is result[3][0] is result[4]['k']
+
+    def test_recursive(self):
+        cPickle = self.import_cPickle()
+        for proto in range(3):
+            l = []
+            l.append(l)
+            result = cPickle.loads(cPickle.dumps(l, proto))
+            assert result[0] is result
+            d = {}
+            t = (d, 5)
+            d['t'] = t
+            result = cPickle.loads(cPickle.dumps(t, proto))
+            assert result[0]['t'] is result
+            l = []
+            t = (l,)
+            l.append(t)
+            result = cPickle.loads(cPickle.dumps(l, proto))
+            assert result[0][0] is result
+
+    def test_fallback(self):
+        cPickle = self.import_cPickle()
+        import collections
+        class MyList(list):
+            pass
+        MyList.__module__ = collections.__name__
+        collections.MyList = MyList
+        try:
+            for proto in range(3):
+                value = [MyList([1, 2]), collections.OrderedDict(a=[1]),
+                         u'\xe9', set([3]), 5j]
+                result = cPickle.loads(cPickle.dumps(value, proto))
+                assert result == value
+                assert type(result[0]) is MyList
+                assert type(result[1]) is collections.OrderedDict
+        finally:
+            del collections.MyList
+
+    def test_subclassed_pickler(self):
+        cPickle = self.import_cPickle()
+        import StringIO
+        class PersPickler(cPickle.Pickler):
+            def persistent_id(self, obj):
+                if obj == 42:
+                    return 'answer'
+        f = StringIO.StringIO()
+        PersPickler(f, 2).dump([1, 42])
+        u = cPickle.Unpickler(StringIO.StringIO(f.getvalue()))
+        u.persistent_load = lambda pid: pid
+        assert u.load() == [1, 'answer']
+
+    def test_persistent_id_on_instance(self):
+        cPickle = self.import_cPickle()
+        import StringIO
+        seen = []
+        def persistent_id(obj):
+            seen.append(obj)
+            if obj == 42:
+                return 'answer'
+        for proto in range(3):
+            del seen[:]
+            f = StringIO.StringIO()
+            p = cPickle.Pickler(f, proto)
+            p.persistent_id = persistent_id
+            p.dump([1, 42, 'a'])
+            if proto == 0:
+                assert seen == [[1, 42, 'a'], 1, 42, 'a']
+            else:
+                # the binary protocols save the persistent id too
+                assert seen == [[1, 42, 'a'], 1, 42, 'answer', 'a']
+            u = cPickle.Unpickler(StringIO.StringIO(f.getvalue()))
+            u.persistent_load = lambda pid: pid
+            assert u.load() == [1, 'answer', 'a']
+
+    def test_fast(self):
+        cPickle = self.import_cPickle()
+        import StringIO
+        f = StringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.fast = 1
+        p.dump(['a', 'a'])
+        assert 'q' not in f.getvalue()      # no BINPUT
+        assert cPickle.loads(f.getvalue()) == ['a', 'a']
+
+    def test_loads_buffers(self):
+        cPickle = self.import_cPickle()
+        data = cPickle.dumps([1, 'abc', {2: 3.5}], 2)
+        for x in [buffer(data), bytearray(data), memoryview(data)]:
+            assert cPickle.loads(x) == [1, 'abc', {2: 3.5}]
+
+    def test_loads_errors(self):
+        cPickle = self.import_cPickle()
+        data = cPickle.dumps([1, 2, 3], 2)
+        raises(EOFError, cPickle.loads, data[:-1])
+        raises(EOFError, cPickle.loads, '')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'z.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 't.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'a.')
+        raises(KeyError, cPickle.loads, 'h\x05.')
+        raises(ValueError, cPickle.loads, '\x80\x05.')
+        raises(ValueError, cPickle.loads, "S'abc\n.")
+        # odd number of items for DICT and SETITEMS
+        raises(cPickle.UnpicklingError, cPickle.loads, '(K\x01d.')
+        raises(cPickle.UnpicklingError, cPickle.loads,
+               '}(K\x01K\x02K\x03u.')
+
+    def test_loads_opcodes_with_callbacks(self):
+        cPickle = self.import_cPickle()
+        import collections
+        value = collections.OrderedDict([('a', 1), ('b', [2])])
+        for proto in range(3):
+            assert cPickle.loads(cPickle.dumps(value, proto)) == value
+        # INST and OBJ, as written by protocols 0 and 1 for old-style classes
+        result = cPickle.loads("(icollections\nOrderedDict\n(dp1\nb.")
+        assert type(result) is collections.OrderedDict
+        result = cPickle.loads("(ccollections\nOrderedDict\no}b.")
+        assert type(result) is collections.OrderedDict
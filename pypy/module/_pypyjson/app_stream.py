@@ -0,0 +1,15 @@
+def iterload(f, lines=False, chunk_size=65536):
+    """Iterate over the items of the JSON array read from the file-like
+    object 'f', or over the newline-delimited JSON values read from it if
+    'lines' is true.  Only the values not yet returned are kept in memory,
+    so this can be used on documents too large to be loaded at once."""
+    from _pypyjson import StreamDecoder
+    decoder = StreamDecoder(lines)
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        for value in decoder.feed(data):
+            yield value
+    for value in decoder.close():
+        yield value
@@ -1,6 +1,14 @@
+import math
 from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rfloat import isfinite
 from rpython.rlib import rutf8
-from pypy.interpreter import unicodehelper
+from pypy.interpreter import gateway, unicodehelper
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.objspace.std.bytesobject import W_BytesObject
+from pypy.objspace.std.dictmultiobject import W_DictObject
+from pypy.objspace.std.floatobject import float_repr
+from pypy.objspace.std.intobject import W_IntObject
 
 
 HEX = '0123456789abcdef'
@@ -16,17 +24,21 @@ ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
                        for _i in range(32)]
 
 
+def _first_special_char(s):
+    for i in range(len(s)):
+        c = s[i]
+        if c >= ' ' and c <= '~' and c != '"' and c != '\\':
+            pass
+        else:
+            return i
+    return -1
+
+
 def raw_encode_basestring_ascii(space, w_string):
     if space.isinstance_w(w_string, space.w_bytes):
         s = space.bytes_w(w_string)
-        for i in range(len(s)):
-            c = s[i]
-            if c >= ' ' and c <= '~' and c != '"' and c != '\\':
-                pass
-            else:
-                first = i
-                break
-        else:
+        first = _first_special_char(s)
+        if first < 0:
             # the input is a string with only non-special ascii chars
             return w_string
 
@@ -44,7 +56,14 @@ def raw_encode_basestring_ascii(space, w_string):
         s = space.utf8_w(w_string)
         sb = StringBuilder(len(s))
         first = 0
+    _escape_utf8(sb, s, first)
+    res = sb.build()
+    return space.newtext(res)
+
 
+def _escape_utf8(sb, s, first):
+    """Append to 'sb' the escaped form of the utf-8 string 's', starting
+    at the character index 'first' (all characters before are ascii)."""
     it = rutf8.Utf8StringIterator(s)
     for i in range(first):
         it.next()
@@ -77,5 +96,305 @@ def raw_encode_basestring_ascii(space, w_string):
                 sb.append(HEX[(s2 >> 4) & 0x0f])
                 sb.append(HEX[s2 & 0x0f])
 
-    res = sb.build()
-    return space.newtext(res)
+
+def _encode_bytes(space, sb, s):
+    sb.append('"')
+    first = _first_special_char(s)
+    if first < 0:
+        sb.append(s)
+    else:
+        unicodehelper.check_utf8_or_raise(space, s)
+        sb.append_slice(s, 0, first)
+        _escape_utf8(sb, s, first)
+    sb.append('"')
+
+def _encode_string(space, sb, w_string):
+    if type(w_string) is W_BytesObject:
+        _encode_bytes(space, sb, space.bytes_w(w_string))
+    else:
+        sb.append('"')
+        sb.append(space.bytes_w(raw_encode_basestring_ascii(space, w_string)))
+        sb.append('"')
+
+
+app = gateway.applevel('''
+    def sorted_items(d):
+        return sorted(d.items(), key=lambda kv: kv[0])
+''', filename=__file__)
+
+sorted_items = app.interphook('sorted_items')
+
+
+class JSONEncoder(object):
+    """Walks an object and writes its ASCII-only JSON representation to a
+    StringBuilder.  This is the same algorithm as the pure Python encoder
+    in lib-python's json/encoder.py, which it replaces when ensure_ascii
+    is true and the encoding is utf-8."""
+
+    def __init__(self, space, skipkeys, check_circular, allow_nan,
+                 sort_keys, w_indent, item_separator, key_separator,
+                 w_default):
+        self.space = space
+        self.skipkeys = skipkeys
+        self.check_circular = check_circular
+        self.allow_nan = allow_nan
+        self.sort_keys = sort_keys
+        self.use_indent = not space.is_none(w_indent)
+        self.indent = 0
+        if self.use_indent:
+            self.indent = space.int_w(w_indent)
+        self.item_separator = item_separator
+        self.key_separator = key_separator
+        self.w_default = w_default
+        self.markers_w = []
+        self.depth = 0
+        self.sb = StringBuilder()
+
+    def encode(self, w_obj):
+        self._encode(w_obj, 0)
+        return self.sb.build()
+
+    def _mark(self, w_obj):
+        if self.check_circular:
+            space = self.space
+            for w_marker in self.markers_w:
+                if space.is_w(w_marker, w_obj):
+                    raise oefmt(space.w_ValueError,
+                                "Circular reference detected")
+            self.markers_w.append(w_obj)
+        self.depth += 1
+        if self.depth > self.space.sys.recursionlimit:
+            raise oefmt(self.space.w_RuntimeError,
+                        "maximum recursion depth exceeded while encoding a "
+                        "JSON object")
+
+    def _unmark(self):
+        if self.check_circular:
+            self.markers_w.pop()
+        self.depth -= 1
+
+    def _encode(self, w_obj, indent_level):
+        space = self.space
+        sb = self.sb
+        if space.isinstance_w(w_obj, space.w_basestring):
+            _encode_string(space, sb, w_obj)
+        elif space.is_w(w_obj, space.w_None):
+            sb.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            sb.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            sb.append('false')
+        elif type(w_obj) is W_IntObject:
+            sb.append(str(space.int_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            sb.append(space.text_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            self._encode_float(space.float_w(w_obj))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+              space.isinstance_w(w_obj, space.w_tuple)):
+            self._encode_list(w_obj, indent_level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self._encode_dict(w_obj, indent_level)
+        else:
+            self._encode_default(w_obj, indent_level)
+
+    def _encode_default(self, w_obj, indent_level):
+        self._mark(w_obj)
+        w_res = self.space.call_function(self.w_default, w_obj)
+        self._encode(w_res, indent_level)
+        self._unmark()
+
+    def _float_to_str(self, x):
+        if isfinite(x):
+            return float_repr(x)
+        if not self.allow_nan:
+            raise oefmt(self.space.w_ValueError,
+                        "Out of range float values are not JSON compliant: "
+                        "%s", float_repr(x))
+        if math.isnan(x):
+            return 'NaN'
+        elif x > 0.0:
+            return 'Infinity'
+        else:
+            return '-Infinity'
+
+    def _encode_float(self, x):
+        self.sb.append(self._float_to_str(x))
+
+    def _emit_indent(self, indent_level):
+        """Write the newline and indentation after an opening bracket and
+        return the separator to write between the items."""
+        if not self.use_indent:
+            return self.item_separator
+        newline_indent = '\n' + ' ' * max(0, self.indent * indent_level)
+        self.sb.append(newline_indent)
+        return self.item_separator + newline_indent
+
+    def _emit_unindent(self, indent_level):
+        if self.use_indent:
+            self.sb.append('\n')
+            self.sb.append(' ' * max(0, self.indent * (indent_level - 1)))
+
+    def _encode_list(self, w_list, indent_level):
+        space = self.space
+        sb = self.sb
+        if space.len_w(w_list) == 0:
+            sb.append('[]')
+            return
+        self._mark(w_list)
+        sb.append('[')
+        indent_level += 1
+        separator = self._emit_indent(indent_level)
+        # fast paths for the lists that don't store boxed items; they
+        # don't contain containers, so they don't need the markers
+        intlist = None
+        floatlist = None
+        byteslist = None
+        if space.isinstance_w(w_list, space.w_list):
+            intlist = space.listview_int(w_list)
+            if intlist is None:
+                floatlist = space.listview_float(w_list)
+                if floatlist is None:
+                    byteslist = space.listview_bytes(w_list)
+        if intlist is not None:
+            for i in range(len(intlist)):
+                if i > 0:
+                    sb.append(separator)
+                sb.append(str(intlist[i]))
+        elif floatlist is not None:
+            for i in range(len(floatlist)):
+                if i > 0:
+                    sb.append(separator)
+                self._encode_float(floatlist[i])
+        elif byteslist is not None:
+            for i in range(len(byteslist)):
+                if i > 0:
+                    sb.append(separator)
+                _encode_bytes(space, sb, byteslist[i])
+        else:
+            items_w = space.fixedview(w_list)
+            for i in range(len(items_w)):
+                if i > 0:
+                    sb.append(separator)
+                self._encode(items_w[i], indent_level)
+        self._emit_unindent(indent_level)
+        sb.append(']')
+        self._unmark()
+
+    def _encode_dict(self, w_dict, indent_level):
+        space = self.space
+        sb = self.sb
+        if space.len_w(w_dict) == 0:
+            sb.append('{}')
+            return
+        self._mark(w_dict)
+        sb.append('{')
+        indent_level += 1
+        separator = self._emit_indent(indent_level)
+        first = True
+        if type(w_dict) is W_DictObject:
+            if self.sort_keys:
+                # fast path: sort the unwrapped keys
+                keys = w_dict.listview_bytes()
+                if keys is not None:
+                    keys = keys[:]
+                    keys.sort()
+                    for key in keys:
+                        w_value = w_dict.getitem_str(key)
+                        if w_value is None:
+                            self._raise_dict_changed()
+                        first = self._encode_item(space.newbytes(key),
+                                    w_value, first, separator, indent_level)
+                else:
+                    w_items = sorted_items(space, w_dict)
+                    first = self._encode_items(w_items, first, separator,
+                                               indent_level)
+            else:
+                iterator = w_dict.iteritems()
+                while True:
+                    w_key, w_value = iterator.next_item()
+                    if w_key is None:
+                        break
+                    first = self._encode_item(w_key, w_value, first,
+                                              separator, indent_level)
+        else:
+            # dict subclasses may override items() and iteritems()
+            if self.sort_keys:
+                w_items = sorted_items(space, w_dict)
+            else:
+                w_items = space.call_method(w_dict, 'iteritems')
+            first = self._encode_items(w_items, first, separator,
+                                       indent_level)
+        self._emit_unindent(indent_level)
+        sb.append('}')
+        self._unmark()
+
+    def _raise_dict_changed(self):
+        raise oefmt(self.space.w_RuntimeError,
+                    "dictionary changed during iteration")
+
+    def _encode_items(self, w_items, first, separator, indent_level):
+        space = self.space
+        w_iter = space.iter(w_items)
+        while True:
+            try:
+                w_item = space.next(w_iter)
+            except OperationError as e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            w_key, w_value = space.fixedview(w_item, 2)
+            first = self._encode_item(w_key, w_value, first, separator,
+                                      indent_level)
+        return first
+
+    def _encode_item(self, w_key, w_value, first, separator, indent_level):
+        """Write one 'key: value' pair of a dict, preceded by the separator
+        unless it is the first one.  Returns the new value of 'first'."""
+        space = self.space
+        sb = self.sb
+        if space.isinstance_w(w_key, space.w_basestring):
+            key = None
+        # JavaScript is weakly typed for these, so it makes sense to
+        # also allow them.  Many encoders seem to do something like this.
+        elif space.isinstance_w(w_key, space.w_float):
+            key = self._float_to_str(space.float_w(w_key))
+        elif space.is_w(w_key, space.w_True):
+            key = 'true'
+        elif space.is_w(w_key, space.w_False):
+            key = 'false'
+        elif space.is_w(w_key, space.w_None):
+            key = 'null'
+        elif (space.isinstance_w(w_key, space.w_int) or
+              space.isinstance_w(w_key, space.w_long)):
+            key = space.text_w(space.str(w_key))
+        elif self.skipkeys:
+            return first
+        else:
+            raise oefmt(space.w_TypeError, "key %R is not a string", w_key)
+        if not first:
+            sb.append(separator)
+        if key is None:
+            _encode_string(space, sb, w_key)
+        else:
+            sb.append('"')
+            sb.append(key)
+            sb.append('"')
+        sb.append(self.key_separator)
+        self._encode(w_value, indent_level)
+        return False
+
+
+@unwrap_spec(skipkeys=bool, check_circular=bool, allow_nan=bool,
+             sort_keys=bool, item_separator='text', key_separator='text')
+def encode(space, w_obj, skipkeys, check_circular, allow_nan, sort_keys,
+           w_indent, item_separator, key_separator, w_default):
+    """Return the ASCII-only JSON representation of 'w_obj' as a str.
+    The arguments are the corresponding attributes of a
+    json.JSONEncoder; 'w_default' is called with the objects that
+    cannot be serialized otherwise."""
+    encoder = JSONEncoder(space, skipkeys, check_circular, allow_nan,
+                          sort_keys, w_indent, item_separator, key_separator,
+                          w_default)
+    return space.newbytes(encoder.encode(w_obj))
@@ -0,0 +1,209 @@
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, oefmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.module._pypyjson.interp_decoder import JSONDecoder, is_whitespace
+
+# states of a decoder in array mode
+ARRAY_START = 0     # before the opening '['
+ARRAY_ITEMS = 1     # after the opening '[' or after a ','
+ARRAY_END = 2       # after the closing ']'
+
+
+class W_StreamDecoder(W_Root):
+    """ Decodes a JSON document that is fed to it in chunks, returning the
+    values as soon as they are complete: either the items of a top-level
+    array, or the values of a newline-delimited stream (one JSON document
+    per line).
+
+    The chunks are first scanned to find the end of the last complete value
+    in them, keeping track of the nesting depth and of the strings. The data
+    up to there is decoded in one go by a JSONDecoder, and only the rest is
+    kept for the next chunks. The same JSONDecoder is used for the whole
+    stream, so the string cache and the key maps are shared between all the
+    values. """
+
+    def __init__(self, space, lines):
+        self.space = space
+        self.lines = lines
+        self.decoder = None
+        self.closed = False
+        self.consumed = 0       # number of bytes already decoded
+        self.pending = []       # chunks after the last complete value
+        self.state = ARRAY_START
+        # scanner state, at the end of the pending chunks
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def _check_closed(self):
+        if self.closed:
+            raise oefmt(self.space.w_ValueError, "decoder is closed")
+
+    def _scan(self, chunk):
+        """ Return the index in chunk of the character that ends the last
+        complete value, or -1. """
+        last = -1
+        depth = self.depth
+        in_string = self.in_string
+        escape = self.escape
+        for i in range(len(chunk)):
+            ch = chunk[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == '\\':
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == '[' or ch == '{':
+                depth += 1
+            elif ch == ']' or ch == '}':
+                depth -= 1
+                if depth <= 0 and not self.lines:
+                    last = i
+            elif ch == ',':
+                if depth == 1 and not self.lines:
+                    last = i
+            elif ch == '\n':
+                if depth <= 0 and self.lines:
+                    last = i
+        self.depth = depth
+        self.in_string = in_string
+        self.escape = escape
+        return last
+
+    def _decode(self, s, values_w):
+        """ Decode the values in s, which ends with a complete value, and
+        append them to values_w. """
+        if self.decoder is None:
+            self.decoder = JSONDecoder(self.space, s)
+        else:
+            self.decoder.set_buffer(s)
+        decoder = self.decoder
+        self.consumed += len(s)
+        decoder.cache_strings = (
+            self.consumed >= JSONDecoder.MIN_SIZE_FOR_STRING_CACHE)
+        try:
+            if self.lines:
+                self._decode_lines(decoder, s, values_w)
+            else:
+                self._decode_array_items(decoder, s, values_w)
+        except OperationError:
+            self.closed = True
+            raise
+        finally:
+            decoder.free_buffer()
+            decoder.cleanup_unclear_objects()
+
+    def _decode_lines(self, decoder, s, values_w):
+        i = 0
+        while True:
+            i = decoder.skip_whitespace(i)
+            if i >= len(s):
+                break
+            values_w.append(decoder.decode_any(i))
+            i = decoder.pos
+
+    def _decode_array_items(self, decoder, s, values_w):
+        i = 0
+        while True:
+            i = decoder.skip_whitespace(i)
+            if i >= len(s):
+                break
+            ch = s[i]
+            if self.state == ARRAY_START:
+                if ch != '[':
+                    decoder._raise("Expected a JSON array: unexpected '%s' "
+                                   "at char %d", ch, i)
+                self.state = ARRAY_ITEMS
+                i = decoder.skip_whitespace(i + 1)
+                if decoder.ll_chars[i] == ']':
+                    self.state = ARRAY_END
+                    i += 1
+            elif self.state == ARRAY_ITEMS:
+                values_w.append(decoder.decode_any(i))
+                i = decoder.skip_whitespace(decoder.pos)
+                ch = decoder.ll_chars[i]
+                if ch == ']':
+                    self.state = ARRAY_END
+                elif ch != ',':
+                    decoder._raise("Unexpected '%s' when decoding array "
+                                   "(char %d)", ch, i)
+                i += 1
+            else:
+                decoder._raise("Extra data: char %d - %d", i, len(s) - 1)
+
+    def descr_feed(self, space, w_data):
+        """ Add the next chunk of the document, and return the list of the
+        values that it completes. """
+        self._check_closed()
+        if space.isinstance_w(w_data, space.w_unicode):
+            raise oefmt(space.w_TypeError,
+                        "Expected utf8-encoded str, got unicode")
+        data = space.bufferstr_w(w_data)
+        values_w = []
+        last = self._scan(data)
+        if last < 0:
+            if data:
+                self.pending.append(data)
+        else:
+            self.pending.append(data[:last + 1])
+            s = ''.join(self.pending)
+            self.pending = []
+            if last + 1 < len(data):
+                self.pending.append(data[last + 1:])
+            self._decode(s, values_w)
+        return space.newlist(values_w)
+
+    def descr_close(self, space):
+        """ Signal the end of the document, and return the list of the values
+        that were not complete yet. Raises ValueError if the document is
+        incomplete. """
+        self._check_closed()
+        values_w = []
+        s = ''.join(self.pending)
+        self.pending = []
+        if self.lines:
+            if s:
+                self._decode(s, values_w)
+        else:
+            for i in range(len(s)):
+                if not is_whitespace(s[i]):
+                    if self.state == ARRAY_END:
+                        self.closed = True
+                        raise oefmt(space.w_ValueError,
+                                    "Extra data after the end of the array")
+                    break
+            if self.state != ARRAY_END:
+                self.closed = True
+                if self.state == ARRAY_START:
+                    raise oefmt(space.w_ValueError,
+                                "No JSON array could be decoded")
+                raise oefmt(space.w_ValueError, "Unterminated array")
+        self.closed = True
+        return space.newlist(values_w)
+
+
+@unwrap_spec(lines=bool)
+def W_StreamDecoder___new__(space, w_subtype, lines=False):
+    w_decoder = space.allocate_instance(W_StreamDecoder, w_subtype)
+    decoder = space.interp_w(W_StreamDecoder, w_decoder)
+    W_StreamDecoder.__init__(decoder, space, lines)
+    return w_decoder
+
+
+W_StreamDecoder.typedef = TypeDef(
+    '_pypyjson.StreamDecoder',
+    __new__ = interp2app(W_StreamDecoder___new__),
+    feed = interp2app(W_StreamDecoder.descr_feed),
+    close = interp2app(W_StreamDecoder.descr_close),
+    __doc__ = """StreamDecoder(lines=False)
+
+Incremental JSON decoder. Feed it the document in chunks with feed(),
+which returns the values completed by each chunk, then call close().
+By default the document must be an array, and its items are returned
+one by one. With lines=True, the document is a sequence of JSON values
+separated by newlines.""")
@@ -110,7 +110,7 @@ class TestJson(object):
         for s1 in ["abc", u"ä".encode("utf-8")]:
             s = '"%s"   "%s"    "%s"' % (s1, s1, s1)
             dec = JSONDecoder(self.space, s)
-            dec.MIN_SIZE_FOR_STRING_CACHE = 0
+            dec.cache_strings = True
             assert dec.pos == 0
             w_x = dec.decode_string(1)
             w_y = dec.decode_string(dec.skip_whitespace(dec.pos) + 1)
@@ -274,7 +274,7 @@ class TestJson(object):
 
 
 class AppTest(object):
-    spaceconfig = {"objspace.usemodules._pypyjson": True}
+    spaceconfig = dict(usemodules=["_pypyjson", "struct"])
 
     def test_raise_on_unicode(self):
         import _pypyjson
@@ -513,6 +513,183 @@ class AppTest(object):
         assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
         assert check("\x07") == "\\u0007"
 
+    def test_encode(self):
+        import _pypyjson
+        def encode(obj, skipkeys=False, check_circular=True, allow_nan=True,
+                   sort_keys=False, indent=None, item_separator=', ',
+                   key_separator=': ', default=None):
+            return _pypyjson.encode(obj, skipkeys, check_circular, allow_nan,
+                                    sort_keys, indent, item_separator,
+                                    key_separator, default)
+        assert encode(None) == 'null'
+        assert encode(True) == 'true'
+        assert encode(False) == 'false'
+        assert encode(42) == '42'
+        assert encode(-12345678901234567890) == '-12345678901234567890'
+        assert encode(1.5) == '1.5'
+        assert encode(1e100) == '1e+100'
+        assert encode(float('inf')) == 'Infinity'
+        assert encode(float('-inf')) == '-Infinity'
+        assert encode(float('nan')) == 'NaN'
+        raises(ValueError, encode, float('nan'), allow_nan=False)
+        assert encode("a\"b") == '"a\\"b"'
+        assert encode(u"\u1234") == '"\\u1234"'
+        raises(UnicodeDecodeError, encode, "\xc0")
+        assert encode([]) == '[]'
+        assert encode(()) == '[]'
+        assert encode({}) == '{}'
+        assert encode([1, 2, 3]) == '[1, 2, 3]'
+        assert encode([1.5, 2.0]) == '[1.5, 2.0]'
+        assert encode(["a", "\n"]) == '["a", "\\n"]'
+        assert encode([1, "a", None, (2.5, [])]) == '[1, "a", null, [2.5, []]]'
+        assert encode({"a": 1}) == '{"a": 1}'
+        assert encode({1: 2}) == '{"1": 2}'
+        assert encode({2.5: 2, True: 3}, sort_keys=True) == (
+            '{"true": 3, "2.5": 2}')
+        assert encode({None: [{}]}) == '{"null": [{}]}'
+        raises(TypeError, encode, {(1,): 2})
+        assert encode({(1,): 2, "a": 3}, skipkeys=True) == '{"a": 3}'
+
+    def test_encode_sort_keys_and_indent(self):
+        import _pypyjson
+        d = {"b": [1, {"c": 2, "a": 3}], "a": None}
+        assert _pypyjson.encode(d, False, True, True, True, None, ',', ':',
+                                None) == '{"a":null,"b":[1,{"a":3,"c":2}]}'
+        d = {3: "x", 1: "y", 2: "z"}
+        assert _pypyjson.encode(d, False, True, True, True, None, ',', ':',
+                                None) == '{"1":"y","2":"z","3":"x"}'
+        d = {"b": [1, 2], "a": {}}
+        assert _pypyjson.encode(d, False, True, True, True, 2, ',', ': ',
+                                None) == (
+            '{\n  "a": {},\n  "b": [\n    1,\n    2\n  ]\n}')
+
+    def test_encode_subclasses(self):
+        import _pypyjson
+        class MyInt(int):
+            def __str__(self):
+                return "17"
+        class MyDict(dict):
+            def iteritems(self):
+                yield "x", 1
+        class MyList(list):
+            def __iter__(self):
+                yield 5
+        def encode(obj):
+            return _pypyjson.encode(obj, False, True, True, False, None,
+                                    ', ', ': ', None)
+        assert encode(MyInt(3)) == '17'
+        assert encode(MyDict(a=2)) == '{"x": 1}'
+        assert encode(MyList([1, 2])) == '[5]'
+
+    def test_encode_default(self):
+        import _pypyjson
+        class Point(object):
+            def __init__(self, x, y):
+                self.x = x
+                self.y = y
+        def default(obj):
+            if isinstance(obj, Point):
+                return [obj.x, obj.y]
+            if isinstance(obj, complex):
+                return obj
+            raise TypeError("not serializable")
+        def encode(obj, check_circular=True):
+            return _pypyjson.encode(obj, False, check_circular, True, False,
+                                    None, ', ', ': ', default)
+        assert encode({"p": Point(1, 2)}) == '{"p": [1, 2]}'
+        raises(TypeError, encode, object())
+        exc = raises(ValueError, encode, 1j)
+        assert str(exc.value) == "Circular reference detected"
+        raises(RuntimeError, encode, 1j, check_circular=False)
+
+    def test_encode_circular(self):
+        import _pypyjson
+        def encode(obj):
+            return _pypyjson.encode(obj, False, True, True, False,
+                                    None, ', ', ': ', None)
+        l = [1]
+        l.append(l)
+        raises(ValueError, encode, l)
+        d = {}
+        d["a"] = [d]
+        raises(ValueError, encode, d)
+        x = []
+        assert encode([x, x]) == '[[], []]'
+        x.append(1)
+        assert encode([x, x]) == '[[1], [1]]'
+
+    def test_json_dumps(self):
+        import json
+        obj = {"a": [1, 2.5, "x", None, True], "b": {"c": u"\xe9"}}
+        assert json.dumps(obj, sort_keys=True) == (
+            '{"a": [1, 2.5, "x", null, true], "b": {"c": "\\u00e9"}}')
+        assert json.dumps(obj, sort_keys=True, ensure_ascii=False) == (
+            u'{"a": [1, 2.5, "x", null, true], "b": {"c": "\xe9"}}')
+        assert json.dumps([1, [2]], indent=1) == '[\n 1, \n [\n  2\n ]\n]'
+
+    def test_stream_decoder_array(self):
+        import _pypyjson
+        doc = '[1, "a,]", {"b": [2, 3]}, [], null ]'
+        for size in [1, 2, 3, 7, len(doc)]:
+            dec = _pypyjson.StreamDecoder()
+            res = []
+            for i in range(0, len(doc), size):
+                res.extend(dec.feed(doc[i:i + size]))
+            res.extend(dec.close())
+            assert res == [1, u"a,]", {u"b": [2, 3]}, [], None]
+        dec = _pypyjson.StreamDecoder()
+        assert dec.feed('[{"a": 1}, {"a"') == [{u"a": 1}]
+        assert dec.feed(': 2}, "\\"x\\"",') == [{u"a": 2}, u'"x"']
+        assert dec.feed(' 3]  ') == [3]
+        assert dec.close() == []
+        raises(ValueError, dec.feed, '[]')
+
+    def test_stream_decoder_array_empty(self):
+        import _pypyjson
+        dec = _pypyjson.StreamDecoder()
+        assert dec.feed(' [') == []
+        assert dec.feed(' ] ') == []
+        assert dec.close() == []
+
+    def test_stream_decoder_array_errors(self):
+        import _pypyjson
+        raises(ValueError, _pypyjson.StreamDecoder().close)
+        raises(ValueError, _pypyjson.StreamDecoder().feed, '{"a": 1}')
+        dec = _pypyjson.StreamDecoder()
+        assert dec.feed('[1, 2') == [1]
+        raises(ValueError, dec.close)
+        dec = _pypyjson.StreamDecoder()
+        raises(ValueError, dec.feed, '[1, ]')
+        dec = _pypyjson.StreamDecoder()
+        assert dec.feed('[1] x') == [1]
+        raises(ValueError, dec.close)
+        raises(TypeError, _pypyjson.StreamDecoder().feed, u'[1]')
+
+    def test_stream_decoder_lines(self):
+        import _pypyjson
+        doc = '{"a": 1}\n{"a": 2, "b": "x\\ny"}\n\n[1,\n 2]\n42\n"end"'
+        for size in [1, 3, len(doc)]:
+            dec = _pypyjson.StreamDecoder(lines=True)
+            res = []
+            for i in range(0, len(doc), size):
+                res.extend(dec.feed(doc[i:i + size]))
+            res.extend(dec.close())
+            assert res == [{u"a": 1}, {u"a": 2, u"b": u"x\ny"}, [1, 2], 42,
+                           u"end"]
+        dec = _pypyjson.StreamDecoder(lines=True)
+        assert dec.feed('{"a": 1}\n{"a"') == [{u"a": 1}]
+        raises(ValueError, dec.close)
+
+    def test_iterload(self):
+        import _pypyjson, StringIO
+        f = StringIO.StringIO('[' + ', '.join(['{"x": %d}' % i
+                                               for i in range(100)]) + ']')
+        it = _pypyjson.iterload(f, chunk_size=16)
+        assert next(it) == {u"x": 0}
+        assert list(it) == [{u"x": i} for i in range(1, 100)]
+        f = StringIO.StringIO('1\n2\n3')
+        assert list(_pypyjson.iterload(f, lines=True, chunk_size=1)) == [1, 2, 3]
+
     def test_error_position(self):
         import _pypyjson
         test_cases = [
@@ -0,0 +1,93 @@
+from rpython.rlib import rsha256
+from rpython.rlib.objectmodel import import_from_mixin
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.typedef import TypeDef
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+
+
+class W_SHA256(W_Root):
+    """
+    A subclass of RSHA256 that can be exposed to app-level.
+    """
+    import_from_mixin(rsha256.RSHA256)
+
+    def __init__(self, space):
+        self.space = space
+        self._init()
+
+    @unwrap_spec(string='bufferstr')
+    def update_w(self, string):
+        self.update(string)
+
+    def digest_w(self):
+        return self.space.newbytes(self.digest())
+
+    def hexdigest_w(self):
+        return self.space.newtext(self.hexdigest())
+
+    def copy_w(self):
+        clone = W_SHA256(self.space)
+        clone._copyfrom(self)
+        return clone
+
+
+class W_SHA224(W_SHA256):
+    """
+    The same with the constants of RSHA224.
+    """
+    _initial_state = rsha256.RSHA224._initial_state
+    digest_size = rsha256.RSHA224.digest_size
+
+    def copy_w(self):
+        clone = W_SHA224(self.space)
+        clone._copyfrom(self)
+        return clone
+
+
+@unwrap_spec(string='bufferstr')
+def W_SHA256___new__(space, w_subtype, string=''):
+    """
+    Create a new sha256 object and call its initializer.
+    """
+    w_sha = space.allocate_instance(W_SHA256, w_subtype)
+    sha = space.interp_w(W_SHA256, w_sha)
+    W_SHA256.__init__(sha, space)
+    sha.update(string)
+    return w_sha
+
+@unwrap_spec(string='bufferstr')
+def W_SHA224___new__(space, w_subtype, string=''):
+    """
+    Create a new sha224 object and call its initializer.
+    """
+    w_sha = space.allocate_instance(W_SHA224, w_subtype)
+    sha = space.interp_w(W_SHA224, w_sha)
+    W_SHA224.__init__(sha, space)
+    sha.update(string)
+    return w_sha
+
+
+W_SHA256.typedef = TypeDef(
+    'sha256',
+    __new__   = interp2app(W_SHA256___new__),
+    update    = interp2app(W_SHA256.update_w),
+    digest    = interp2app(W_SHA256.digest_w),
+    hexdigest = interp2app(W_SHA256.hexdigest_w),
+    copy      = interp2app(W_SHA256.copy_w),
+    digest_size = 32,
+    digestsize = 32,
+    block_size = 64,
+    name = 'SHA256',
+    __doc__   = """sha256([string]) -> return a new SHA-256 hash object.""")
+
+W_SHA224.typedef = TypeDef(
+    'sha224', W_SHA256.typedef,
+    __new__   = interp2app(W_SHA224___new__),
+    update    = interp2app(W_SHA224.update_w),
+    digest    = interp2app(W_SHA224.digest_w),
+    hexdigest = interp2app(W_SHA224.hexdigest_w),
+    copy      = interp2app(W_SHA224.copy_w),
+    digest_size = 28,
+    digestsize = 28,
+    name = 'SHA224',
+    __doc__   = """sha224([string]) -> return a new SHA-224 hash object.""")
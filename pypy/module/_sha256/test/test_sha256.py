@@ -0,0 +1,69 @@
+"""
+Tests for the _sha256 module implemented at interp-level in
+pypy/module/_sha256.
+"""
+
+
+class AppTestSHA256(object):
+    spaceconfig = {
+        'usemodules': ['_sha256', 'binascii', 'time', 'struct'],
+    }
+
+    def setup_class(cls):
+        cls.w__sha256 = cls.space.appexec([], """():
+            import _sha256
+            return _sha256
+        """)
+
+    def test_digest_size(self):
+        d = self._sha256.sha256()
+        assert d.digest_size == 32
+        assert d.block_size == 64
+        assert d.name == 'SHA256'
+        d = self._sha256.sha224()
+        assert d.digest_size == 28
+        assert d.block_size == 64
+        assert d.name == 'SHA224'
+
+    def test_sha256object(self):
+        _sha256 = self._sha256
+        cases = (
+          ("",
+           "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"),
+          ("abc",
+           "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"),
+          ("1234567890" * 8,
+           "f371bc4a311f2b009eef952dd83ca80e2b60026c8e935592d0f9c308453c813e"),
+        )
+        for input, expected in cases:
+            d = _sha256.sha256(input)
+            assert d.hexdigest() == expected
+            assert d.digest() == expected.decode('hex')
+
+    def test_sha224object(self):
+        d = self._sha256.sha224("abc")
+        assert d.hexdigest() == (
+            "23097d223405d8228642a477bda255b32aadbce4bda0b3f7e36c9da7")
+
+    def test_copy(self):
+        _sha256 = self._sha256
+        for cls in [_sha256.sha256, _sha256.sha224]:
+            d1 = cls()
+            d1.update("abcde")
+            d2 = d1.copy()
+            assert type(d2) is cls
+            d2.update("fgh")
+            d1.update("jkl")
+            assert d1.hexdigest() == cls("abcdejkl").hexdigest()
+            assert d2.hexdigest() == cls("abcdefgh").hexdigest()
+
+    def test_buffer(self):
+        d1 = self._sha256.sha256(buffer("abcde"))
+        d1.update(buffer("jkl"))
+        assert d1.hexdigest() == self._sha256.sha256("abcdejkl").hexdigest()
+
+    def test_hashlib(self):
+        import hashlib
+        for name in ['sha256', 'sha224']:
+            assert (hashlib.new(name, "abc").hexdigest() ==
+                    getattr(self._sha256, name)("abc").hexdigest())
@@ -0,0 +1,93 @@
+from rpython.rlib import rsha512
+from rpython.rlib.objectmodel import import_from_mixin
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.typedef import TypeDef
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+
+
+class W_SHA512(W_Root):
+    """
+    A subclass of RSHA512 that can be exposed to app-level.
+    """
+    import_from_mixin(rsha512.RSHA512)
+
+    def __init__(self, space):
+        self.space = space
+        self._init()
+
+    @unwrap_spec(string='bufferstr')
+    def update_w(self, string):
+        self.update(string)
+
+    def digest_w(self):
+        return self.space.newbytes(self.digest())
+
+    def hexdigest_w(self):
+        return self.space.newtext(self.hexdigest())
+
+    def copy_w(self):
+        clone = W_SHA512(self.space)
+        clone._copyfrom(self)
+        return clone
+
+
+class W_SHA384(W_SHA512):
+    """
+    The same with the constants of RSHA384.
+    """
+    _initial_state = rsha512.RSHA384._initial_state
+    digest_size = rsha512.RSHA384.digest_size
+
+    def copy_w(self):
+        clone = W_SHA384(self.space)
+        clone._copyfrom(self)
+        return clone
+
+
+@unwrap_spec(string='bufferstr')
+def W_SHA512___new__(space, w_subtype, string=''):
+    """
+    Create a new sha512 object and call its initializer.
+    """
+    w_sha = space.allocate_instance(W_SHA512, w_subtype)
+    sha = space.interp_w(W_SHA512, w_sha)
+    W_SHA512.__init__(sha, space)
+    sha.update(string)
+    return w_sha
+
+@unwrap_spec(string='bufferstr')
+def W_SHA384___new__(space, w_subtype, string=''):
+    """
+    Create a new sha384 object and call its initializer.
+    """
+    w_sha = space.allocate_instance(W_SHA384, w_subtype)
+    sha = space.interp_w(W_SHA384, w_sha)
+    W_SHA384.__init__(sha, space)
+    sha.update(string)
+    return w_sha
+
+
+W_SHA512.typedef = TypeDef(
+    'sha512',
+    __new__   = interp2app(W_SHA512___new__),
+    update    = interp2app(W_SHA512.update_w),
+    digest    = interp2app(W_SHA512.digest_w),
+    hexdigest = interp2app(W_SHA512.hexdigest_w),
+    copy      = interp2app(W_SHA512.copy_w),
+    digest_size = 64,
+    digestsize = 64,
+    block_size = 128,
+    name = 'SHA512',
+    __doc__   = """sha512([string]) -> return a new SHA-512 hash object.""")
+
+W_SHA384.typedef = TypeDef(
+    'sha384', W_SHA512.typedef,
+    __new__   = interp2app(W_SHA384___new__),
+    update    = interp2app(W_SHA384.update_w),
+    digest    = interp2app(W_SHA384.digest_w),
+    hexdigest = interp2app(W_SHA384.hexdigest_w),
+    copy      = interp2app(W_SHA384.copy_w),
+    digest_size = 48,
+    digestsize = 48,
+    name = 'SHA384',
+    __doc__   = """sha384([string]) -> return a new SHA-384 hash object.""")
@@ -0,0 +1,70 @@
+"""
+Tests for the _sha512 module implemented at interp-level in
+pypy/module/_sha512.
+"""
+
+
+class AppTestSHA512(object):
+    spaceconfig = {
+        'usemodules': ['_sha512', 'binascii', 'time', 'struct'],
+    }
+
+    def setup_class(cls):
+        cls.w__sha512 = cls.space.appexec([], """():
+            import _sha512
+            return _sha512
+        """)
+
+    def test_digest_size(self):
+        d = self._sha512.sha512()
+        assert d.digest_size == 64
+        assert d.block_size == 128
+        assert d.name == 'SHA512'
+        d = self._sha512.sha384()
+        assert d.digest_size == 48
+        assert d.block_size == 128
+        assert d.name == 'SHA384'
+
+    def test_sha512object(self):
+        _sha512 = self._sha512
+        cases = (
+          ("",
+           "cf83e1357eefb8bdf1542850d66d8007d620e4050b5715dc83f4a921d36ce9ce"
+           "47d0d13c5d85f2b0ff8318d2877eec2f63b931bd47417a81a538327af927da3e"),
+          ("1234567890" * 8,
+           "72ec1ef1124a45b047e8b7c75a932195135bb61de24ec0d1914042246e0aec3a"
+           "2354e093d76f3048b456764346900cb130d2a4fd5dd16abb5e30bcb850dee843"),
+        )
+        for input, expected in cases:
+            d = _sha512.sha512(input)
+            assert d.hexdigest() == expected
+            assert d.digest() == expected.decode('hex')
+
+    def test_sha384object(self):
+        d = self._sha512.sha384("abc")
+        assert d.hexdigest() == (
+            "cb00753f45a35e8bb5a03d699ac65007272c32ab0eded163"
+            "1a8b605a43ff5bed8086072ba1e7cc2358baeca134c825a7")
+
+    def test_copy(self):
+        _sha512 = self._sha512
+        for cls in [_sha512.sha512, _sha512.sha384]:
+            d1 = cls()
+            d1.update("abcde")
+            d2 = d1.copy()
+            assert type(d2) is cls
+            d2.update("fgh")
+            d1.update("jkl")
+            assert d1.hexdigest() == cls("abcdejkl").hexdigest()
+            assert d2.hexdigest() == cls("abcdefgh").hexdigest()
+
+    def test_buffer(self):
+        d1 = self._sha512.sha512(buffer("abcde"))
+        d1.update(buffer("jkl"))
+        assert d1.hexdigest() == self._sha512.sha512("abcdejkl").hexdigest()
+
+    def test_hashlib(self):
+        import hashlib
+        for name in ['sha512', 'sha384']:
+            assert (hashlib.new(name, "abc").hexdigest() ==
+                    getattr(self._sha512, name)("abc").hexdigest())
@@ -13,7 +13,7 @@ from rpython.rlib.rstring import StringBuilder
 #
 # Constants and exposed functions
 
-from rpython.rlib.rsre import rsre_core, rsre_utf8
+from rpython.rlib.rsre import rsre_core, rsre_dfa, rsre_utf8
 from rpython.rlib.rsre.rsre_char import CODESIZE, MAXREPEAT, getlower, set_unicode_db
 
 
@@ -91,12 +91,19 @@ def import_re(space):
 
 def matchcontext(space, ctx, pattern):
     try:
+        # the DFA rejects in linear time the strings that can't match,
+        # which would otherwise make rsre_core backtrack exponentially;
+        # it is only used on the patterns where this can happen
+        if not rsre_dfa.may_match(ctx, pattern, True):
+            return False
         return rsre_core.match_context(ctx, pattern)
     except rsre_core.Error as e:
         raise OperationError(space.w_RuntimeError, space.newtext(e.msg))
 
 def searchcontext(space, ctx, pattern):
     try:
+        if not rsre_dfa.may_match(ctx, pattern, False):
+            return False
         return rsre_core.search_context(ctx, pattern)
     except rsre_core.Error as e:
         raise OperationError(space.w_RuntimeError, space.newtext(e.msg))
@@ -1080,6 +1080,30 @@ class AppTestOptimizations:
         assert re.search(".+ab", "wowowowawoabwowo")
         assert None == re.search(".+ab", "wowowaowowo")
 
+    def test_dfa_rejects_without_backtracking(self):
+        import re
+        # would backtrack exponentially without the DFA prefilter
+        assert re.match("(a|aa)*c", "a" * 200) is None
+        assert re.search("(x+x+)+y", "x" * 200) is None
+        assert re.match("(a|aa)*c", "a" * 20 + "c").end() == 21
+        assert re.findall("(error|warn(?:ing)?):", "warning: x error: y") == [
+            "warning", "error"]
+        assert re.sub("(ab|cd)+", "-", "xabcdyab") == "x-y-"
+        assert [m.span() for m in re.finditer(u"(\u1234|b)+", u"\u1234bxb")] == [
+            (0, 2), (3, 4)]
+
+    def test_literal_prefilters(self):
+        import re
+        line = "2020-01-01 INFO ok; 2020-01-02 WARNING disk; 2020-01-03 FATAL x"
+        assert re.findall("ERROR|WARNING|FATAL", line) == ["WARNING", "FATAL"]
+        assert re.search("(ERROR|CRIT)ICAL", line) is None
+        assert re.search("(WARN|FATA)(ING|L) (\\w+)", line).groups() == (
+            "WARN", "ING", "disk")
+        assert re.search(u"(\u1234b|cd)+", u"xx\u1234bcdy").span() == (2, 6)
+        assert re.findall(r"(\d+) FATAL", line) == ["03"]
+        assert re.search(r"\d+ ERROR", line) is None
+        assert re.search(r"\d+ ERROR", line + " 1 ERROR").span() == (64, 71)
+
 
 class AppTestUnicodeExtra:
     def test_string_attribute(self):
@@ -74,10 +74,12 @@ PyDict_Check, PyDict_CheckExact = build_type_checkers_flags("Dict")
 def PyDict_GetItem(space, w_dict, w_key):
     if not isinstance(w_dict, W_DictMultiObject):
         return None
-    # NOTE: this works so far because all our dict strategies store
-    # *values* as full objects, which stay alive as long as the dict is
-    # alive and not modified.  So we can return a borrowed ref.
+    # NOTE: this works so far because, after ensure_boxed_values(), our
+    # dict strategies store *values* as full objects, which stay alive as
+    # long as the dict is alive and not modified.  So we can return a
+    # borrowed ref.
     # XXX this is wrong with IntMutableCell.  Hope it works...
+    w_dict.ensure_boxed_values()
     try:
         return w_dict.getitem(w_key)
     except OperationError:
@@ -88,6 +90,7 @@ def _PyDict_GetItemWithError(space, w_dict, w_key):
     # Like PyDict_GetItem(), but doesn't swallow the error
     if not isinstance(w_dict, W_DictMultiObject):
         PyErr_BadInternalCall(space)
+    w_dict.ensure_boxed_values()
     return w_dict.getitem(w_key)
 
 @cpython_api([PyObject, PyObject, PyObject], rffi.INT_real, error=-1)
@@ -120,10 +123,8 @@ def PyDict_GetItemString(space, w_dict, key):
     w_key = space.newtext(rffi.charp2str(key))
     if not isinstance(w_dict, W_DictMultiObject):
         return None
-    # NOTE: this works so far because all our dict strategies store
-    # *values* as full objects, which stay alive as long as the dict is
-    # alive and not modified.  So we can return a borrowed ref.
-    # XXX this is wrong with IntMutableCell.  Hope it works...
+    # NOTE: see PyDict_GetItem()
+    w_dict.ensure_boxed_values()
     return w_dict.getitem(w_key)
 
 @cpython_api([PyObject, CONST_STRING], rffi.INT_real, error=-1)
@@ -301,6 +302,8 @@ def PyDict_Next(space, w_dict, ppos, pkey, pvalue):
         py_dict.c__tmpkeys = lltype.nullptr(PyObject.TO)
         return 0
     w_key = space.listview(w_keys)[pos]  # fast iff w_keys uses object strat
+    if isinstance(w_dict, W_DictMultiObject):
+        w_dict.ensure_boxed_values()    # the values are borrowed too
     w_value = space.getitem(w_dict, w_key)
     if pkey:
         pkey[0] = as_pyobj(space, w_key)
@@ -52,6 +52,15 @@ class TestDictObject(BaseApiTest):
         PyDict_Clear(space, d)
         assert PyDict_Size(space, d) == 0
 
+    def test_getitem_unboxed_values(self, space):
+        w_d = space.appexec([], """():
+            return {"a": 1.5}
+        """)
+        w_1 = PyDict_GetItem(space, w_d, space.wrap("a"))
+        w_2 = PyDict_GetItem(space, w_d, space.wrap("a"))
+        assert w_1 is w_2
+        assert space.float_w(w_1) == 1.5
+
     def test_check(self, space):
         d = PyDict_New(space, )
         assert PyDict_Check(space, d)
@@ -2,7 +2,7 @@
 
 import gc
 
-def dump_rpy_heap(file):
+def dump_rpy_heap(file, compact=False):
     """Write a full dump of the objects in the heap to the given file
     (which can be a file, a file name, or a file descritor).
     Format for each object (each item is one machine word):
@@ -15,13 +15,17 @@ def dump_rpy_heap(file):
     points to.  The full dump is a list of such objects, with a marker
     [0][0][0][-1] inserted after all GC roots, before all non-roots.
 
+    If 'compact' is true, the same information is written in a varint-
+    encoded format that is much smaller and faster to write.  It is
+    described in pypy/tool/heapanalyze.py, which can also analyze it.
+
     If the argument is a filename and the 'zlib' module is available,
     we also write 'typeids.txt' and 'typeids.lst' in the same directory,
     if they don't already exist.
     """
     if isinstance(file, str):
         f = open(file, 'wb')
-        gc._dump_rpy_heap(f.fileno())
+        gc._dump_rpy_heap(f.fileno(), compact)
         f.close()
         try:
             import zlib, os
@@ -47,7 +51,7 @@ def dump_rpy_heap(file):
             if hasattr(file, 'flush'):
                 file.flush()
             fd = file.fileno()
-        gc._dump_rpy_heap(fd)
+        gc._dump_rpy_heap(fd, compact)
 
 class GcStats(object):
     def __init__(self, s):
@@ -10,6 +10,19 @@ from pypy.interpreter.executioncontext import AsyncAction
 
 inf = float("inf")
 
+# The pauses are also counted in a histogram with this many buckets: the
+# bucket 'i' counts the pauses that lasted less than 2**i microseconds
+# (and at least 2**(i-1)), and the last bucket all the longer ones.
+HISTOGRAM_SIZE = 24
+
+def histogram_bucket(duration):
+    limit = 1e-6
+    i = 0
+    while duration >= limit and i < HISTOGRAM_SIZE - 1:
+        limit *= 2.0
+        i += 1
+    return i
+
 class LowLevelGcHooks(GcHooks):
     """
     These are the low-level hooks which are called directly from the GC.
@@ -34,14 +47,18 @@ class LowLevelGcHooks(GcHooks):
     def is_gc_collect_enabled(self):
         return self.w_hooks.gc_collect_enabled
 
-    def on_gc_minor(self, duration, total_memory_used, pinned_objects):
+    def on_gc_minor(self, duration, total_memory_used, pinned_objects,
+                    nursery_size, surviving_size):
         action = self.w_hooks.gc_minor
         action.count += 1
         action.duration += duration
         action.duration_min = min(action.duration_min, duration)
         action.duration_max = max(action.duration_max, duration)
+        action.histogram[histogram_bucket(duration)] += 1
         action.total_memory_used = total_memory_used
         action.pinned_objects = pinned_objects
+        action.nursery_size = nursery_size
+        action.surviving_size = surviving_size
         action.fire()
 
     def on_gc_collect_step(self, duration, oldstate, newstate):
@@ -50,6 +67,7 @@ class LowLevelGcHooks(GcHooks):
         action.duration += duration
         action.duration_min = min(action.duration_min, duration)
         action.duration_max = max(action.duration_max, duration)
+        action.histogram[histogram_bucket(duration)] += 1
         action.oldstate = oldstate
         action.newstate = newstate
         action.fire()
@@ -134,10 +152,13 @@ class NoRecursiveAction(AsyncAction):
 class GcMinorHookAction(NoRecursiveAction):
     total_memory_used = 0
     pinned_objects = 0
+    nursery_size = 0
+    surviving_size = 0
 
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
         self.w_callable = space.w_None
+        self.histogram = [0] * HISTOGRAM_SIZE
         self.reset()
 
     def reset(self):
@@ -145,6 +166,8 @@ class GcMinorHookAction(NoRecursiveAction):
         self.duration = 0.0
         self.duration_min = inf
         self.duration_max = 0.0
+        for i in range(HISTOGRAM_SIZE):
+            self.histogram[i] = 0
 
     def fix_annotation(self):
         # the annotation of the class and its attributes must be completed
@@ -157,6 +180,8 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_max = NonConstant(-53.2)
             self.total_memory_used = NonConstant(r_uint(42))
             self.pinned_objects = NonConstant(-42)
+            self.nursery_size = NonConstant(-42)
+            self.surviving_size = NonConstant(-42)
             self.fire()
 
     def _do_perform(self, ec, frame):
@@ -166,7 +191,10 @@ class GcMinorHookAction(NoRecursiveAction):
             self.duration_min,
             self.duration_max,
             self.total_memory_used,
-            self.pinned_objects)
+            self.pinned_objects,
+            self.nursery_size,
+            self.surviving_size,
+            self.histogram[:])
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -178,6 +206,7 @@ class GcCollectStepHookAction(NoRecursiveAction):
     def __init__(self, space):
         NoRecursiveAction.__init__(self, space)
         self.w_callable = space.w_None
+        self.histogram = [0] * HISTOGRAM_SIZE
         self.reset()
 
     def reset(self):
@@ -185,6 +214,8 @@ class GcCollectStepHookAction(NoRecursiveAction):
         self.duration = 0.0
         self.duration_min = inf
         self.duration_max = 0.0
+        for i in range(HISTOGRAM_SIZE):
+            self.histogram[i] = 0
 
     def fix_annotation(self):
         # the annotation of the class and its attributes must be completed
@@ -207,7 +238,8 @@ class GcCollectStepHookAction(NoRecursiveAction):
             self.duration_max,
             self.oldstate,
             self.newstate,
-            rgc.is_done__states(self.oldstate, self.newstate))
+            rgc.is_done__states(self.oldstate, self.newstate),
+            self.histogram[:])
         self.reset()
         self.space.call_function(self.w_callable, w_stats)
 
@@ -261,13 +293,17 @@ class GcCollectHookAction(NoRecursiveAction):
 class W_GcMinorStats(W_Root):
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 total_memory_used, pinned_objects):
+                 total_memory_used, pinned_objects, nursery_size,
+                 surviving_size, duration_histogram=None):
         self.count = count
+        self.duration_histogram = duration_histogram
         self.duration = duration
         self.duration_min = duration_min
         self.duration_max = duration_max
         self.total_memory_used = total_memory_used
         self.pinned_objects = pinned_objects
+        self.nursery_size = nursery_size
+        self.surviving_size = surviving_size
 
 
 class W_GcCollectStepStats(W_Root):
@@ -289,8 +325,9 @@ class W_GcCollectStepStats(W_Root):
     GC_STATES = tuple(incminimark.GC_STATES + ['USERDEL'])
 
     def __init__(self, count, duration, duration_min, duration_max,
-                 oldstate, newstate, major_is_done):
+                 oldstate, newstate, major_is_done, duration_histogram=None):
         self.count = count
+        self.duration_histogram = duration_histogram
         self.duration = duration
         self.duration_min = duration_min
         self.duration_max = duration_max
@@ -314,6 +351,11 @@ class W_GcCollectStats(W_Root):
         self.pinned_objects = pinned_objects
 
 
+def descr_get_duration_histogram(self, space):
+    if self.duration_histogram is None:
+        return space.newlist([])
+    return space.newlist([space.newint(n) for n in self.duration_histogram])
+
 # just a shortcut to make the typedefs shorter
 def wrap_many(cls, names):
     d = {}
@@ -346,13 +388,17 @@ W_AppLevelHooks.typedef = TypeDef(
 
 W_GcMinorStats.typedef = TypeDef(
     "GcMinorStats",
+    duration_histogram = GetSetProperty(descr_get_duration_histogram,
+                                        cls=W_GcMinorStats),
     **wrap_many(W_GcMinorStats, (
         "count",
         "duration",
         "duration_min",
         "duration_max",
         "total_memory_used",
-        "pinned_objects"))
+        "pinned_objects",
+        "nursery_size",
+        "surviving_size"))
     )
 
 W_GcCollectStepStats.typedef = TypeDef(
@@ -367,6 +413,8 @@ W_GcCollectStepStats.typedef = TypeDef(
         "major_is_done",
         cls=W_GcCollectStepStats,
         wrapfn="newbool"),
+    duration_histogram = GetSetProperty(descr_get_duration_histogram,
+                                        cls=W_GcCollectStepStats),
     **wrap_many(W_GcCollectStepStats, (
         "count",
         "duration",
@@ -135,6 +135,39 @@ def collect_step(space):
     w_stats = sc.do()
     return w_stats
 
+def compact(space):
+    """
+    Run a full collection, then give back to the OS the memory of the free
+    pages left in the GC arenas.  Return the number of bytes given back.
+    """
+    from pypy.objspace.std.typeobject import MethodCache
+    from pypy.objspace.std.mapdict import MapAttrCache
+    cache = space.fromcache(MethodCache)
+    cache.clear()
+    cache = space.fromcache(MapAttrCache)
+    cache.clear()
+
+    result = rgc.compact()
+    _run_finalizers(space)
+    return space.newint(result)
+
+def freeze(space):
+    """
+    Run a full collection, then make all the surviving objects immortal.
+    The GC will never write to them again, so that their memory stays
+    shared with the child processes after a fork().  Call it in the parent
+    process just before forking the workers.  Return the number of bytes
+    frozen.
+    """
+    # rgc.freeze() does its own full collection, but the objects with a
+    # pending app-level finalizer would survive it and become immortal.
+    # So we first run a collection and these finalizers, like
+    # gc.collect(), which also clears the caches that could keep
+    # otherwise-dead objects alive.
+    collect(space)
+    size = rgc.freeze()
+    return space.newint(size)
+
 # ____________________________________________________________
 
 @unwrap_spec(filename='fsencode')
@@ -154,10 +154,10 @@ def get_referrers(space, args_w):
     rgc.assert_no_more_gcflags()
     return space.newlist(result_w)
 
-@unwrap_spec(fd=int)
-def _dump_rpy_heap(space, fd):
+@unwrap_spec(fd=int, compact=bool)
+def _dump_rpy_heap(space, fd, compact=False):
     try:
-        ok = rgc.dump_rpy_heap(fd)
+        ok = rgc.dump_rpy_heap(fd, compact)
     except OSError as e:
         raise wrap_oserror(space, e)
     if not ok:
@@ -119,6 +119,31 @@ class AppTestGC(object):
         assert n >= 2 # at least one step + 1 finalizing
         assert X.deleted == 3
 
+    def test_compact(self):
+        import gc
+
+        class X(object):
+            deleted = 0
+            def __del__(self):
+                X.deleted += 1
+
+        X(); X()
+        assert gc.compact() >= 0
+        assert X.deleted == 2
+
+    def test_freeze(self):
+        import gc
+        lst = [[i] for i in range(100)]
+        d = {'lst': lst}
+        frozen = gc.freeze()
+        # 0 when not translated: the GC doesn't support it
+        assert isinstance(frozen, int) and frozen >= 0
+        lst.append([100])
+        d['new'] = [101]
+        gc.collect()
+        assert [x[0] for x in lst] == range(101)
+        assert d['new'] == [101]
+
 class AppTestGcDumpHeap(object):
     pytestmark = py.test.mark.xfail(run=False)
 
@@ -12,9 +12,11 @@ class AppTestGcHooks(object):
         space = cls.space
         gchooks = space.fromcache(LowLevelGcHooks)
 
-        @unwrap_spec(ObjSpace, int, r_uint, int)
-        def fire_gc_minor(space, duration, total_memory_used, pinned_objects):
-            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects)
+        @unwrap_spec(ObjSpace, int, r_uint, int, int, int)
+        def fire_gc_minor(space, duration, total_memory_used, pinned_objects,
+                          nursery_size=0, surviving_size=0):
+            gchooks.fire_gc_minor(duration, total_memory_used, pinned_objects,
+                                  nursery_size, surviving_size)
 
         @unwrap_spec(ObjSpace, int, int, int)
         def fire_gc_collect_step(space, duration, oldstate, newstate):
@@ -26,8 +28,8 @@ class AppTestGcHooks(object):
 
         @unwrap_spec(ObjSpace)
         def fire_many(space):
-            gchooks.fire_gc_minor(5.0, 0, 0)
-            gchooks.fire_gc_minor(7.0, 0, 0)
+            gchooks.fire_gc_minor(5.0, 0, 0, 0, 0)
+            gchooks.fire_gc_minor(7.0, 0, 0, 0, 0)
             gchooks.fire_gc_collect_step(5.0, 0, 0)
             gchooks.fire_gc_collect_step(15.0, 0, 0)
             gchooks.fire_gc_collect_step(22.0, 0, 0)
@@ -36,7 +38,14 @@ class AppTestGcHooks(object):
         cls.w_fire_gc_minor = space.wrap(interp2app(fire_gc_minor))
         cls.w_fire_gc_collect_step = space.wrap(interp2app(fire_gc_collect_step))
         cls.w_fire_gc_collect = space.wrap(interp2app(fire_gc_collect))
+        @unwrap_spec(ObjSpace)
+        def fire_pauses(space):
+            for duration in [0.5e-6, 3e-6, 3.5e-6, 0.0015, 100.0]:
+                gchooks.fire_gc_minor(duration, 0, 0, 0, 0)
+                gchooks.fire_gc_collect_step(duration, 0, 0)
+
         cls.w_fire_many = space.wrap(interp2app(fire_many))
+        cls.w_fire_pauses = space.wrap(interp2app(fire_pauses))
 
     def test_default(self):
         import gc
@@ -51,20 +60,22 @@ class AppTestGcHooks(object):
             lst.append((stats.count,
                         stats.duration,
                         stats.total_memory_used,
-                        stats.pinned_objects))
+                        stats.pinned_objects,
+                        stats.nursery_size,
+                        stats.surviving_size))
         gc.hooks.on_gc_minor = on_gc_minor
-        self.fire_gc_minor(10, 20, 30)
-        self.fire_gc_minor(40, 50, 60)
+        self.fire_gc_minor(10, 20, 30, 1024, 5)
+        self.fire_gc_minor(40, 50, 60, 2048, 6)
         assert lst == [
-            (1, 10, 20, 30),
-            (1, 40, 50, 60),
+            (1, 10, 20, 30, 1024, 5),
+            (1, 40, 50, 60, 2048, 6),
             ]
         #
         gc.hooks.on_gc_minor = None
         self.fire_gc_minor(70, 80, 90)  # won't fire because the hooks is disabled
         assert lst == [
-            (1, 10, 20, 30),
-            (1, 40, 50, 60),
+            (1, 10, 20, 30, 1024, 5),
+            (1, 40, 50, 60, 2048, 6),
             ]
 
     def test_on_gc_collect_step(self):
@@ -154,6 +165,38 @@ class AppTestGcHooks(object):
         assert myhooks.minors == [(2, 12, 5, 7)]
         assert myhooks.steps == [(3, 42, 5, 22)]
 
+    def test_duration_histogram(self):
+        import gc
+        class MyHooks(object):
+
+            def __init__(self):
+                self.minors = []
+                self.steps = []
+
+            def on_gc_minor(self, stats):
+                self.minors.append(stats.duration_histogram)
+
+            def on_gc_collect_step(self, stats):
+                self.steps.append(stats.duration_histogram)
+
+            on_gc_collect = None
+
+        myhooks = MyHooks()
+        gc.hooks.set(myhooks)
+        self.fire_pauses()
+        expected = [0] * 24
+        expected[0] = 1      # < 1us
+        expected[2] = 2      # 2-4us
+        expected[11] = 1     # 1024-2048us
+        expected[23] = 1     # all the longer ones
+        assert myhooks.minors == [expected]
+        assert myhooks.steps == [expected]
+        #
+        # the histogram is reset after every call
+        myhooks.minors = []
+        self.fire_gc_minor(0, 0, 0)
+        assert myhooks.minors == [[1] + [0] * 23]
+
     def test_clear_queue(self):
         import gc
         class MyHooks(object):
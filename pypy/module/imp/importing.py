@@ -1079,6 +1079,15 @@ def load_compiled_module(space, w_modulename, w_mod, cpathname, magic,
         raise oefmt(space.w_ImportError, "Bad magic number in %s", cpathname)
     #print "loading pyc file:", cpathname
     code_w = read_compiled_module(space, cpathname, source)
+    return exec_compiled_module(space, w_modulename, w_mod, code_w,
+                                check_afterwards=check_afterwards)
+
+def exec_compiled_module(space, w_modulename, w_mod, code_w,
+                         check_afterwards=True):
+    """
+    Execute a code object read from a compiled file.  Returns
+    'sys.modules[modulename]', which must exist.
+    """
     try:
         optimize = space.sys.get_flag('optimize')
     except RuntimeError:
@@ -19,6 +19,7 @@ from pypy.interpreter.pyopcode import ExitFrame, Yield
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.typedef import TypeDef
 from pypy.interpreter.gateway import interp2app
+from pypy.module.pypyjit.interp_warmup import prime_code
 from opcode import opmap
 
 
@@ -78,6 +79,8 @@ class __extend__(PyFrame):
 
     def dispatch(self, pycode, next_instr, ec):
         self = hint(self, access_directly=True)
+        if not we_are_jitted() and pycode.jit_warmup_positions is not None:
+            prime_code(pycode)
         next_instr = r_uint(next_instr)
         is_being_profiled = self.get_is_being_profiled()
         try:
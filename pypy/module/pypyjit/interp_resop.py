@@ -30,6 +30,11 @@ class Cache(object):
         self.no += 1
         return self.no - 1
 
+def unwrap_pycode(greenkey):
+    ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                     greenkey[2].getref_base())
+    return cast_base_ptr_to_instance(PyCode, ll_code)
+
 def wrap_greenkey(space, jitdriver, greenkey, greenkey_repr):
     if greenkey is None:
         return space.w_None
@@ -37,9 +42,7 @@ def wrap_greenkey(space, jitdriver, greenkey, greenkey_repr):
     if jitdriver_name == 'pypyjit':
         next_instr = greenkey[0].getint()
         is_being_profiled = greenkey[1].getint()
-        ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
-                                         greenkey[2].getref_base())
-        pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+        pycode = unwrap_pycode(greenkey)
         return space.newtuple([pycode, space.newint(next_instr),
                                space.newbool(bool(is_being_profiled))])
     else:
@@ -0,0 +1,172 @@
+"""Warm-up profiles.
+
+A warm-up profile records the positions at which the JIT compiled loops,
+keyed by code object.  Saved to disk and loaded again by a new process,
+it lets the JIT trace these loops as soon as they are reached, instead
+of first counting iterations until the threshold is reached.  Only the
+positions are saved, not the traces or the machine code: these contain
+addresses that are only valid in the process that produced them.
+
+Code objects are identified by their file name, name and first line
+number, and by a hash of their bytecode, so that an entry is ignored if
+the code changed.  The whole profile is ignored if it was produced by a
+different version of PyPy.
+"""
+
+import os, errno
+from rpython.rlib import jit_hooks, rmd5
+from rpython.rlib.jit import dont_look_inside
+from rpython.rlib.rarithmetic import r_uint, LONG_BIT
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from pypy.interpreter.error import wrap_oserror
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.pycode import CodeHookCache, default_magic
+from pypy.module.sys.version import PYPY_VERSION
+
+PROFILE_HEADER = 'pypyjit-warmup %d.%d.%d-%s-%d-%d' % (
+    PYPY_VERSION[0], PYPY_VERSION[1], PYPY_VERSION[2], PYPY_VERSION[3],
+    default_magic, LONG_BIT)
+
+
+def code_key(pycode):
+    return '%d %s %s' % (pycode.co_firstlineno, pycode.co_name,
+                         pycode.co_filename)
+
+def code_hash(pycode):
+    return rmd5.RMD5(pycode.co_code).hexdigest()
+
+
+class WarmupEntry(object):
+    def __init__(self, codehash):
+        self.codehash = codehash
+        self.positions = []    # next_instr * 2 + is_being_profiled
+
+    def add_position(self, position):
+        if position not in self.positions:
+            self.positions.append(position)
+
+
+class WarmupProfile(object):
+    def __init__(self, space):
+        self.space = space
+        self.recording = False
+        self.recorded = {}     # code_key -> WarmupEntry
+        self.loaded = {}       # code_key -> WarmupEntry
+
+    def enable(self):
+        self.recording = True
+        self.space.fromcache(CodeHookCache)._warmup_profile = self
+
+    def new_code(self, pycode):
+        entry = self.loaded.get(code_key(pycode), None)
+        if entry is not None and entry.codehash == code_hash(pycode):
+            pycode.jit_warmup_positions = entry.positions
+
+    def record(self, pycode, next_instr, is_being_profiled):
+        key = code_key(pycode)
+        entry = self.recorded.get(key, None)
+        if entry is None:
+            entry = WarmupEntry(code_hash(pycode))
+            self.recorded[key] = entry
+        entry.add_position(next_instr * 2 + is_being_profiled)
+
+    def parse(self, data):
+        lines = data.split('\n')
+        if lines[0] != PROFILE_HEADER:
+            return 0
+        count = 0
+        for line in lines[1:]:
+            # "positions codehash firstlineno name filename"
+            parts = line.split(' ', 2)
+            if len(parts) != 3:
+                continue
+            entry = WarmupEntry(parts[1])
+            try:
+                for position in parts[0].split(','):
+                    entry.add_position(int(position))
+            except ValueError:
+                continue
+            self.loaded[parts[2]] = entry
+            count += 1
+        return count
+
+    def dump(self):
+        lines = [PROFILE_HEADER]
+        for key, entry in self.loaded.items():
+            if key not in self.recorded:
+                lines.append(self._dump_entry(key, entry))
+        for key, entry in self.recorded.items():
+            lines.append(self._dump_entry(key, entry))
+        lines.append('')
+        return '\n'.join(lines)
+
+    def _dump_entry(self, key, entry):
+        positions = ','.join([str(position) for position in entry.positions])
+        return '%s %s %s' % (positions, entry.codehash, key)
+
+
+@dont_look_inside
+def prime_code(pycode):
+    """Called the first time 'pycode' runs, if it is in the warm-up
+    profile: make the JIT trace the next iteration of its loops."""
+    positions = pycode.jit_warmup_positions
+    pycode.jit_warmup_positions = None
+    ll_pycode = cast_instance_to_gcref(pycode)
+    for position in positions:
+        jit_hooks.trace_next_iteration('pypyjit', r_uint(position >> 1),
+                                       position & 1, ll_pycode)
+
+
+def _read_file(filename):
+    fd = os.open(filename, os.O_RDONLY, 0)
+    try:
+        chunks = []
+        while True:
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            chunks.append(data)
+    finally:
+        os.close(fd)
+    return ''.join(chunks)
+
+def _write_file(filename, data):
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0666)
+    try:
+        while data:
+            count = os.write(fd, data)
+            data = data[count:]
+    finally:
+        os.close(fd)
+
+
+@unwrap_spec(filename='fsencode')
+def load_warmup_profile(space, filename):
+    """Load the warm-up profile saved in 'filename' by an earlier process,
+    and start recording the loops compiled by this one.  Returns the
+    number of code objects in the profile: 0 if the file does not exist,
+    or if it was written by a different version of PyPy.  Only the code
+    objects created after this call are affected, so call it before
+    importing the modules of the application.
+    """
+    profile = space.fromcache(WarmupProfile)
+    profile.enable()
+    try:
+        data = _read_file(filename)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return space.newint(0)
+        raise wrap_oserror(space, e, filename)
+    return space.newint(profile.parse(data))
+
+@unwrap_spec(filename='fsencode')
+def save_warmup_profile(space, filename):
+    """Save to 'filename' the positions of the loops compiled since
+    load_warmup_profile() was called, together with the ones loaded by
+    it.  Deleting the file is enough to invalidate the profile.
+    """
+    profile = space.fromcache(WarmupProfile)
+    try:
+        _write_file(filename, profile.dump())
+    except OSError as e:
+        raise wrap_oserror(space, e, filename)
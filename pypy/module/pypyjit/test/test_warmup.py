@@ -0,0 +1,140 @@
+import py
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.pycode import PyCode, CodeHookCache
+from pypy.module.pypyjit import interp_warmup
+from pypy.module.pypyjit.interp_jit import pypyjitdriver
+from pypy.module.pypyjit.interp_warmup import WarmupProfile, PROFILE_HEADER
+from pypy.module.pypyjit.hooks import pypy_hooks
+from rpython.jit.metainterp.history import ConstInt, ConstPtr
+from rpython.rtyper.annlowlevel import cast_instance_to_gcref
+from rpython.tool.udir import udir
+
+
+class FakeDebugInfo(object):
+    def __init__(self, greenkey):
+        self.greenkey = greenkey
+
+    def get_jitdriver(self):
+        return pypyjitdriver
+
+
+class FakeJitHooks(object):
+    def __init__(self):
+        self.traced = []
+
+    def trace_next_iteration(self, name, next_instr, is_being_profiled,
+                             ll_pycode):
+        self.traced.append((name, next_instr, is_being_profiled))
+
+
+class AppTestWarmupProfile(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("Can't run this test with -A")
+        space = cls.space
+        cls.fake_jit_hooks = FakeJitHooks()
+
+        @unwrap_spec(next_instr=int, is_being_profiled=int, is_bridge=bool)
+        def interp_on_compile(space, w_code, next_instr, is_being_profiled,
+                              is_bridge=False):
+            code = space.interp_w(PyCode, w_code)
+            greenkey = [ConstInt(next_instr), ConstInt(is_being_profiled),
+                        ConstPtr(cast_instance_to_gcref(code))]
+            if pypy_hooks.are_hooks_enabled():
+                if is_bridge:
+                    pypy_hooks.after_compile_bridge(FakeDebugInfo(None))
+                else:
+                    pypy_hooks.after_compile(FakeDebugInfo(greenkey))
+
+        def interp_traced(space):
+            return space.wrap(cls.fake_jit_hooks.traced)
+
+        cls.w_on_compile = space.wrap(interp2app(interp_on_compile))
+        cls.w_traced = space.wrap(interp2app(interp_traced))
+        cls.w_header = space.wrap(PROFILE_HEADER)
+        cls.w_tmpdir = space.wrap(str(udir.ensure('warmup', dir=True)))
+
+    def setup_method(self, meth):
+        self.orig_jit_hooks = interp_warmup.jit_hooks
+        interp_warmup.jit_hooks = self.fake_jit_hooks
+        del self.fake_jit_hooks.traced[:]
+
+    def teardown_method(self, meth):
+        interp_warmup.jit_hooks = self.orig_jit_hooks
+        space = self.space
+        space.fromcache(CodeHookCache)._warmup_profile = None
+        profile = space.fromcache(WarmupProfile)
+        profile.__init__(space)
+
+    def test_not_recording_by_default(self):
+        import pypyjit, os
+        filename = os.path.join(self.tmpdir, 'not_recording')
+        def f():
+            pass
+        self.on_compile(f.__code__, 0, 0)
+        pypyjit.save_warmup_profile(filename)
+        with open(filename) as f:
+            assert f.read() == self.header + '\n'
+
+    def test_missing_file(self):
+        import pypyjit, os
+        filename = os.path.join(self.tmpdir, 'missing')
+        assert pypyjit.load_warmup_profile(filename) == 0
+        assert not os.path.exists(filename)
+
+    def test_save_and_load(self):
+        import pypyjit, os
+        filename = os.path.join(self.tmpdir, 'save_and_load')
+        src = "def f(n):\n    while n > 0:\n        n -= 1\n    return 42\n"
+        assert pypyjit.load_warmup_profile(filename) == 0
+        d = {}
+        exec compile(src, 'warmup.py', 'exec') in d
+        self.on_compile(d['f'].__code__, 2, 0)
+        self.on_compile(d['f'].__code__, 2, 0)
+        self.on_compile(d['f'].__code__, 18, 1)
+        self.on_compile(d['f'].__code__, 30, 0, is_bridge=True)
+        pypyjit.save_warmup_profile(filename)
+        with open(filename) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == self.header
+        assert len(lines) == 2
+        assert lines[1].startswith('4,37 ')
+        assert lines[1].endswith(' 1 f warmup.py')
+        #
+        # a new process loads the profile; the loops are traced as soon
+        # as the function runs
+        assert pypyjit.load_warmup_profile(filename) == 1
+        assert self.traced() == []
+        d = {}
+        exec compile(src, 'warmup.py', 'exec') in d
+        assert self.traced() == []
+        assert d['f'](3) == 42
+        assert self.traced() == [('pypyjit', 2, 0), ('pypyjit', 18, 1)]
+        assert d['f'](3) == 42
+        assert len(self.traced()) == 2
+
+    def test_changed_code_is_ignored(self):
+        import pypyjit, os
+        filename = os.path.join(self.tmpdir, 'changed_code')
+        assert pypyjit.load_warmup_profile(filename) == 0
+        d = {}
+        exec compile("def f(x):\n    return x + 1\n", 'warmup.py', 'exec') in d
+        self.on_compile(d['f'].__code__, 0, 0)
+        pypyjit.save_warmup_profile(filename)
+        assert pypyjit.load_warmup_profile(filename) == 1
+        exec compile("def f(x):\n    return x * 2\n", 'warmup.py', 'exec') in d
+        assert d['f'](5) == 10
+        assert self.traced() == []
+
+    def test_other_version_is_ignored(self):
+        import pypyjit, os
+        filename = os.path.join(self.tmpdir, 'other_version')
+        with open(filename, 'w') as f:
+            f.write('pypyjit-warmup 0.0.0-final-0-64\n'
+                    '0 0123456789abcdef 1 f warmup.py\n')
+        assert pypyjit.load_warmup_profile(filename) == 0
+        pypyjit.save_warmup_profile(filename)
+        with open(filename) as f:
+            assert f.read() == self.header + '\n'
@@ -0,0 +1,41 @@
+from pypy.module.pypyjit.test_pypy_c.test_00_model import BaseTestPyPyC
+
+
+class TestWarmupProfile(BaseTestPyPyC):
+
+    def test_loop_traced_at_once(self):
+        def main(filename, n):
+            import pypyjit
+            pypyjit.load_warmup_profile(filename)
+            src = ("def f(n):\n"
+                   "    i = 0\n"
+                   "    while i < n:\n"
+                   "        i += 1\n"
+                   "    return i\n")
+            d = {}
+            exec compile(src, 'warmup_loop.py', 'exec') in d
+            result = d['f'](n)
+            pypyjit.save_warmup_profile(filename)
+            return result
+        profile = self.tmpdir.join('test_loop_traced_at_once.profile')
+        if profile.check():
+            profile.remove()
+        #
+        # 150 iterations are not enough to reach the threshold
+        log = self.run(main, [str(profile), 150])
+        assert log.result == 150
+        assert log.loops_by_filename('warmup_loop.py') == []
+        #
+        log = self.run(main, [str(profile), 1000])
+        assert log.result == 1000
+        assert log.loops_by_filename('warmup_loop.py') != []
+        #
+        # with the profile of the previous run, they are
+        log = self.run(main, [str(profile), 150])
+        assert log.result == 150
+        assert log.loops_by_filename('warmup_loop.py') != []
+        #
+        # and without it, they are not
+        profile.remove()
+        log = self.run(main, [str(profile), 150])
+        assert log.loops_by_filename('warmup_loop.py') == []
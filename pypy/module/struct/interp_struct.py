@@ -1,8 +1,10 @@
 from rpython.rlib import jit
+from rpython.rlib.objectmodel import specialize
 from rpython.rlib.buffer import SubBuffer
 from rpython.rlib.mutbuffer import MutableStringBuffer
 from rpython.rlib.rstruct.error import StructError, StructOverflowError
 from rpython.rlib.rstruct.formatiterator import CalcSizeFormatIterator
+from rpython.rlib.rstruct.formatiterator import compile_format
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.gateway import interp2app, unwrap_spec
@@ -23,15 +25,53 @@ def get_error(space):
     return space.fromcache(Cache).error
 
 
+class FormatCache:
+    """The formats used so far, compiled.  Like in CPython, the whole
+    cache is dropped when it gets too big."""
+    MAXCACHE = 100
+
+    def __init__(self, space):
+        self.compiled = {}
+
+def get_compiled(space, format):
+    cache = space.fromcache(FormatCache)
+    try:
+        return cache.compiled[format]
+    except KeyError:
+        pass
+    compiled = compile_format(format)
+    if len(cache.compiled) >= FormatCache.MAXCACHE:
+        cache.compiled.clear()
+    cache.compiled[format] = compiled
+    return compiled
+
+
+@specialize.argtype(1)
+def _interpret(space, fmtiter, format):
+    # a constant format is parsed while tracing, and the JIT removes the
+    # parsing; otherwise, the format is compiled only once
+    try:
+        if jit.isconstant(format):
+            fmtiter.interpret(format)
+        else:
+            fmtiter.run(get_compiled(space, format))
+    except StructOverflowError as e:
+        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
+    except StructError as e:
+        raise OperationError(get_error(space), space.newtext(e.msg))
+
+
 def _calcsize(space, format):
-    fmtiter = CalcSizeFormatIterator()
     try:
-        fmtiter.interpret(format)
+        if jit.isconstant(format):
+            fmtiter = CalcSizeFormatIterator()
+            fmtiter.interpret(format)
+            return fmtiter.totalsize
+        return get_compiled(space, format).size
     except StructOverflowError as e:
         raise OperationError(space.w_OverflowError, space.newtext(e.msg))
     except StructError as e:
         raise OperationError(get_error(space), space.newtext(e.msg))
-    return fmtiter.totalsize
 
 
 @unwrap_spec(format='text')
@@ -45,12 +85,7 @@ def _pack(space, format, args_w):
     size = _calcsize(space, format)
     wbuf = MutableStringBuffer(size)
     fmtiter = PackFormatIterator(space, wbuf, args_w)
-    try:
-        fmtiter.interpret(format)
-    except StructOverflowError as e:
-        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
-    except StructError as e:
-        raise OperationError(get_error(space), space.newtext(e.msg))
+    _interpret(space, fmtiter, format)
     assert fmtiter.pos == wbuf.getlength(), 'missing .advance() or wrong calcsize()'
     return wbuf.finish()
 
@@ -76,22 +111,12 @@ Write the packed bytes into the writable buffer buf starting at offset
     #
     wbuf = SubBuffer(buf, offset, size)
     fmtiter = PackFormatIterator(space, wbuf, args_w)
-    try:
-        fmtiter.interpret(format)
-    except StructOverflowError as e:
-        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
-    except StructError as e:
-        raise OperationError(get_error(space), space.newtext(e.msg))
+    _interpret(space, fmtiter, format)
 
 
 def _unpack(space, format, buf):
     fmtiter = UnpackFormatIterator(space, buf)
-    try:
-        fmtiter.interpret(format)
-    except StructOverflowError as e:
-        raise OperationError(space.w_OverflowError, space.newtext(e.msg))
-    except StructError as e:
-        raise OperationError(get_error(space), space.newtext(e.msg))
+    _interpret(space, fmtiter, format)
     return space.newtuple(fmtiter.result_w[:])
 
 
@@ -119,6 +144,60 @@ fmt, starting at offset. Requires len(buffer[offset:]) >= calcsize(fmt)."""
     return _unpack(space, format, buf)
 
 
+def _iter_unpack(space, format, w_buffer):
+    size = _calcsize(space, format)
+    if size == 0:
+        raise oefmt(get_error(space),
+                    "cannot iteratively unpack with a struct of length 0")
+    buf = space.getarg_w('s*', w_buffer)
+    if buf.getlength() % size != 0:
+        raise oefmt(get_error(space),
+                    "iterative unpacking requires a buffer of a multiple of "
+                    "%d bytes", size)
+    return W_UnpackIter(format, size, buf)
+
+
+@unwrap_spec(format='text')
+def iter_unpack(space, format, w_buffer):
+    """Return an iterator which unpacks the buffer successively according
+to fmt.  The buffer's size must be a multiple of calcsize(fmt)."""
+    return _iter_unpack(space, format, w_buffer)
+
+
+class W_UnpackIter(W_Root):
+    _immutable_fields_ = ["format", "size", "buf"]
+
+    def __init__(self, format, size, buf):
+        self.format = format
+        self.size = size
+        self.buf = buf
+        self.index = 0
+
+    def descr_iter(self, space):
+        return self
+
+    def descr_next(self, space):
+        length = self.buf.getlength()
+        if self.index >= length:
+            raise OperationError(space.w_StopIteration, space.w_None)
+        size = self.size
+        buf = SubBuffer(self.buf, self.index, size)
+        w_res = _unpack(space, jit.promote_string(self.format), buf)
+        self.index += size
+        return w_res
+
+    def descr_length_hint(self, space):
+        length = (self.buf.getlength() - self.index) // self.size
+        return space.newint(max(length, 0))
+
+W_UnpackIter.typedef = TypeDef("unpack_iterator",
+    __iter__=interp2app(W_UnpackIter.descr_iter),
+    next=interp2app(W_UnpackIter.descr_next),
+    __length_hint__=interp2app(W_UnpackIter.descr_length_hint),
+)
+W_UnpackIter.typedef.acceptable_as_base_class = False
+
+
 class W_Struct(W_Root):
     _immutable_fields_ = ["format", "size"]
 
@@ -147,6 +226,9 @@ class W_Struct(W_Root):
     def descr_unpack_from(self, space, w_buffer, offset=0):
         return unpack_from(space, jit.promote_string(self.format), w_buffer, offset)
 
+    def descr_iter_unpack(self, space, w_buffer):
+        return _iter_unpack(space, jit.promote_string(self.format), w_buffer)
+
 W_Struct.typedef = TypeDef("Struct",
     __new__=interp2app(W_Struct.descr__new__.im_func),
     __init__=interp2app(W_Struct.descr__init__),
@@ -157,8 +239,10 @@ W_Struct.typedef = TypeDef("Struct",
     unpack=interp2app(W_Struct.descr_unpack),
     pack_into=interp2app(W_Struct.descr_pack_into),
     unpack_from=interp2app(W_Struct.descr_unpack_from),
+    iter_unpack=interp2app(W_Struct.descr_iter_unpack),
     __weakref__=make_weakref_descr(W_Struct),
 )
 
 def clearcache(space):
-    """No-op on PyPy"""
+    """Clear the internal cache of compiled formats."""
+    space.fromcache(FormatCache).compiled.clear()
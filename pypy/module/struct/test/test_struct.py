@@ -444,6 +444,36 @@ class AppTestStruct(object):
                 assert self.size == 1
         assert S().unpack('a') == ('a',)
 
+    def test_iter_unpack(self):
+        struct = self.struct
+        data = struct.pack('<hi', 1, 2) + struct.pack('<hi', -3, 4)
+        it = struct.iter_unpack('<hi', data)
+        assert it.__length_hint__() == 2
+        assert iter(it) is it
+        assert it.next() == (1, 2)
+        assert it.__length_hint__() == 1
+        assert list(it) == [(-3, 4)]
+        raises(StopIteration, it.next)
+        assert list(struct.Struct('<hi').iter_unpack(bytearray(data))) == [
+            (1, 2), (-3, 4)]
+        assert list(struct.iter_unpack('b', '')) == []
+        raises(struct.error, struct.iter_unpack, '<hi', data + 'x')
+        raises(struct.error, struct.iter_unpack, '', data)
+        raises(struct.error, struct.Struct('').iter_unpack, data)
+
+    def test_format_cache(self):
+        struct = self.struct
+        # the formats are compiled and cached, which must not change
+        # the results nor the errors
+        for i in range(3):
+            assert struct.calcsize('ci') == struct.calcsize('@ci') == 8
+            assert struct.unpack('<3sH', struct.pack('<3sH', 'abc', 5)) == (
+                'abc', 5)
+            raises(struct.error, struct.pack, 'Z', 1)
+            raises(struct.error, struct.calcsize, '12')
+        struct._clearcache()
+        assert struct.pack('>h', 1) == '\x00\x01'
+
     def test_overflow(self):
         raises(self.struct.error, self.struct.pack, 'i', 1<<65)
 
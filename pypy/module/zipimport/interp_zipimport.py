@@ -54,13 +54,28 @@ class W_ZipCache(W_Root):
             raise OperationError(space.w_KeyError, space.newtext(name))
         assert isinstance(w_zipimporter, W_ZipImporter)
         w_d = space.newdict()
-        for key, info in w_zipimporter.zip_file.NameToInfo.iteritems():
-            if ZIPSEP != os.path.sep:
-                key = key.replace(ZIPSEP, os.path.sep)
-            space.setitem(w_d, space.newtext(key), space.newtuple([
-                space.newtext(info.filename), space.newint(info.compress_type), space.newint(info.compress_size),
-                space.newint(info.file_size), space.newint(info.file_offset), space.newint(info.dostime),
-                space.newint(info.dosdate), space.newint(info.CRC)]))
+        zip_file = w_zipimporter.zip_file
+        try:
+            fp = zip_file.get_fp()
+        except OSError:
+            raise oefmt(get_error(space), "%s seems not to be a zipfile",
+                        w_zipimporter.filename)
+        try:
+            for key, info in zip_file.NameToInfo.iteritems():
+                try:
+                    file_offset = zip_file._get_file_offset(fp, info)
+                except (BadZipfile, OSError):
+                    raise oefmt(get_error(space),
+                                "%s seems not to be a zipfile",
+                                w_zipimporter.filename)
+                if ZIPSEP != os.path.sep:
+                    key = key.replace(ZIPSEP, os.path.sep)
+                space.setitem(w_d, space.newtext(key), space.newtuple([
+                    space.newtext(info.filename), space.newint(info.compress_type), space.newint(info.compress_size),
+                    space.newint(info.file_size), space.newint(file_offset), space.newint(info.dostime),
+                    space.newint(info.dosdate), space.newint(info.CRC)]))
+        finally:
+            fp.close()
         return w_d
 
     def keys(self, space):
@@ -121,6 +136,12 @@ class W_ZipImporter(W_Root):
         self.filename = filename
         self.zip_file = zip_file
         self.prefix = prefix
+        # the stat of the archive when 'zip_file' was read
+        self.archive_mtime = 0.0
+        self.archive_size = 0
+        # the code objects already unmarshalled from the .pyc files of
+        # the archive, {(filename, timestamp): code}
+        self.code_cache = {}
 
     def getprefix(self, space):
         if ZIPSEP == os.path.sep:
@@ -198,14 +219,22 @@ class W_ZipImporter(W_Root):
         timestamp = importing._get_long(buf[4:8])
         if not self.can_use_pyc(space, filename, magic, timestamp):
             return None
-        buf = buf[8:] # XXX ugly copy, should use sequential read instead
+        key = (filename, timestamp)
+        try:
+            code_w = self.code_cache[key]
+        except KeyError:
+            buf = buf[8:] # XXX ugly copy, should use sequential read instead
+            code_w = importing.read_compiled_module(space, filename, buf)
+            self.code_cache[key] = code_w
         w_mod = Module(space, space.newtext(modname))
         real_name = self.filename + os.path.sep + self.corr_zname(filename)
         space.setattr(w_mod, space.newtext('__loader__'), self)
         importing._prepare_module(space, w_mod, real_name, pkgpath)
-        w_result = importing.load_compiled_module(space, space.newtext(modname), w_mod,
-                                                filename, magic, timestamp,
-                                                buf)
+        importing.log_pyverbose(space, 1, "import %s # compiled from %s\n" %
+                                (modname, filename))
+        w_result = importing.exec_compiled_module(space,
+                                                  space.newtext(modname),
+                                                  w_mod, code_w)
         return w_result
 
     def have_modulefile(self, space, filename):
@@ -382,22 +411,33 @@ def descr_new_zipimporter(space, w_type, name):
     if not ok:
         raise oefmt(get_error(space), "Did not find %s to be a valid zippath",
                     name)
+    w_cached = None
     try:
-        w_result = zip_cache.get(filename)
-        if w_result is None:
+        w_cached = zip_cache.get(filename)
+        if w_cached is None:
             raise oefmt(get_error(space),
                         "Cannot import %s from zipfile, recursion detected or"
                         "already tried and failed", name)
     except KeyError:
         zip_cache.cache[filename] = None
-    try:
-        zip_file = RZipFile(filename, 'r')
-    except (BadZipfile, OSError):
-        raise oefmt(get_error(space), "%s seems not to be a zipfile", filename)
-    except RZlibError as e:
-        # in this case, CPython raises the direct exception coming
-        # from the zlib module: let's do the same
-        raise zlib_error(space, e.msg)
+    if (isinstance(w_cached, W_ZipImporter) and
+            w_cached.archive_mtime == s.st_mtime and
+            w_cached.archive_size == s.st_size):
+        # the archive did not change: reuse its parsed directory instead
+        # of reading it again, which is slow for big archives
+        zip_file = w_cached.zip_file
+        code_cache = w_cached.code_cache
+    else:
+        code_cache = {}
+        try:
+            zip_file = RZipFile(filename, 'r')
+        except (BadZipfile, OSError):
+            raise oefmt(get_error(space), "%s seems not to be a zipfile",
+                        filename)
+        except RZlibError as e:
+            # in this case, CPython raises the direct exception coming
+            # from the zlib module: let's do the same
+            raise zlib_error(space, e.msg)
 
     prefix = name[len(filename):]
     if prefix.startswith(os.path.sep) or prefix.startswith(ZIPSEP):
@@ -405,6 +445,9 @@ def descr_new_zipimporter(space, w_type, name):
     if prefix and not prefix.endswith(ZIPSEP) and not prefix.endswith(os.path.sep):
         prefix += ZIPSEP
     w_result = W_ZipImporter(space, name, filename, zip_file, prefix)
+    w_result.archive_mtime = s.st_mtime
+    w_result.archive_size = s.st_size
+    w_result.code_cache = code_cache
     zip_cache.set(filename, w_result)
     return w_result
 
@@ -138,6 +138,61 @@ class AppTestZipimport:
         assert main_importer.prefix == ""
         assert sub_importer.prefix == "sub" + os.path.sep
 
+    def test_cache_modified_archive(self):
+        import os
+        self.writefile('x.py', 'y = 1')
+        from zipimport import _zip_directory_cache, zipimporter
+        zipimporter(self.zipfile)
+        zipimporter(self.zipfile)    # the archive is not read again
+        assert _zip_directory_cache[self.zipfile].keys() == ['x.py']
+        self.writefile('yy.py', 'y = 2')
+        importer = zipimporter(self.zipfile)
+        assert sorted(_zip_directory_cache[self.zipfile].keys()) == [
+            'x.py', 'yy.py']
+        assert importer.get_data(self.zipfile + os.path.sep + 'yy.py') == (
+            'y = 2')
+
+    def test_cache_code_objects(self):
+        import sys
+        self.writefile('uuu.pyc', self.test_pyc)
+        from zipimport import zipimporter
+        mod1 = zipimporter(self.zipfile).load_module('uuu')
+        del sys.modules['uuu']
+        # a new importer for the unmodified archive does not unmarshal
+        # the .pyc again
+        mod2 = zipimporter(self.zipfile).load_module('uuu')
+        assert mod2 is not mod1
+        assert mod2.get_name.func_code is mod1.get_name.func_code
+        assert mod2.get_name() == 'uuu'
+
+    def test_bad_file_header(self):
+        import os
+        from zipfile import ZipFile
+        from zipimport import _zip_directory_cache, zipimporter
+        from zipimport import ZipImportError
+        self.writefile('x.py', 'y = 1')
+        self.writefile('yy.py', 'y = 2')
+        z = ZipFile(self.zipfile)
+        offsets = [info.header_offset for info in z.infolist()]
+        z.close()
+        with open(self.zipfile, 'rb') as f:
+            data = f.read()
+        def corrupt(offset):
+            with open(self.zipfile, 'wb') as f:
+                f.write(data[:offset] + 'XXXX' + data[offset + 4:])
+        # only the header of the first file is checked by zipimporter()
+        corrupt(offsets[1])
+        importer = zipimporter(self.zipfile)
+        assert importer.get_data(self.zipfile + os.path.sep + 'x.py') == (
+            'y = 1')
+        raises(IOError, importer.get_data,
+               self.zipfile + os.path.sep + 'yy.py')
+        raises(ZipImportError, importer.load_module, 'yy')
+        corrupt(offsets[0])
+        # the size did not change, and maybe not the mtime either
+        del _zip_directory_cache[self.zipfile]
+        raises(ZipImportError, zipimporter, self.zipfile)
+
     def test_good_bad_arguments(self):
         from zipimport import zipimporter
         import os
@@ -352,6 +352,12 @@ class W_DictMultiObject(W_Root):
         F: D[k] = F[k]"""
         init_or_update(space, self, __args__, 'dict.update')
 
+    def ensure_boxed_values(self):    # called by cpyext
+        """Make sure that the values are stored as W_Root objects, so
+        that the ones returned by getitem() stay alive as long as the dict
+        is alive and not modified."""
+        self.get_strategy().ensure_boxed_values(self)
+
     def ensure_object_strategy(self):    # also called by cpyext
         object_strategy = self.space.fromcache(ObjectDictStrategy)
         strategy = self.get_strategy()
@@ -620,6 +626,9 @@ class DictStrategy(object):
     def view_as_kwargs(self, w_dict):
         return (None, None)
 
+    def ensure_boxed_values(self, w_dict):
+        pass
+
     def getiterkeys(self, w_dict):
         raise NotImplementedError
 
@@ -711,16 +720,22 @@ class EmptyDictStrategy(DictStrategy):
     def get_empty_storage(self):
         return self.erase(None)
 
-    def switch_to_correct_strategy(self, w_dict, w_key):
+    def switch_to_correct_strategy(self, w_dict, w_key, w_value):
         if type(w_key) is self.space.StringObjectCls:
-            self.switch_to_bytes_strategy(w_dict)
+            if type(w_value) is self.space.FloatObjectCls:
+                self.switch_to_bytes_float_strategy(w_dict)
+            else:
+                self.switch_to_bytes_strategy(w_dict)
             return
         elif type(w_key) is self.space.UnicodeObjectCls:
             self.switch_to_unicode_strategy(w_dict)
             return
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
-            self.switch_to_int_strategy(w_dict)
+            if type(w_value) is self.space.IntObjectCls:
+                self.switch_to_int_int_strategy(w_dict)
+            else:
+                self.switch_to_int_strategy(w_dict)
         elif w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -732,6 +747,12 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_bytes_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(BytesFloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
     def switch_to_unicode_strategy(self, w_dict):
         strategy = self.space.fromcache(UnicodeDictStrategy)
         storage = strategy.get_empty_storage()
@@ -744,6 +765,12 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.set_strategy(strategy)
         w_dict.dstorage = storage
 
+    def switch_to_int_int_strategy(self, w_dict):
+        strategy = self.space.fromcache(IntIntDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -770,16 +797,19 @@ class EmptyDictStrategy(DictStrategy):
 
     def setdefault(self, w_dict, w_key, w_default):
         # here the dict is always empty
-        self.switch_to_correct_strategy(w_dict, w_key)
+        self.switch_to_correct_strategy(w_dict, w_key, w_default)
         w_dict.setitem(w_key, w_default)
         return w_default
 
     def setitem(self, w_dict, w_key, w_value):
-        self.switch_to_correct_strategy(w_dict, w_key)
+        self.switch_to_correct_strategy(w_dict, w_key, w_value)
         w_dict.setitem(w_key, w_value)
 
     def setitem_str(self, w_dict, key, w_value):
-        self.switch_to_bytes_strategy(w_dict)
+        if type(w_value) is self.space.FloatObjectCls:
+            self.switch_to_bytes_float_strategy(w_dict)
+        else:
+            self.switch_to_bytes_strategy(w_dict)
         w_dict.setitem_str(key, w_value)
 
     def delitem(self, w_dict, w_key):
@@ -1391,6 +1421,240 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+class AbstractUnboxedValueStrategy(object):
+    """Mixin for the strategies that store the values unboxed.  As soon
+    as a value of another type is stored, they switch to the strategy with
+    the same keys and boxed values, returned by get_boxed_strategy().
+    """
+    _mixin_ = True
+
+    def get_boxed_strategy(self):
+        raise NotImplementedError("abstract base class")
+
+    def wrap_value(self, unwrapped):
+        raise NotImplementedError("abstract base class")
+
+    def unwrap_value(self, wrapped):
+        raise NotImplementedError("abstract base class")
+
+    def is_correct_value_type(self, w_obj):
+        raise NotImplementedError("abstract base class")
+
+    def setitem(self, w_dict, w_key, w_value):
+        if not self.is_correct_type(w_key):
+            self.switch_to_object_strategy(w_dict)
+        elif not self.is_correct_value_type(w_value):
+            self.switch_to_boxed_strategy(w_dict)
+        else:
+            d = self.unerase(w_dict.dstorage)
+            d[self.unwrap(w_key)] = self.unwrap_value(w_value)
+            return
+        w_dict.setitem(w_key, w_value)
+
+    def setdefault(self, w_dict, w_key, w_default):
+        if not self.is_correct_type(w_key):
+            self.switch_to_object_strategy(w_dict)
+        elif not self.is_correct_value_type(w_default):
+            self.switch_to_boxed_strategy(w_dict)
+        else:
+            d = self.unerase(w_dict.dstorage)
+            return self.wrap_value(d.setdefault(self.unwrap(w_key),
+                                                self.unwrap_value(w_default)))
+        return w_dict.setdefault(w_key, w_default)
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if self.is_correct_type(w_key):
+            d = self.unerase(w_dict.dstorage)
+            try:
+                value = d[self.unwrap(w_key)]
+            except KeyError:
+                return None
+            return self.wrap_value(value)
+        elif self._never_equal_to(space.type(w_key)):
+            return None
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.getitem(w_key)
+
+    def values(self, w_dict):
+        return [self.wrap_value(value)
+                for value in self.unerase(w_dict.dstorage).values()]
+
+    def items(self, w_dict):
+        space = self.space
+        d = self.unerase(w_dict.dstorage)
+        return [space.newtuple2(self.wrap(key), self.wrap_value(value))
+                for (key, value) in d.iteritems()]
+
+    def popitem(self, w_dict):
+        key, value = self.unerase(w_dict.dstorage).popitem()
+        return (self.wrap(key), self.wrap_value(value))
+
+    def pop(self, w_dict, w_key, w_default):
+        space = self.space
+        if self.is_correct_type(w_key):
+            d = self.unerase(w_dict.dstorage)
+            try:
+                value = d.pop(self.unwrap(w_key))
+            except KeyError:
+                if w_default is not None:
+                    return w_default
+                raise
+            return self.wrap_value(value)
+        elif self._never_equal_to(space.type(w_key)):
+            if w_default is not None:
+                return w_default
+            raise KeyError
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.get_strategy().pop(w_dict, w_key, w_default)
+
+    def ensure_boxed_values(self, w_dict):
+        self.switch_to_boxed_strategy(w_dict)
+
+    def switch_to_boxed_strategy(self, w_dict):
+        d = self.unerase(w_dict.dstorage)
+        strategy = self.get_boxed_strategy()
+        d_new = strategy.unerase(strategy.get_empty_storage())
+        for key, value in d.iteritems():
+            d_new[key] = self.wrap_value(value)
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = strategy.erase(d_new)
+
+    def switch_to_object_strategy(self, w_dict):
+        d = self.unerase(w_dict.dstorage)
+        strategy = self.space.fromcache(ObjectDictStrategy)
+        d_new = strategy.unerase(strategy.get_empty_storage())
+        for key, value in d.iteritems():
+            d_new[self.wrap(key)] = self.wrap_value(value)
+        w_dict.set_strategy(strategy)
+        w_dict.dstorage = strategy.erase(d_new)
+
+
+class IntIntDictStrategy(AbstractUnboxedValueStrategy, AbstractTypedStrategy,
+                         DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("intint")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def get_boxed_strategy(self):
+        return self.space.fromcache(IntDictStrategy)
+
+    def wrap(self, unwrapped):
+        return self.space.newint(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.int_w(wrapped)
+
+    def wrap_value(self, unwrapped):
+        return self.space.newint(unwrapped)
+
+    def unwrap_value(self, wrapped):
+        return self.space.int_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_int)
+
+    def is_correct_value_type(self, w_obj):
+        return type(w_obj) is self.space.IntObjectCls
+
+    def _never_equal_to(self, w_lookup_type):
+        return self.get_boxed_strategy()._never_equal_to(w_lookup_type)
+
+    def listview_int(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def wrapkey(space, key):
+        return space.newint(key)
+
+    def wrapvalue(space, value):
+        return space.newint(value)
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_int(self.listview_int(w_dict))
+
+create_iterator_classes(IntIntDictStrategy)
+
+
+class BytesFloatDictStrategy(AbstractUnboxedValueStrategy,
+                             AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("bytesfloat")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def get_boxed_strategy(self):
+        return self.space.fromcache(BytesDictStrategy)
+
+    def wrap(self, unwrapped):
+        return self.space.newbytes(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.bytes_w(wrapped)
+
+    def wrap_value(self, unwrapped):
+        return self.space.newfloat(unwrapped)
+
+    def unwrap_value(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase({})
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_bytes)
+
+    def is_correct_value_type(self, w_obj):
+        return type(w_obj) is self.space.FloatObjectCls
+
+    def _never_equal_to(self, w_lookup_type):
+        return _never_equal_to_string(self.space, w_lookup_type)
+
+    def setitem_str(self, w_dict, key, w_value):
+        assert key is not None
+        if self.is_correct_value_type(w_value):
+            self.unerase(w_dict.dstorage)[key] = self.unwrap_value(w_value)
+        else:
+            self.switch_to_boxed_strategy(w_dict)
+            w_dict.setitem_str(key, w_value)
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        # -- This is called extremely often.  Hack for performance --
+        if type(w_key) is space.StringObjectCls:
+            return self.getitem_str(w_dict, w_key.unwrap(space))
+        # -- End of performance hack --
+        return AbstractUnboxedValueStrategy.getitem(self, w_dict, w_key)
+
+    def getitem_str(self, w_dict, key):
+        assert key is not None
+        d = self.unerase(w_dict.dstorage)
+        try:
+            value = d[key]
+        except KeyError:
+            return None
+        return self.wrap_value(value)
+
+    def listview_bytes(self, w_dict):
+        return self.unerase(w_dict.dstorage).keys()
+
+    def w_keys(self, w_dict):
+        return self.space.newlist_bytes(self.listview_bytes(w_dict))
+
+    def wrapkey(space, key):
+        return space.newbytes(key)
+
+    def wrapvalue(space, value):
+        return space.newfloat(value)
+
+create_iterator_classes(BytesFloatDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
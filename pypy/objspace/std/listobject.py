@@ -98,14 +98,19 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
         else:
             return space.fromcache(BytesListStrategy)
 
-    elif type(w_firstobj) is W_UnicodeObject and w_firstobj.is_ascii():
-        # check for all-unicodes containing only ascii
+    elif type(w_firstobj) is W_UnicodeObject:
+        # check for all-unicodes, and if they contain only ascii
+        all_ascii = w_firstobj.is_ascii()
         for i in range(1, len(list_w)):
             item = list_w[i]
-            if type(item) is not W_UnicodeObject or not item.is_ascii():
+            if type(item) is not W_UnicodeObject:
                 break
+            if all_ascii and not item.is_ascii():
+                all_ascii = False
         else:
-            return space.fromcache(AsciiListStrategy)
+            if all_ascii:
+                return space.fromcache(AsciiListStrategy)
+            return space.fromcache(UnicodeListStrategy)
 
     elif type(w_firstobj) is W_FloatObject:
         # check for all-floats
@@ -1091,6 +1096,8 @@ class EmptyListStrategy(ListStrategy):
             strategy = self.space.fromcache(BytesListStrategy)
         elif type(w_item) is W_UnicodeObject and w_item.is_ascii():
             strategy = self.space.fromcache(AsciiListStrategy)
+        elif type(w_item) is W_UnicodeObject:
+            strategy = self.space.fromcache(UnicodeListStrategy)
         elif type(w_item) is W_FloatObject:
             strategy = self.space.fromcache(FloatListStrategy)
         else:
@@ -2310,6 +2317,74 @@ class AsciiListStrategy(ListStrategy):
     def getitems_ascii(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def switch_to_unicode_strategy(self, w_list):
+        # the storage is the same, only the strategy changes
+        w_list.strategy = self.space.fromcache(UnicodeListStrategy)
+
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        if type(w_sample_item) is W_UnicodeObject:
+            self.switch_to_unicode_strategy(w_list)
+        else:
+            w_list.switch_to_object_strategy()
+
+    _base_extend_from_list = _extend_from_list
+
+    def _extend_from_list(self, w_list, w_other):
+        if w_other.strategy is self.space.fromcache(UnicodeListStrategy):
+            self.switch_to_unicode_strategy(w_list)
+            w_list.extend(w_other)
+            return
+        return self._base_extend_from_list(w_list, w_other)
+
+    _base_setslice = setslice
+
+    def setslice(self, w_list, start, step, slicelength, w_other):
+        if w_other.strategy is self.space.fromcache(UnicodeListStrategy):
+            self.switch_to_unicode_strategy(w_list)
+            w_list.setslice(start, step, slicelength, w_other)
+            return
+        return self._base_setslice(w_list, start, step, slicelength, w_other)
+
+
+class UnicodeListStrategy(ListStrategy):
+    """ For lists of unicode strings that are not all ascii.  The utf-8
+    strings are stored, and the lengths are computed again when wrapping.
+    """
+    import_from_mixin(AbstractUnwrappedStrategy)
+
+    _none_value = ""
+
+    def wrap(self, stringval):
+        assert stringval is not None
+        return self.space.newutf8(stringval,
+                                  rutf8.codepoints_in_utf8(stringval))
+
+    def unwrap(self, w_string):
+        return self.space.utf8_w(w_string)
+
+    def _quick_cmp(self, a, b):
+        return a is b
+
+    # the same storage as AsciiListStrategy, which switches to this
+    # strategy without copying
+    erase = staticmethod(AsciiListStrategy.erase)
+    unerase = staticmethod(AsciiListStrategy.unerase)
+
+    def is_correct_type(self, w_obj):
+        return type(w_obj) is W_UnicodeObject
+
+    def list_is_correct_type(self, w_list):
+        return (w_list.strategy is self.space.fromcache(UnicodeListStrategy) or
+                w_list.strategy is self.space.fromcache(AsciiListStrategy))
+
+    def sort(self, w_list, reverse):
+        # the utf-8 encoding keeps the order of the code points
+        l = self.unerase(w_list.lstorage)
+        sorter = StringSort(l, len(l))
+        sorter.sort()
+        if reverse:
+            l.reverse()
+
 # _______________________________________________________
 
 init_signature = Signature(['sequence'], None, None)
@@ -1194,6 +1194,81 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_int_int(self):
+        d = {}
+        d[1] = 2
+        assert "IntIntDictStrategy" in self.get_strategy(d)
+        for i in range(10):
+            d[i] = d.get(i, 0) + 1
+        assert "IntIntDictStrategy" in self.get_strategy(d)
+        assert d[1] == 3
+        assert d.setdefault(10, 5) == 5
+        assert d.setdefault(10, 6) == 5
+        assert d.pop(10) == 5
+        assert d.pop(10, None) is None
+        assert d.get("x") is None
+        assert sorted(d.items())[:2] == [(0, 1), (1, 3)]
+        assert sorted(d.values()) == [1] * 9 + [3]
+        assert sorted(d.itervalues()) == [1] * 9 + [3]
+        assert "IntIntDictStrategy" in self.get_strategy(d.copy())
+        #
+        d[0] = True
+        assert "IntIntDictStrategy" not in self.get_strategy(d)
+        assert "IntDictStrategy" in self.get_strategy(d)
+        assert d[0] is True
+        assert d[1] == 3
+
+    def test_int_int_lookup_other_types(self):
+        d = {1: 2}
+        assert d[1L] == 2
+        d = {1: 2}
+        assert d[1.0] == 2
+        d = {1: 2}
+        d["a"] = 3
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {1: 2, "a": 3}
+
+    def test_empty_to_bytes_float(self):
+        import math
+        d = {}
+        d[b"a"] = 1.5
+        assert "BytesFloatDictStrategy" in self.get_strategy(d)
+        d[b"b"] = float("nan")
+        d[b"c"] = -0.0
+        assert "BytesFloatDictStrategy" in self.get_strategy(d)
+        assert d[b"a"] == 1.5
+        assert math.isnan(d[b"b"])
+        assert math.copysign(1.0, d[b"c"]) == -1.0
+        assert d.get(u"a") == 1.5
+        assert d.get(5) is None
+        assert sorted(d.keys()) == [b"a", b"b", b"c"]
+        key, value = d.popitem()
+        assert type(value) is float
+        #
+        d = {b"a": 1.5}
+        d[b"b"] = 2
+        assert "BytesDictStrategy" in self.get_strategy(d)
+        assert type(d[b"b"]) is int
+        assert d == {b"a": 1.5, b"b": 2}
+        #
+        class O(object):
+            pass
+        o = O()
+        d = {}
+        d[b"a"] = o
+        assert "BytesDictStrategy" in self.get_strategy(d)
+
+    def test_update_int_int(self):
+        d1 = {1: 2, 3: 4}
+        d2 = {}
+        d2.update(d1)
+        assert "IntIntDictStrategy" in self.get_strategy(d2)
+        assert d2 == {1: 2, 3: 4}
+        d3 = {5: "x"}
+        d3.update(d1)
+        assert "IntDictStrategy" in self.get_strategy(d3)
+        assert d3 == {1: 2, 3: 4, 5: "x"}
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
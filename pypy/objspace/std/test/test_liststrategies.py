@@ -4,7 +4,7 @@ from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
     SimpleRangeListStrategy, make_range_list, AsciiListStrategy,
-    IntOrFloatListStrategy)
+    UnicodeListStrategy, IntOrFloatListStrategy)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -82,6 +82,58 @@ class TestW_ListStrategies(TestW_ListObject):
         l.append(space.wrap(3))
         assert isinstance(l.strategy, ObjectListStrategy)
 
+    def test_ascii_to_unicode(self):
+        space = self.space
+        w = space.wrap
+        unicode_w = lambda w_x: space.utf8_w(w_x).decode('utf-8')
+        unicode_items = lambda l: [unicode_w(w_x) for w_x in l.getitems()]
+        l = W_ListObject(space, [w(u'a'), w(u'\xe9t\xe9'), w(u'c')])
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        w_item = l.getitem(1)
+        assert unicode_w(w_item) == u'\xe9t\xe9'
+        assert space.len_w(w_item) == 3
+
+        l = W_ListObject(space, [w(u'a'), w(u'b')])
+        assert isinstance(l.strategy, AsciiListStrategy)
+        l.append(w(u'\u1234'))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        l.append(w(u'd'))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        assert unicode_w(l.descr_repr(space)) == (
+            u"[u'a', u'b', u'\\u1234', u'd']")
+        assert l.find_or_count(w(u'\u1234'), 0, 4, False) == 2
+        l.append(w(3))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+        l = W_ListObject(space, [w(u'a'), w(u'b')])
+        l.setitem(0, w(u'\xe9'))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+
+        l = W_ListObject(space, [w(u'a'), w(u'b')])
+        l.extend(W_ListObject(space, [w(u'\xe9')]))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        l.extend(W_ListObject(space, [w(u'c')]))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        assert unicode_items(l) == [
+            u'a', u'b', u'\xe9', u'c']
+
+        l = W_ListObject(space, [w(u'a'), w(u'b')])
+        l.setslice(0, 1, 1, W_ListObject(space, [w(u'\xe9'), w(u'\xe8')]))
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        assert unicode_items(l) == [
+            u'\xe9', u'\xe8', u'b']
+
+    def test_unicode_sort(self):
+        space = self.space
+        w = space.wrap
+        unicode_items = lambda l: [space.utf8_w(w_x).decode('utf-8')
+                                   for w_x in l.getitems()]
+        items = [u'\u1234', u'z', u'\xe9', u'a', u'\U00012345', u'\xe9a']
+        l = W_ListObject(space, [w(x) for x in items])
+        assert isinstance(l.strategy, UnicodeListStrategy)
+        l.sort(False)
+        assert unicode_items(l) == sorted(items)
+
     def test_float_to_any(self):
         l = W_ListObject(self.space,
                          [self.space.wrap(1.1),self.space.wrap(2.2),self.space.wrap(3.3)])
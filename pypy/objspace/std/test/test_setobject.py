@@ -81,7 +81,7 @@ class TestW_SetObject:
     def test_create_set_from_list(self):
         from pypy.interpreter.baseobjspace import W_Root
         from pypy.objspace.std.setobject import BytesSetStrategy, ObjectSetStrategy
-        from pypy.objspace.std.floatobject import W_FloatObject
+        from pypy.objspace.std.setobject import FloatSetStrategy
 
         w = self.space.wrap
         wb = self.space.newbytes
@@ -116,9 +116,9 @@ class TestW_SetObject:
         w_list = W_ListObject(self.space, [w(1.0), w(2.0), w(3.0)])
         w_set = W_SetObject(self.space)
         _initialize_set(self.space, w_set, w_list)
-        assert w_set.strategy is self.space.fromcache(ObjectSetStrategy)
-        for item in w_set.strategy.unerase(w_set.sstorage):
-            assert isinstance(item, W_FloatObject)
+        assert w_set.strategy is self.space.fromcache(FloatSetStrategy)
+        assert sorted(w_set.strategy.unerase(w_set.sstorage).keys()) == [
+            1.0, 2.0, 3.0]
 
         # changed cached object, need to change it back for other tests to pass
         intstr.get_storage_from_list = tmp_func
@@ -155,6 +155,25 @@ class AppTestAppSetTest:
             """)
         self.w_FakeInt = w_fakeint
 
+    def test_floats(self):
+        nan = float('nan')
+        s = set([1.5, nan, -0.0, 0.0, 2.0])
+        assert len(s) == 4
+        assert nan in s
+        assert float('nan') not in s or float('nan') is nan
+        assert 0 in s and 0.0 in s and -0.0 in s
+        assert 2 in s and 3 not in s
+        assert repr([x for x in s if x == 0]) == '[-0.0]'
+        assert s & set([2, 1.5, 7.5]) == set([2.0, 1.5])
+        assert s - set([1.5, 2]) == set([nan, 0.0])
+        assert frozenset([1.5, 2.5]) | frozenset([2.5, 3.5]) == frozenset(
+            [1.5, 2.5, 3.5])
+        assert set([1.0, 2.0]) == set([1, 2])
+        assert set([1.5]) != set(["1.5"])
+        s.discard(2)
+        assert 2.0 not in s
+        assert sorted(set([3.5, 1.5, 2.5, 1.5])) == [1.5, 2.5, 3.5]
+
     def test_fakeint(self):
         f1 = self.FakeInt(4)
         assert f1 == 4
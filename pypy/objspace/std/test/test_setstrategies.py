@@ -2,7 +2,8 @@ from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (
     BytesIteratorImplementation, BytesSetStrategy, EmptySetStrategy,
     IntegerIteratorImplementation, IntegerSetStrategy, ObjectSetStrategy,
-    UnicodeIteratorImplementation, AsciiSetStrategy)
+    UnicodeIteratorImplementation, AsciiSetStrategy, UnicodeSetStrategy,
+    FloatSetStrategy, FloatIteratorImplementation)
 from pypy.objspace.std.listobject import W_ListObject
 
 class TestW_SetStrategies:
@@ -44,6 +45,77 @@ class TestW_SetStrategies:
         s.add(self.space.wrap(u"six"))
         assert s.strategy is self.space.fromcache(AsciiSetStrategy)
 
+    def test_float(self):
+        space = self.space
+        w = space.wrap
+        s = W_SetObject(space, self.wrapped([1.5, 2.5, -0.0, 0.0, 1.5]))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        assert s.length() == 3
+        assert s.has_key(w(0.0))
+        # an int equal to one of the floats does not switch the strategy
+        assert s.has_key(w(0))
+        assert not s.has_key(w(2))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        assert s.remove(w(0))
+        assert s.length() == 2
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        assert isinstance(s.iter(), FloatIteratorImplementation)
+
+        nan = float('nan')
+        s.add(w(nan))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        assert s.has_key(w(nan))
+        s.add(w(nan))
+        assert s.length() == 3
+
+        s = W_SetObject(space, self.wrapped([]))
+        s.add(w(1.5))
+        assert s.strategy is space.fromcache(FloatSetStrategy)
+        s.add(w(1))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+
+        s1 = W_SetObject(space, self.wrapped([1.5, 2.5, 3.5]))
+        s2 = W_SetObject(space, self.wrapped([2.5, 3.5, 4.5]))
+        s3 = s1.intersect(s2)
+        assert s3.strategy is space.fromcache(FloatSetStrategy)
+        assert sorted(space.float_w(w_x) for w_x in s3.getkeys()) == [2.5, 3.5]
+        s3 = s1.difference(s2)
+        assert s3.strategy is space.fromcache(FloatSetStrategy)
+        assert space.float_w(s3.getkeys()[0]) == 1.5
+        s1.update(s2)
+        assert s1.strategy is space.fromcache(FloatSetStrategy)
+        assert s1.length() == 4
+
+    def test_non_ascii_unicode(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([u"a", u"\xe9t\xe9"]))
+        assert s.strategy is space.fromcache(UnicodeSetStrategy)
+        assert s.has_key(space.wrap(u"\xe9t\xe9"))
+        w_items = s.getkeys()
+        assert sorted([space.len_w(w_x) for w_x in w_items]) == [1, 3]
+
+        s = W_SetObject(space, self.wrapped([u"a", u"b"]))
+        assert not s.has_key(space.wrap(u"\xe9"))
+        assert not s.remove(space.wrap(u"\xe9"))
+        assert s.strategy is space.fromcache(AsciiSetStrategy)
+        s.add(space.wrap(u"\xe9"))
+        assert s.strategy is space.fromcache(UnicodeSetStrategy)
+        assert s.has_key(space.wrap(u"a"))
+        assert s.has_key(space.wrap(u"\xe9"))
+        s.add(space.wrap(u"c"))
+        assert s.strategy is space.fromcache(UnicodeSetStrategy)
+        assert s.length() == 4
+
+        s1 = W_SetObject(space, self.wrapped([u"a", u"b"]))
+        s2 = W_SetObject(space, self.wrapped([u"\u1234"]))
+        s1.update(s2)
+        assert s1.strategy is space.fromcache(UnicodeSetStrategy)
+        s1.update(W_SetObject(space, self.wrapped([u"c"])))
+        assert s1.strategy is space.fromcache(UnicodeSetStrategy)
+        assert s1.length() == 4
+        assert s1.has_key(space.wrap(u"\u1234"))
+        assert s1.has_key(space.wrap(u"c"))
+
     def test_symmetric_difference(self):
         s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
         s2 = W_SetObject(self.space, self.wrapped(["six", "seven"]))
@@ -0,0 +1,355 @@
+#! /usr/bin/env python
+"""
+Analyzes a dumpfile produced by gc.dump_rpy_heap(), and optionally a
+typeids.txt.  Computes the dominator tree of the heap and prints the
+types that use the most memory, both directly and by what they keep
+alive (their "retained size"), and the single objects retaining the
+most memory.
+
+Syntax:  heapanalyze.py  [--top=N]  <dumpfile>  [<typeids.txt>]
+
+By default, typeids.txt is loaded from the same dir as dumpfile.
+
+Both the word-based format and the compact format written by
+gc.dump_rpy_heap(file, compact=True) are supported.  The compact format
+starts with the 8 bytes 'RPYHEAP1' followed by one byte giving the size
+of a machine word.  Then all numbers are varints: 7 bits per byte, least
+significant group first, with the high bit set on all bytes but the
+last.  Signed numbers are zigzag-encoded first.  The dump is:
+
+    [object]*  [0]  [object]*  [0]
+
+where the objects before the first [0] are the GC roots.  Each object is:
+
+    [typeindex+1] [addr delta] [size] [ref delta+1]* [0]
+
+Addresses are counted in words.  The address delta is signed and
+relative to the address of the previous object (or 0 for the first
+one); the ref deltas are signed and relative to the address of the
+object itself.
+"""
+import sys, os, array
+
+
+MAGIC = 'RPYHEAP1'
+
+
+class HeapGraph(object):
+    """The objects of a dump, numbered from 0 to num_objects-1 in the
+    order of the dump.  The first 'num_roots' ones are the GC roots.
+    The references of the object 'i' are the object numbers
+    refs[refstart[i]:refstart[i+1]]."""
+
+    def __init__(self):
+        self.addrs = []
+        self.typenums = array.array('l')
+        self.sizes = array.array('l')
+        self.refstart = array.array('l', [0])
+        self.refs = array.array('l')
+        self.num_roots = -1
+
+    @property
+    def num_objects(self):
+        return len(self.typenums)
+
+    def add_object(self, addr, typenum, size, refaddrs):
+        self.addrs.append(addr)
+        self.typenums.append(typenum)
+        self.sizes.append(size)
+        self.refs.extend(refaddrs)
+        self.refstart.append(len(self.refs))
+
+    def end_roots(self):
+        self.num_roots = self.num_objects
+
+    def resolve_refs(self):
+        # turn the addresses in 'refs' into object numbers
+        index = {}
+        for i, addr in enumerate(self.addrs):
+            index[addr] = i
+        refs = self.refs
+        for j in range(len(refs)):
+            refs[j] = index[refs[j]]
+        if self.num_roots < 0:
+            self.num_roots = self.num_objects
+
+    def successors(self, i):
+        return self.refs[self.refstart[i]:self.refstart[i + 1]]
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+def read_compact_dump(data):
+    """Parses a compact dump, given as a string."""
+    if not data.startswith(MAGIC):
+        raise ValueError("not a compact heap dump")
+    data = bytearray(data)
+    wordsize = data[len(MAGIC)]
+    pos = len(MAGIC) + 1
+    end = len(data)
+    graph = HeapGraph()
+    prev_addr = 0
+    markers = 0
+    refaddrs = []
+    while pos < end:
+        typenum, pos = _read_varint(data, pos)
+        if typenum == 0:
+            markers += 1
+            if markers == 1:
+                graph.end_roots()
+                continue
+            break
+        delta, pos = _read_varint(data, pos)
+        addr = prev_addr + _unzigzag(delta)
+        size, pos = _read_varint(data, pos)
+        del refaddrs[:]
+        while True:
+            ref, pos = _read_varint(data, pos)
+            if ref == 0:
+                break
+            refaddrs.append((addr + _unzigzag(ref - 1)) * wordsize)
+        graph.add_object(addr * wordsize, typenum - 1, size, refaddrs)
+        prev_addr = addr
+    if markers != 2:
+        raise ValueError("truncated compact heap dump")
+    graph.resolve_refs()
+    return graph
+
+def read_word_dump(data):
+    """Parses a dump in the word-based format, given as a string."""
+    a = array.array('l')
+    a.fromstring(data[:len(data) - len(data) % a.itemsize])
+    if len(a) < 2 or a[-1] != -1 or a[-2] == -1:
+        raise ValueError("invalid or truncated dump file (or 32/64-bit mix)")
+    graph = HeapGraph()
+    i = 0
+    while i < len(a):
+        j = i + 3
+        while a[j] != -1:
+            j += 1
+        if a[i] == 0 and j == i + 3:
+            graph.end_roots()
+        else:
+            graph.add_object(a[i], a[i+1], a[i+2], a[i+3:j])
+        i = j + 1
+    graph.resolve_refs()
+    return graph
+
+def read_dump(filename):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        return read_compact_dump(data)
+    return read_word_dump(data)
+
+
+class Dominators(object):
+    """Dominator tree of a HeapGraph, computed with the iterative
+    algorithm of Cooper, Harvey and Kennedy.  A virtual root, numbered
+    'graph.num_objects', points to all the GC roots.  'idom[i]' is the
+    immediate dominator of the object 'i', and 'retained[i]' is the
+    total size of the objects that would be freed if 'i' was freed."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.root = graph.num_objects
+        self.postorder = self._compute_postorder()
+        self.idom = self._compute_idom()
+        self.retained = self._compute_retained()
+
+    def _succ(self, node):
+        if node == self.root:
+            return range(self.graph.num_roots)
+        return self.graph.successors(node)
+
+    def _compute_postorder(self):
+        seen = bytearray(self.root + 1)
+        postorder = []
+        seen[self.root] = 1
+        stack = [(self.root, iter(self._succ(self.root)))]
+        while stack:
+            node, it = stack[-1]
+            for child in it:
+                if not seen[child]:
+                    seen[child] = 1
+                    stack.append((child, iter(self._succ(child))))
+                    break
+            else:
+                stack.pop()
+                postorder.append(node)
+        return postorder
+
+    def _compute_idom(self):
+        root = self.root
+        po = array.array('l', [-1]) * (root + 1)
+        for i, node in enumerate(self.postorder):
+            po[node] = i
+        preds = [[] for i in range(root + 1)]
+        for node in self.postorder:
+            for child in self._succ(node):
+                preds[child].append(node)
+        idom = array.array('l', [-1]) * (root + 1)
+        idom[root] = root
+        rpo = self.postorder[-2::-1]     # without the root
+        changed = True
+        while changed:
+            changed = False
+            for node in rpo:
+                new_idom = -1
+                for p in preds[node]:
+                    if idom[p] == -1:
+                        continue
+                    if new_idom == -1:
+                        new_idom = p
+                        continue
+                    # intersect
+                    a = p
+                    b = new_idom
+                    while a != b:
+                        while po[a] < po[b]:
+                            a = idom[a]
+                        while po[b] < po[a]:
+                            b = idom[b]
+                    new_idom = a
+                if idom[node] != new_idom:
+                    idom[node] = new_idom
+                    changed = True
+        return idom
+
+    def _compute_retained(self):
+        # a node always comes after all the nodes it dominates in the
+        # DFS postorder
+        sizes = self.graph.sizes
+        retained = array.array('l', [0]) * (self.root + 1)
+        for node in self.postorder:
+            if node != self.root:
+                retained[node] += sizes[node]
+                retained[self.idom[node]] += retained[node]
+        return retained
+
+    def children(self):
+        result = [[] for i in range(self.root + 1)]
+        for node in self.postorder:
+            if node != self.root:
+                result[self.idom[node]].append(node)
+        return result
+
+    def retained_by_type(self):
+        """Returns {typenum: retained size}, where the retained size of a
+        type counts each object only once, even if it is retained by
+        several objects of that type dominating each other."""
+        typenums = self.graph.typenums
+        children = self.children()
+        active = {}
+        result = {}
+        stack = [(self.root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            if node == self.root:
+                stack.extend([(child, False) for child in children[node]])
+                continue
+            t = typenums[node]
+            if leaving:
+                active[t] -= 1
+                continue
+            if not active.get(t):
+                result[t] = result.get(t, 0) + self.retained[node]
+            active[t] = active.get(t, 0) + 1
+            stack.append((node, True))
+            stack.extend([(child, False) for child in children[node]])
+        return result
+
+
+def summarize_types(graph):
+    """Returns {typenum: [count, totalsize]}."""
+    summary = {}
+    for i in range(graph.num_objects):
+        typenum = graph.typenums[i]
+        try:
+            stat = summary[typenum]
+        except KeyError:
+            stat = summary[typenum] = [0, 0]
+        stat[0] += 1
+        stat[1] += graph.sizes[i]
+    return summary
+
+
+def print_report(graph, doms, typeids, top=20):
+    def name(typenum):
+        return typeids.get(typenum, '<typenum %d>' % typenum)
+    def mb(size):
+        return size / (1024.0 * 1024.0)
+    #
+    summary = summarize_types(graph)
+    retained = doms.retained_by_type()
+    total = doms.retained[doms.root]
+    print '%d objects, %.1fM in total, %d roots' % (
+        graph.num_objects, mb(total), graph.num_roots)
+    print
+    print 'Types using the most memory:'
+    print '%10s %10s %10s  %s' % ('count', 'size', 'retained', 'type')
+    items = sorted(summary.items(), key=lambda (t, stat): stat[1],
+                   reverse=True)
+    for typenum, (count, size) in items[:top]:
+        print '%10d %9.2fM %9.2fM  %s' % (count, mb(size),
+                                          mb(retained.get(typenum, 0)),
+                                          name(typenum))
+    print
+    print 'Types retaining the most memory:'
+    print '%10s %10s  %s' % ('count', 'retained', 'type')
+    items = sorted(retained.items(), key=lambda (t, size): size,
+                   reverse=True)
+    for typenum, size in items[:top]:
+        print '%10d %9.2fM  %s' % (summary[typenum][0], mb(size),
+                                   name(typenum))
+    print
+    print 'Objects retaining the most memory:'
+    print '%18s %10s %10s  %s' % ('address', 'size', 'retained', 'type')
+    nodes = sorted(range(graph.num_objects), key=doms.retained.__getitem__,
+                   reverse=True)
+    for i in nodes[:top]:
+        print '%18s %9.2fM %9.2fM  %s' % (hex(graph.addrs[i]),
+                                          mb(graph.sizes[i]),
+                                          mb(doms.retained[i]),
+                                          name(graph.typenums[i]))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    top = 20
+    if args and args[0].startswith('--top='):
+        top = int(args.pop(0)[len('--top='):])
+    if not args:
+        print >> sys.stderr, __doc__
+        sys.exit(2)
+    print >> sys.stderr, 'loading...',
+    graph = read_dump(args[0])
+    print >> sys.stderr, 'dominators...',
+    doms = Dominators(graph)
+    print >> sys.stderr, 'done'
+    #
+    if len(args) > 1:
+        typeid_name = args[1]
+    else:
+        typeid_name = os.path.join(os.path.dirname(args[0]), 'typeids.txt')
+    from gcdump import Stat     # same directory
+    stat = Stat()
+    if os.path.isfile(typeid_name):
+        stat.load_typeids(typeid_name)
+    else:
+        import zlib, gc
+        stat.load_typeids(zlib.decompress(gc.get_typeids_z()).split("\n"))
+    #
+    print_report(graph, doms, stat.typeids, top)
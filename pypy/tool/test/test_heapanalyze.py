@@ -0,0 +1,107 @@
+from pypy.tool import heapanalyze
+
+
+def encode_uint(value):
+    result = []
+    while value >= 0x80:
+        result.append(chr((value & 0x7f) | 0x80))
+        value >>= 7
+    result.append(chr(value))
+    return ''.join(result)
+
+def zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def make_compact_dump(roots, objects):
+    """'roots' and 'objects' are lists of (addr, typenum, size, refs)."""
+    result = [heapanalyze.MAGIC, chr(8)]
+    prev_addr = 0
+    for section in [roots, objects]:
+        for addr, typenum, size, refs in section:
+            result.append(encode_uint(typenum + 1))
+            result.append(encode_uint(zigzag(addr - prev_addr)))
+            result.append(encode_uint(size))
+            for ref in refs:
+                result.append(encode_uint(zigzag(ref - addr) + 1))
+            result.append(encode_uint(0))
+            prev_addr = addr
+        result.append(encode_uint(0))
+    return ''.join(result)
+
+#     root1 -> A -> C -> E
+#     root2 -> B -> C
+#                   B -> D -> F <-> G
+ROOTS = [(100, 1, 16, [200]),
+         (110, 1, 16, [300])]
+OBJECTS = [(200, 2, 24, [400]),
+           (300, 2, 24, [400, 500]),
+           (400, 3, 1000, [600]),
+           (600, 4, 32, []),
+           (500, 3, 48, [700]),
+           (700, 4, 8, [710]),
+           (710, 4, 8, [700])]
+
+
+def test_read_compact_dump():
+    graph = heapanalyze.read_compact_dump(make_compact_dump(ROOTS, OBJECTS))
+    assert graph.num_objects == 9
+    assert graph.num_roots == 2
+    assert graph.addrs == [8 * addr for addr in
+                           [100, 110, 200, 300, 400, 600, 500, 700, 710]]
+    assert list(graph.typenums) == [1, 1, 2, 2, 3, 4, 3, 4, 4]
+    assert list(graph.successors(3)) == [4, 6]
+    assert list(graph.successors(5)) == []
+
+def test_read_compact_dump_large_numbers():
+    roots = [(-2**40, 7, 2**33, [2**40])]
+    objects = [(2**40, 300, 5, [])]
+    graph = heapanalyze.read_compact_dump(make_compact_dump(roots, objects))
+    assert graph.addrs == [-2**43, 2**43]
+    assert list(graph.typenums) == [7, 300]
+    assert list(graph.sizes) == [2**33, 5]
+
+def test_dominators():
+    graph = heapanalyze.read_compact_dump(make_compact_dump(ROOTS, OBJECTS))
+    doms = heapanalyze.Dominators(graph)
+    root = doms.root
+    idom = dict((graph.addrs[i] // 8, doms.idom[i])
+                for i in range(graph.num_objects))
+    def addr(i):
+        if i == root:
+            return 'root'
+        return graph.addrs[i] // 8
+    assert addr(idom[100]) == 'root'
+    assert addr(idom[110]) == 'root'
+    assert addr(idom[200]) == 100
+    assert addr(idom[300]) == 110
+    assert addr(idom[400]) == 'root'     # reachable from both roots
+    assert addr(idom[600]) == 400
+    assert addr(idom[500]) == 300
+    assert addr(idom[700]) == 500
+    assert addr(idom[710]) == 700
+    #
+    retained = dict((graph.addrs[i] // 8, doms.retained[i])
+                    for i in range(graph.num_objects))
+    assert retained[400] == 1032
+    assert retained[100] == 40
+    assert retained[110] == 16 + 24 + 48 + 8 + 8
+    assert doms.retained[root] == sum(graph.sizes)
+
+def test_retained_by_type():
+    graph = heapanalyze.read_compact_dump(make_compact_dump(ROOTS, OBJECTS))
+    doms = heapanalyze.Dominators(graph)
+    retained = doms.retained_by_type()
+    assert retained[1] == 16 + 24 + 16 + 24 + 48 + 8 + 8
+    assert retained[3] == 1000 + 32 + 48 + 8 + 8
+    assert retained[4] == 32 + 8 + 8     # 710 is not counted twice
+
+def test_read_word_dump():
+    import array
+    a = array.array('l')
+    for section in [ROOTS, [(0, 0, 0, [])], OBJECTS]:
+        for addr, typenum, size, refs in section:
+            a.extend([addr, typenum, size] + refs + [-1])
+    graph = heapanalyze.read_word_dump(a.tostring())
+    assert graph.num_objects == 9
+    assert graph.num_roots == 2
+    assert list(graph.successors(3)) == [4, 6]
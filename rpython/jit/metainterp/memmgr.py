@@ -19,6 +19,20 @@ from rpython.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# Additionally, if a maximum code size is set, the total size of the
+# machine code of the loops in 'alive_loops' is checked regularly.  If
+# it is too big, the least recently used loops are removed until it is
+# below 3/4 of the maximum.  A loop is "used" when it is compiled or
+# entered from the interpreter, which is when its generation is updated.
+#
+
+CODE_SIZE_CHECK_FREQUENCY = 20
+
+def get_code_size(looptoken):
+    clt = looptoken.compiled_loop_token
+    if clt is None:
+        return 0
+    return clt.get_code_size()
 
 class MemoryManager(object):
 
@@ -37,6 +51,8 @@ class MemoryManager(object):
         # per second
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
+        self.max_code_size = 0
+        self.next_code_size_check = r_int64(-1)
         self.alive_loops = {}
 
     def set_max_age(self, max_age, check_frequency=0):
@@ -49,11 +65,23 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_max_code_size(self, max_code_size):
+        if max_code_size <= 0:
+            self.next_code_size_check = r_int64(-1)
+        else:
+            self.max_code_size = max_code_size
+            self.next_code_size_check = (self.current_generation +
+                                         CODE_SIZE_CHECK_FREQUENCY)
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
+        if self.current_generation == self.next_code_size_check:
+            self._kill_least_recently_used_loops()
+            self.next_code_size_check = (self.current_generation +
+                                         CODE_SIZE_CHECK_FREQUENCY)
 
     def keep_loop_alive(self, looptoken):
         if looptoken.generation != self.current_generation:
@@ -82,6 +110,42 @@ class MemoryManager(object):
             rgc.collect(); rgc.collect(); rgc.collect()
         debug_stop("jit-mem-collect")
 
+    def _kill_least_recently_used_loops(self):
+        debug_start("jit-mem-codesize")
+        sizes = {}     # {generation: code size of the loops of it}
+        total = 0
+        for looptoken in self.alive_loops:
+            generation = looptoken.generation
+            if generation < 0:
+                continue     # kept alive forever, don't count it
+            size = get_code_size(looptoken)
+            total += size
+            sizes[generation] = sizes.get(generation, 0) + size
+        debug_print("Code size of the loops:", total)
+        if total > self.max_code_size:
+            target = self.max_code_size - self.max_code_size // 4
+            generations = sizes.keys()
+            generations.sort()
+            max_generation = r_int64(-1)
+            for generation in generations:
+                if total <= target or generation >= self.current_generation:
+                    break
+                total -= sizes[generation]
+                max_generation = generation
+            oldtotal = len(self.alive_loops)
+            for looptoken in self.alive_loops.keys():
+                if (0 <= looptoken.generation <= max_generation or
+                    looptoken.invalidated):
+                    del self.alive_loops[looptoken]
+            newtotal = len(self.alive_loops)
+            debug_print("Loop tokens freed: ", oldtotal - newtotal)
+            debug_print("Loop tokens left:  ", newtotal)
+            if not we_are_translated() and oldtotal != newtotal:
+                looptoken = None
+                from rpython.rlib import rgc
+                rgc.collect(); rgc.collect(); rgc.collect()
+        debug_stop("jit-mem-codesize")
+
     def release_all_loops(self):
         debug_start("jit-mem-releaseall")
         debug_print("Loop tokens cleared:", len(self.alive_loops))
@@ -17,10 +17,19 @@ from rpython.rlib.jit import JitDriver, dont_look_inside
 from rpython.jit.metainterp.warmspot import get_stats
 from rpython.jit.metainterp.warmstate import BaseJitCell
 from rpython.rlib import rgc
+from rpython.rlib.rarithmetic import r_int64
 
 class FakeLoopToken:
     generation = 0
     invalidated = False
+    compiled_loop_token = None
+
+class FakeCompiledLoopToken:
+    def __init__(self, size):
+        self.size = size
+
+    def get_code_size(self):
+        return self.size
 
 
 class _TestMemoryManager:
@@ -78,6 +87,57 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_max_code_size(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(1000)
+        tokens = [FakeLoopToken() for i in range(40)]
+        for token in tokens:
+            token.compiled_loop_token = FakeCompiledLoopToken(100)
+        def run(start, stop):
+            for i in range(start, stop):
+                memmgr.keep_loop_alive(tokens[i])
+                # tokens[0] is entered again all the time
+                memmgr.keep_loop_alive(tokens[0])
+                memmgr.next_generation()
+        # at the 20th generation, 20 loops are alive, so the least
+        # recently used ones are freed down to 750 bytes
+        run(0, 20)
+        assert memmgr.alive_loops == dict.fromkeys([tokens[0]] +
+                                                   tokens[14:20])
+        # and again at the 40th generation
+        run(20, 40)
+        assert memmgr.alive_loops == dict.fromkeys([tokens[0]] +
+                                                   tokens[34:40])
+
+    def test_max_code_size_keep_forever(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(1000)
+        forever = FakeLoopToken()
+        forever.generation = r_int64(-1)
+        forever.compiled_loop_token = FakeCompiledLoopToken(900)
+        memmgr.alive_loops[forever] = None
+        tokens = [FakeLoopToken() for i in range(20)]
+        for token in tokens:
+            token.compiled_loop_token = FakeCompiledLoopToken(100)
+            memmgr.keep_loop_alive(token)
+            memmgr.next_generation()
+        # the loop with generation -1 is never freed, and its code size
+        # doesn't make all the other loops go away
+        assert memmgr.alive_loops == dict.fromkeys([forever] + tokens[13:20])
+
+    def test_max_code_size_disabled(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(0)
+        memmgr.set_max_code_size(0)
+        tokens = [FakeLoopToken() for i in range(40)]
+        for token in tokens:
+            token.compiled_loop_token = FakeCompiledLoopToken(100)
+            memmgr.keep_loop_alive(token)
+            memmgr.next_generation()
+        assert memmgr.alive_loops == dict.fromkeys(tokens)
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
@@ -166,6 +166,14 @@ class GCBase(object):
         self.collect()
         return True
 
+    def compact(self):
+        self.collect()
+        return 0
+
+    def freeze(self):
+        self.collect()
+        return 0
+
     def malloc(self, typeid, length=0, zero=False):
         """NOT_RPYTHON
         For testing.  The interface used by the gctransformer is
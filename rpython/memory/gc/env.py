@@ -49,6 +49,25 @@ def read_float_from_env(varname):
         return 0.0
     return value
 
+def read_time_from_env(varname):
+    # returns a number of seconds; accepts the suffixes s, ms and us
+    value = os.environ.get(varname)
+    if value:
+        factor = 1.0
+        if value.endswith('s'):
+            value = value[:-1]
+            if value.endswith('u'):
+                value = value[:-1]
+                factor = 0.000001
+            elif value.endswith('m'):
+                value = value[:-1]
+                factor = 0.001
+        try:
+            return float(value) * factor
+        except ValueError:
+            pass
+    return 0.0
+
 
 # ____________________________________________________________
 # Get the total amount of RAM installed in a system.
@@ -9,12 +9,32 @@ Environment variables can be used to fine-tune the following parameters:
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
+ PYPY_GC_NURSERY_MAX     If set to more than the nursery size, the nursery
+                         becomes adaptive: it starts at PYPY_GC_NURSERY and
+                         is resized after every minor collection, between
+                         PYPY_GC_NURSERY_MIN and this value, based on the
+                         survival rate and on PYPY_GC_MINOR_PAUSE.
+
+ PYPY_GC_NURSERY_MIN     The minimal size of an adaptive nursery.  Defaults
+                         to 1/4 of PYPY_GC_NURSERY.
+
+ PYPY_GC_MINOR_PAUSE     The target duration of minor collections for an
+                         adaptive nursery, like '500us' or '2ms'.  Defaults
+                         to '1ms'.
+
  PYPY_GC_INCREMENT_STEP  The size of memory marked during the marking step.
                          Default is size of nursery * 2. If you mark it too high
                          your GC is not incremental at all. The minimum is set
                          to size that survives minor collection * 1.5 so we
                          reclaim anything all the time.
 
+ PYPY_GC_MAX_PAUSE       If set to a duration like '2ms', the amount of work
+                         done by each marking and sweeping step of a major
+                         collection is computed from the measured speed of
+                         the GC, to make the step last about this long.
+                         Then PYPY_GC_INCREMENT_STEP is ignored.  Off by
+                         default.
+
  PYPY_GC_MAJOR_COLLECT   Major collection memory factor.  Default is '1.82',
                          which means trigger a major collection when the
                          memory consumed equals 1.82 times the memory
@@ -52,6 +72,13 @@ Environment variables can be used to fine-tune the following parameters:
                          in time.  Defaults to a conservative value depending
                          on nursery size and maximum object size inside the
                          nursery.  Useful for debugging by setting it to 0.
+
+ PYPY_GC_COMPACT         If set to a value like '0.25', then at the end of a
+                         major collection, if more than this fraction of the
+                         memory of the arenas is in free pages, the memory
+                         of these free pages is given back to the OS.  The
+                         default is 0, which means this is only done by
+                         gc.compact().
 """
 # XXX Should find a way to bound the major collection threshold by the
 # XXX total addressable size.  Maybe by keeping some minimarkpage arenas
@@ -289,6 +316,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  growth_rate_max=2.5,   # for tests
                  card_page_indices=0,
                  large_object=8*WORD,
+                 nursery_max_size=0,
+                 nursery_min_size=0,
+                 minor_pause_target=0.001,
                  ArenaCollectionClass=None,
                  **kwds):
         "NOT_RPYTHON"
@@ -296,6 +326,26 @@ class IncrementalMiniMarkGC(MovingGCBase):
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        self.nursery_cur_size = nursery_size
+        self.nursery_max_size = nursery_max_size
+        self.nursery_min_size = nursery_min_size
+        self.nursery_initial_size = nursery_size
+        self.nursery_adaptive = False
+        self.nursery_exhausted = False
+        self.minor_pause_target = minor_pause_target
+        self.compact_threshold = 0.0
+        #
+        # The target duration of major collection steps, or 0.0 to use
+        # 'gc_increment_step' and the nursery size instead.  In that mode,
+        # the measured speed of marking (bytes per second) and sweeping
+        # (pages or raw-malloced objects per second) are kept here.
+        self.max_pause = 0.0
+        self.mark_rate = 0.0
+        self.sweep_rate = 0.0
+        self.rawsweep_rate = 0.0
+        # While a minor collection and the major collection steps that
+        # follow it are running, the time at which 'max_pause' runs out.
+        self.pause_deadline = 0.0
 
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
@@ -306,6 +356,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.max_heap_size_already_raised = False
         self.max_delta = float(r_uint(-1))
         self.max_number_of_pinned_objects = 0      # computed later
+        self.max_pinned_objects_from_env = False
         #
         self.card_page_indices = card_page_indices
         if self.card_page_indices > 0:
@@ -351,6 +402,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # A list of all prebuilt GC objects that contain pointers to the heap
         self.prebuilt_root_objects = self.AddressStack()
         #
+        # The total size of the objects made immortal by freeze(), and
+        # a dict used only during freeze()
+        self.frozen_memory = r_uint(0)
+        self.freeze_excluded = self.null_address_dict()
+        #
         self._init_writebarrier_logic()
         #
         # The size of all the objects turned from 'young' to 'old'
@@ -366,6 +422,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # for more details.
         self.size_objects_made_old = r_uint(0)
         self.threshold_objects_made_old = r_uint(0)
+        #
+        # Used by visit() to account for the objects without gc pointers
+        # that are marked directly while tracing their parent.
+        self.size_marked_eagerly = 0
 
 
     def setup(self):
@@ -441,14 +501,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # up the env var, which requires the GC; and then really
         # allocate the nursery of the final size.
         if not self.read_from_env:
-            self.allocate_nursery()
             self.gc_increment_step = self.nursery_size * 4
+            self.set_nursery_sizes(self.nursery_size, self.nursery_max_size)
+            self.allocate_nursery()
             self.gc_nursery_debug = False
         else:
             #
             defaultsize = self.nursery_size
             minsize = 2 * (self.nonlarge_max + 1)
-            self.nursery_size = minsize
+            self.set_nursery_sizes(minsize, 0)
             self.allocate_nursery()
             #
             # From there on, the GC is fully initialized and the code
@@ -494,6 +555,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
             else:
                 self.max_delta = 0.125 * env.get_total_memory()
 
+            compact_threshold = env.read_float_from_env('PYPY_GC_COMPACT')
+            if compact_threshold > 0.0:
+                self.compact_threshold = compact_threshold
+            #
+            max_pause = env.read_time_from_env('PYPY_GC_MAX_PAUSE')
+            if max_pause > 0.0:
+                self.max_pause = max_pause
+            #
             gc_increment_step = env.read_uint_from_env('PYPY_GC_INCREMENT_STEP')
             if gc_increment_step > 0:
                 self.gc_increment_step = gc_increment_step
@@ -505,13 +574,23 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.gc_nursery_debug = True
             else:
                 self.gc_nursery_debug = False
+            #
+            maxsize = 0
+            if self.debug_tiny_nursery < 0:
+                maxsize = env.read_from_env('PYPY_GC_NURSERY_MAX')
+                self.nursery_min_size = env.read_from_env(
+                    'PYPY_GC_NURSERY_MIN')
+                pause = env.read_time_from_env('PYPY_GC_MINOR_PAUSE')
+                if pause > 0.0:
+                    self.minor_pause_target = pause
             self._minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
-            self.nursery_size = newsize
+            self.set_nursery_sizes(newsize, maxsize)
             self.allocate_nursery()
         #
         env_max_number_of_pinned_objects = os.environ.get('PYPY_GC_MAX_PINNED')
         if env_max_number_of_pinned_objects:
+            self.max_pinned_objects_from_env = True
             try:
                 env_max_number_of_pinned_objects = int(env_max_number_of_pinned_objects)
             except ValueError:
@@ -519,10 +598,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             if env_max_number_of_pinned_objects >= 0: # 0 allows to disable pinning completely
                 self.max_number_of_pinned_objects = env_max_number_of_pinned_objects
-        else:
-            # Estimate this number conservatively
-            bigobj = self.nonlarge_max + 1
-            self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
+        if not self.max_pinned_objects_from_env:
+            self._estimate_max_number_of_pinned_objects()
+
+    def _estimate_max_number_of_pinned_objects(self):
+        # Estimate this number conservatively, from the part of the
+        # nursery that is currently used
+        bigobj = self.nonlarge_max + 1
+        self.max_number_of_pinned_objects = (self.nursery_cur_size /
+                                             (bigobj * 2))
 
     def enable(self):
         self.enabled = True
@@ -533,6 +617,26 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def isenabled(self):
         return self.enabled
 
+    def set_nursery_sizes(self, initsize, maxsize):
+        # 'nursery_size' is the size of the nursery that we allocate, and
+        # 'nursery_cur_size' is the part of it that is used between two
+        # minor collections.  They are always equal unless the nursery is
+        # adaptive, in which case 'nursery_size' is the maximum size.
+        minsize = 2 * (self.nonlarge_max + 1)
+        self.nursery_initial_size = initsize
+        self.nursery_cur_size = initsize
+        if maxsize > initsize:
+            self.nursery_adaptive = True
+            self.nursery_size = maxsize & ~(WORD-1)
+            if self.nursery_min_size <= 0:
+                self.nursery_min_size = initsize // 4
+            self.nursery_min_size = min(max(self.nursery_min_size, minsize),
+                                        initsize) & ~(WORD-1)
+        else:
+            self.nursery_adaptive = False
+            self.nursery_size = initsize
+            self.nursery_min_size = initsize
+
     def _nursery_memory_size(self):
         extra = self.nonlarge_max + 1
         return self.nursery_size + extra
@@ -550,11 +654,15 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def allocate_nursery(self):
         debug_start("gc-set-nursery-size")
         debug_print("nursery size:", self.nursery_size)
+        if self.nursery_adaptive:
+            debug_print("adaptive nursery, initial size:",
+                        self.nursery_cur_size, "min size:",
+                        self.nursery_min_size)
         self.nursery = self._alloc_nursery()
         # the current position in the nursery:
         self.nursery_free = self.nursery
         # the end of the nursery:
-        self.nursery_top = self.nursery + self.nursery_size
+        self.nursery_top = self.nursery + self.nursery_cur_size
         # initialize the threshold
         self.min_heap_size = max(self.min_heap_size, self.nursery_size *
                                               self.major_collection_threshold)
@@ -627,10 +735,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             llarena.arena_protect(newnurs, self._nursery_memory_size(), False)
             self.nursery = newnurs
-            self.nursery_top = self.nursery + self.nursery_size
+            self.nursery_top = self.nursery + self.nursery_cur_size
             debug_print("switching from nursery", oldnurs,
                         "to nursery", self.nursery,
-                        "size", self.nursery_size)
+                        "size", self.nursery_cur_size)
             debug_stop("gc-debug")
 
 
@@ -806,6 +914,107 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.rrc_invoke_callback()
         return rgc._encode_states(old_state, self.gc_state)
 
+    def compact(self):
+        """
+        Do a full collection, then give back to the OS the memory of the
+        free pages in the arenas.  Returns the number of bytes given back.
+
+        Old objects are never moved, because their address is used for
+        their id() and hash, and can be embedded in machine code.  The
+        arenas that become completely empty are freed anyway at the end
+        of every major collection; this only handles the free pages left
+        in the arenas that still contain some objects.
+        """
+        self.collect()
+        return self.ac.release_free_pages() * self.ac.page_size
+
+    def freeze(self):
+        """
+        Do a full collection, then make all the surviving objects immortal.
+        Returns their total size.
+
+        The frozen objects get GCFLAG_NO_HEAP_PTRS, like prebuilt objects:
+        the following major collections don't trace them nor write to
+        their headers, and their pages are removed from the
+        ArenaCollection, so that they are never swept again.  This keeps
+        the memory pages of these objects shared with the child processes
+        after a fork().  Like prebuilt objects, a frozen object is added to
+        'prebuilt_root_objects' by the write barrier if it is modified.
+        """
+        self.collect()
+        ll_assert(self.gc_state == STATE_SCANNING,
+                  "freeze(): the major collection is not finished")
+        #
+        # The objects that point to pinned objects must still be traced,
+        # so we make them roots instead.  The same for the objects with
+        # card marking, which is not used on GCFLAG_NO_HEAP_PTRS objects.
+        self.freeze_excluded = self.old_objects_pointing_to_pinned.stack2dict()
+        frozen = self.ac.freeze_pages(self._freeze_arena_object)
+        frozen_raw = r_uint(0)
+        while self.old_rawmalloced_objects.non_empty():
+            obj = self.old_rawmalloced_objects.pop()
+            self._freeze_object(obj)
+            frozen_raw += r_uint(self._rawmalloced_total_size(obj))
+        self.freeze_excluded.delete()
+        self.freeze_excluded = self.null_address_dict()
+        self.rawmalloced_total_size -= frozen_raw
+        frozen += frozen_raw
+        #
+        # All the objects in these lists are now immortal
+        self.old_objects_with_destructors.delete()
+        self.old_objects_with_destructors = self.AddressStack()
+        self.old_objects_with_finalizers.delete()
+        self.old_objects_with_finalizers = self.AddressDeque()
+        self.old_objects_with_weakrefs.delete()
+        self.old_objects_with_weakrefs = self.AddressStack()
+        #
+        self.frozen_memory += frozen
+        debug_start("gc-freeze")
+        debug_print("frozen bytes:", frozen, "in total:", self.frozen_memory)
+        debug_stop("gc-freeze")
+        return intmask(frozen)
+
+    def _freeze_arena_object(self, hdr):
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        self._freeze_object(hdr + size_gc_header)
+
+    def _freeze_object(self, obj):
+        hdr = self.header(obj)
+        if (hdr.tid & GCFLAG_HAS_CARDS or
+                self.freeze_excluded.contains(obj)):
+            self.prebuilt_root_objects.append(obj)
+        else:
+            hdr.tid |= GCFLAG_NO_HEAP_PTRS | GCFLAG_TRACK_YOUNG_PTRS
+
+    def _card_marker_size(self, obj):
+        # the size of the card marker area, which is just before the
+        # header of a raw-malloced object; 0 if it has none
+        if (self.card_page_indices > 0    # <- this is constant-folded
+            and self.header(obj).tid & GCFLAG_HAS_CARDS):
+            #
+            # Get the length and compute the number of extra bytes
+            typeid = self.get_type_id(obj)
+            ll_assert(self.has_gcptr_in_varsize(typeid),
+                      "GCFLAG_HAS_CARDS but not has_gcptr_in_varsize")
+            offset_to_length = self.varsize_offset_to_length(typeid)
+            length = (obj + offset_to_length).signed[0]
+            return self.card_marking_words_for_length(length) * WORD
+        return 0
+
+    def _rawmalloced_total_size(self, obj):
+        # the size of a raw-malloced object, including the card marker area
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = size_gc_header + self.get_size(obj)
+        return raw_malloc_usage(totalsize) + self._card_marker_size(obj)
+
+    def _release_free_pages_if_needed(self):
+        free_bytes = self.ac.count_free_pages() * self.ac.page_size
+        if free_bytes > 0 and free_bytes > (self.compact_threshold *
+                                            self.ac.total_memory_alloced):
+            released = self.ac.release_free_pages() * self.ac.page_size
+            debug_print("free pages in arenas: ", free_bytes,
+                        " of which newly released:", released)
+
     def minor_collection_with_major_progress(self, extrasize=0,
                                              force_enabled=False):
         """Do a minor collection.  Then, if the GC is enabled and there
@@ -813,8 +1022,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
         step.  If there is no major GC but the threshold is reached, start a
         major GC.
         """
+        if self.max_pause > 0.0:
+            self.pause_deadline = time.time() + self.max_pause
         self._minor_collection()
         if not self.enabled and not force_enabled:
+            self.pause_deadline = 0.0
             return
 
         # If the gc_state is STATE_SCANNING, we're not in the middle
@@ -841,9 +1053,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     # Note that target (A2) is tweaked by (*); see
                     # test_gc_set_max_heap_size in translator/c, test_newgc.py
 
+                if (self.pause_deadline > 0.0 and
+                        time.time() >= self.pause_deadline):
+                    # PYPY_GC_MAX_PAUSE: the whole pause is over budget.
+                    # Target (A2) is not reached yet, so the next minor
+                    # collections will do more steps to catch up.
+                    break
                 self._minor_collection()
                 self.major_collection_step(extrasize)
 
+        self.pause_deadline = 0.0
         self.rrc_invoke_callback()
 
 
@@ -896,6 +1115,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             else:
                 minor_collection_count += 1
                 if minor_collection_count == 1:
+                    self.nursery_exhausted = True
                     self.minor_collection_with_major_progress()
                 else:
                     # Nursery too full again.  This is likely because of
@@ -976,7 +1196,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # MemoryError.
         if self.threshold_reached(raw_malloc_usage(totalsize)):
             self.minor_collection_with_major_progress(
-                raw_malloc_usage(totalsize) + self.nursery_size // 2)
+                raw_malloc_usage(totalsize) + self.nursery_cur_size // 2)
         #
         # Check if the object would fit in the ArenaCollection.
         # Also, an object allocated from ArenaCollection must be old.
@@ -991,7 +1211,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                       "rounding up made totalsize > small_request_threshold")
             #
             # Allocate from the ArenaCollection.  Don't clear it.
-            result = self.ac.malloc(totalsize)
+            result = self._malloc_from_ac(totalsize)
             #
             extra_flags = GCFLAG_TRACK_YOUNG_PTRS
             #
@@ -1880,8 +2100,19 @@ class IncrementalMiniMarkGC(MovingGCBase):
         else:
             llarena.arena_reset(prev, self.nursery + self.nursery_size - prev, 0)
         #
-        # always add the end of the nursery to the list
-        nursery_barriers.append(self.nursery + self.nursery_size)
+        # always add the end of the nursery to the list.  With an adaptive
+        # nursery, we only use the first 'nursery_cur_size' bytes of it,
+        # unless there are pinned objects.
+        if self.nursery_adaptive:
+            if self.nursery_exhausted:
+                self.adapt_nursery_size(time.time() - start)
+            if nursery_barriers.non_empty():
+                nursery_barriers.append(self.nursery + self.nursery_size)
+            else:
+                nursery_barriers.append(self.nursery + self.nursery_cur_size)
+        else:
+            nursery_barriers.append(self.nursery + self.nursery_size)
+        self.nursery_exhausted = False
         #
         self.nursery_barriers = nursery_barriers
         self.surviving_pinned_objects.delete()
@@ -1913,7 +2144,51 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.hooks.fire_gc_minor(
             duration=duration,
             total_memory_used=total_memory_used,
-            pinned_objects=self.pinned_objects_in_nursery)
+            pinned_objects=self.pinned_objects_in_nursery,
+            nursery_size=self.nursery_cur_size,
+            surviving_size=self.nursery_surviving_size)
+
+    # The survival rates above which an adaptive nursery grows, and below
+    # which it shrinks back towards its initial size
+    NURSERY_GROW_SURVIVAL = 0.1
+    NURSERY_SHRINK_SURVIVAL = 0.02
+
+    def adapt_nursery_size(self, duration):
+        """Choose the size of an adaptive nursery for the next minor
+        collection, after a minor collection that took 'duration' seconds
+        and that found the nursery full.
+
+        If the minor collection took longer than 'minor_pause_target',
+        shrink the nursery: the time is mostly spent copying the
+        surviving objects, so it is roughly proportional to the size of
+        the nursery.  If it was much faster than that, and many objects
+        survived, grow the nursery to give more objects the time to die
+        before they are copied.  If almost no object survived, shrink the
+        nursery back towards its initial size, which fits in the cache.
+        """
+        cursize = self.nursery_cur_size
+        survival = float(self.nursery_surviving_size) / cursize
+        target = self.minor_pause_target
+        if duration > target:
+            newsize = int(cursize * max(target / duration, 0.5))
+        elif survival > self.NURSERY_GROW_SURVIVAL and duration < target * 0.5:
+            if duration > 0.0:
+                newsize = int(cursize * min(target * 0.5 / duration, 2.0))
+            else:
+                newsize = cursize * 2
+        elif (survival < self.NURSERY_SHRINK_SURVIVAL and
+                  cursize > self.nursery_initial_size):
+            newsize = max(int(cursize * 0.75), self.nursery_initial_size)
+        else:
+            return
+        newsize = min(max(newsize, self.nursery_min_size), self.nursery_size)
+        newsize &= ~(WORD-1)
+        if newsize != cursize:
+            debug_print("adaptive nursery: survival rate", survival,
+                        "pause", duration, "new size", newsize)
+            self.nursery_cur_size = newsize
+            if not self.max_pinned_objects_from_env:
+                self._estimate_max_number_of_pinned_objects()
 
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         ll_assert(self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN != 0,
@@ -2232,12 +2507,22 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if (r_uint(raw_malloc_usage(totalsize)) <=
             r_uint(self.small_request_threshold)):
             # most common path
-            return self.ac.malloc(totalsize)
+            return self._malloc_from_ac(totalsize)
         else:
             # for nursery objects that are not small
             return self._malloc_out_of_nursery_nonsmall(totalsize)
     _malloc_out_of_nursery._always_inline_ = True
 
+    def _malloc_from_ac(self, totalsize):
+        # While sweeping, the pages not swept so far are not available
+        # to the ArenaCollection.  Instead of taking fresh pages, sweep
+        # the old pages of the right size class on demand and reuse them.
+        if self.gc_state == STATE_SWEEPING:
+            return self.ac.malloc_while_sweeping(totalsize,
+                                                 self._free_if_unvisited)
+        return self.ac.malloc(totalsize)
+    _malloc_from_ac._always_inline_ = True
+
     def _malloc_out_of_nursery_nonsmall(self, totalsize):
         if r_uint(raw_malloc_usage(totalsize)) > r_uint(self.nursery_size):
             out_of_memory("memory corruption: bad size for object in the "
@@ -2361,13 +2646,14 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #   collection steps must be done immediately, until we
         #   restore the target invariant (A2).
         #
-        self.threshold_objects_made_old += r_uint(self.nursery_size // 2)
+        self.threshold_objects_made_old += r_uint(self.nursery_cur_size // 2)
 
 
         if self.gc_state == STATE_SCANNING:
             # starting a major GC cycle: reset these two counters
             self.size_objects_made_old = r_uint(0)
-            self.threshold_objects_made_old = r_uint(self.nursery_size // 2)
+            self.threshold_objects_made_old = r_uint(
+                self.nursery_cur_size // 2)
 
             self.objects_to_trace = self.AddressStack()
             self.collect_roots()
@@ -2384,7 +2670,19 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if estimate_from_nursery > estimate:
                 estimate = estimate_from_nursery
             estimate = intmask(estimate)
+            step_start = 0.0
+            if self.max_pause > 0.0:
+                # never less than twice what survived the last minor
+                # collection, or the marking would fall behind
+                estimate = max(self.work_for_max_pause(estimate,
+                                                       self.mark_rate),
+                               intmask(estimate_from_nursery))
+                step_start = time.time()
             remaining = self.visit_all_objects_step(estimate)
+            if self.max_pause > 0.0:
+                self.mark_rate = self.updated_work_rate(
+                    self.mark_rate, estimate - remaining,
+                    time.time() - step_start)
             #
             if remaining >= estimate // 2:
                 if self.more_objects_to_trace.non_empty():
@@ -2468,8 +2766,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # This limit is conservatively high enough to guarantee that
                 # a total object size of at least '3 * nursery_size' bytes
                 # is processed.
-                limit = 3 * self.nursery_size // self.small_request_threshold
+                limit = (3 * self.nursery_cur_size //
+                         self.small_request_threshold)
+                step_start = 0.0
+                if self.max_pause > 0.0:
+                    limit = self.work_for_max_pause(limit, self.rawsweep_rate)
+                    step_start = time.time()
                 nobjects = self.free_unvisited_rawmalloc_objects_step(limit)
+                if self.max_pause > 0.0:
+                    self.rawsweep_rate = self.updated_work_rate(
+                        self.rawsweep_rate, limit - nobjects,
+                        time.time() - step_start)
                 debug_print("freeing raw objects:", limit-nobjects,
                             "freed, limit was", limit)
                 done = False    # the 2nd half below must still be done
@@ -2478,9 +2785,17 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 # Free the ones that have not been visited above, and reset
                 # GCFLAG_VISITED on the others.  Visit at most '3 *
                 # nursery_size' bytes.
-                limit = 3 * self.nursery_size // self.ac.page_size
+                limit = 3 * self.nursery_cur_size // self.ac.page_size
+                step_start = 0.0
+                if self.max_pause > 0.0:
+                    limit = self.work_for_max_pause(limit, self.sweep_rate)
+                    step_start = time.time()
                 done = self.ac.mass_free_incremental(self._free_if_unvisited,
                                                      limit)
+                if self.max_pause > 0.0 and not done:
+                    # (if done, we don't know how many pages were swept)
+                    self.sweep_rate = self.updated_work_rate(
+                        self.sweep_rate, limit, time.time() - step_start)
                 status = done and "No more pages left." or "More to do."
                 debug_print("freeing GC objects, up to", limit, "pages.", status)
             # XXX tweak the limits above
@@ -2506,6 +2821,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 #
                 # Print statistics
                 debug_start("gc-collect-done")
+                if self.compact_threshold > 0.0:
+                    self._release_free_pages_if_needed()
                 debug_print("arenas:               ",
                             self.stat_ac_arenas_count, " => ",
                             self.ac.arenas_count)
@@ -2570,6 +2887,35 @@ class IncrementalMiniMarkGC(MovingGCBase):
             oldstate=oldstate,
             newstate=self.gc_state)
 
+    def work_for_max_pause(self, default, rate):
+        """In PYPY_GC_MAX_PAUSE mode, return how much work a step should
+        do to last 'max_pause' seconds, given the measured 'rate' of work
+        per second.  Inside minor_collection_with_major_progress(), only
+        what is left of 'max_pause' for the whole pause is used.  Returns
+        'default' as long as the rate is unknown.
+        """
+        if rate <= 0.0:
+            return default
+        budget = self.max_pause
+        if self.pause_deadline > 0.0:
+            budget = max(self.pause_deadline - time.time(), 0.0)
+        work = rate * budget
+        if work >= float(sys.maxint):
+            return sys.maxint
+        if work < 1.0:
+            return 1
+        return int(work)
+
+    def updated_work_rate(self, rate, work, duration):
+        """Return the new work rate, after 'work' was done in 'duration'
+        seconds.  This is a moving average, to absorb the noise."""
+        if work <= 0 or duration <= 0.0:
+            return rate
+        new_rate = work / duration
+        if rate <= 0.0:
+            return new_rate
+        return 0.75 * rate + 0.25 * new_rate
+
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
             new_list.append(obj)
@@ -2591,23 +2937,11 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.old_rawmalloced_objects.append(obj)
         else:
             size_gc_header = self.gcheaderbuilder.size_gc_header
-            totalsize = size_gc_header + self.get_size(obj)
-            allocsize = raw_malloc_usage(totalsize)
+            allocsize = self._rawmalloced_total_size(obj)
             arena = llarena.getfakearenaaddress(obj - size_gc_header)
             #
             # Must also include the card marker area, if any
-            if (self.card_page_indices > 0    # <- this is constant-folded
-                and self.header(obj).tid & GCFLAG_HAS_CARDS):
-                #
-                # Get the length and compute the number of extra bytes
-                typeid = self.get_type_id(obj)
-                ll_assert(self.has_gcptr_in_varsize(typeid),
-                          "GCFLAG_HAS_CARDS but not has_gcptr_in_varsize")
-                offset_to_length = self.varsize_offset_to_length(typeid)
-                length = (obj + offset_to_length).signed[0]
-                extra_words = self.card_marking_words_for_length(length)
-                arena -= extra_words * WORD
-                allocsize += extra_words * WORD
+            arena -= self._card_marker_size(obj)
             #
             llarena.arena_free(arena)
             self.rawmalloced_total_size -= r_uint(allocsize)
@@ -2683,7 +3017,30 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self._collect_obj(root.address[0], None)
 
     def _collect_ref_rec(self, root, ignored):
-        self._collect_obj(root.address[0], None)
+        # Called while tracing the content of an object during marking.
+        # Unlike _collect_obj(), we read the header of the referenced
+        # object here: it is going to be read anyway, and this lets us
+        # avoid pushing on 'objects_to_trace' the objects that are
+        # already marked, and the objects that contain no gc pointer at
+        # all (e.g. strings, floats, arrays of ints).  The latter are
+        # marked immediately; their size is recorded in
+        # 'size_marked_eagerly' for the accounting done in visit().
+        obj = root.address[0]
+        llop.debug_nonnull_pointer(lltype.Void, obj)
+        if self.is_in_nursery(obj):
+            ll_assert(self._is_pinned(obj),
+                      "non-pinned nursery obj in _collect_ref_rec")
+            return
+        hdr = self.header(obj)
+        if hdr.tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
+            return
+        if self.has_gcptr(llop.extract_ushort(llgroup.HALFWORD, hdr.tid)):
+            self.objects_to_trace.append(obj)
+        else:
+            hdr.tid |= GCFLAG_VISITED | GCFLAG_TRACK_YOUNG_PTRS
+            size_gc_header = self.gcheaderbuilder.size_gc_header
+            totalsize = size_gc_header + self.get_size(obj)
+            self.size_marked_eagerly += raw_malloc_usage(totalsize)
 
     def visit_all_objects(self):
         while self.objects_to_trace.non_empty():
@@ -2729,15 +3086,21 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # to also set TRACK_YOUNG_PTRS here, for the write barrier.
         hdr.tid |= GCFLAG_VISITED | GCFLAG_TRACK_YOUNG_PTRS
 
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        totalsize = size_gc_header + self.get_size(obj)
+        result = raw_malloc_usage(totalsize)
+
         if self.has_gcptr(llop.extract_ushort(llgroup.HALFWORD, hdr.tid)):
             #
             # Trace the content of the object and put all objects it references
-            # into the 'objects_to_trace' list.
+            # into the 'objects_to_trace' list.  The referenced objects
+            # without gc pointers are marked directly, and their size is
+            # added to 'size_marked_eagerly'.
+            self.size_marked_eagerly = 0
             self.trace(obj, self.make_callback('_collect_ref_rec'), self, None)
+            result += self.size_marked_eagerly
 
-        size_gc_header = self.gcheaderbuilder.size_gc_header
-        totalsize = size_gc_header + self.get_size(obj)
-        return raw_malloc_usage(totalsize)
+        return result
 
     # ----------
     # id() and identityhash() support
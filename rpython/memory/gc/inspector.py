@@ -3,7 +3,8 @@ Utility RPython functions to inspect objects in the GC.
 """
 from rpython.rtyper.lltypesystem import lltype, llmemory, rffi, llgroup
 from rpython.rtyper.lltypesystem.lloperation import llop
-from rpython.rlib.objectmodel import free_non_gc_object
+from rpython.rlib.objectmodel import free_non_gc_object, specialize
+from rpython.rlib.rarithmetic import r_uint, intmask, LONG_BIT
 from rpython.rlib import rposix, rgc, jit
 
 from rpython.memory.support import AddressDict, get_address_stack
@@ -256,18 +257,120 @@ class HeapDumper(BaseWalker):
         self.add(obj)
 
 
+def _zigzag(value):
+    # encode signed numbers so that small negative numbers stay small
+    return (r_uint(value) << 1) ^ r_uint(value >> (LONG_BIT-1))
+
+class CompactHeapDumper(BaseWalker):
+    """Writes the same information as HeapDumper, but in a much more
+    compact byte-oriented format, which is described in
+    pypy/tool/heapanalyze.py.  All numbers are written as varints, and
+    addresses are written as deltas in words: between consecutive
+    objects, and between an object and the objects it references.
+    """
+    BUFSIZE = 65536     # bytes
+    MAGIC = 'RPYHEAP1'
+    WORD_SHIFT = {4: 2, 8: 3}[LONG_BIT // 8]
+
+    def __init__(self, gc, fd):
+        BaseWalker.__init__(self, gc)
+        self.fd = rffi.cast(rffi.INT, fd)
+        self.writebuffer = lltype.malloc(rffi.CCHARP.TO, self.BUFSIZE,
+                                         flavor='raw')
+        self.buf_count = 0
+        self.prev_addr = 0
+        for c in self.MAGIC:
+            self.write_byte(ord(c))
+        self.write_byte(LONG_BIT // 8)
+
+    def delete(self):
+        lltype.free(self.writebuffer, flavor='raw')
+        BaseWalker.delete(self)
+
+    @jit.dont_look_inside
+    def flush(self):
+        if self.buf_count > 0:
+            bytes = self.buf_count
+            count = raw_os_write(self.fd,
+                                 rffi.cast(llmemory.Address, self.writebuffer),
+                                 rffi.cast(rffi.SIZE_T, bytes))
+            if rffi.cast(lltype.Signed, count) != bytes:
+                raise OSError(rffi.cast(lltype.Signed, rposix._get_errno()),
+                              "raw_os_write failed")
+            self.buf_count = 0
+    flush._dont_inline_ = True
+
+    def write_byte(self, value):
+        x = self.buf_count
+        self.writebuffer[x] = chr(value)
+        self.buf_count = x + 1
+
+    def write_uint(self, value):
+        # 'value' is an r_uint.  At most 10 bytes are written, so we only
+        # need to check once for the space left in the buffer.
+        if self.buf_count > self.BUFSIZE - 10:
+            self.flush()
+        while value >= 0x80:
+            self.write_byte(intmask(value & 0x7f) | 0x80)
+            value >>= 7
+        self.write_byte(intmask(value))
+    write_uint._always_inline_ = True
+
+    def write_int(self, value):
+        self.write_uint(_zigzag(value))
+    write_int._always_inline_ = True
+
+    def _word_addr(self, obj):
+        return llmemory.cast_adr_to_int(obj) >> self.WORD_SHIFT
+
+    # ----------
+
+    def write_marker(self):
+        self.write_uint(r_uint(0))
+    end_add_roots_marker = write_marker
+
+    def process(self):
+        BaseWalker.process(self)
+        self.write_marker()     # end of the dump
+
+    def writeobj(self, obj):
+        gc = self.gc
+        typeid = gc.get_type_id(obj)
+        addr = self._word_addr(obj)
+        self.write_uint(r_uint(gc.get_member_index(typeid)) + 1)
+        self.write_int(addr - self.prev_addr)
+        self.write_uint(r_uint(llmemory.raw_malloc_usage(
+            gc.get_size_incl_hash(obj))))
+        self.prev_addr = addr
+        gc.trace(obj, gc.make_callback('_writeref'), self, None)
+        self.write_uint(r_uint(0))
+    processobj = writeobj
+
+    def _writeref(self, pointer, ignored):
+        obj = pointer.address[0]
+        # +1 because 0 is used to mark the end of the references
+        self.write_uint(_zigzag(self._word_addr(obj) - self.prev_addr) + 1)
+        self.add(obj)
+
+
 def _hd_add_root(obj, heap_dumper):
     heap_dumper.add(obj)
 
 def _hd_unadd_root(obj, heap_dumper):
     heap_dumper.unadd(obj)
 
-def dump_rpy_heap(gc, fd):
-    heapdumper = HeapDumper(gc, fd)
+@specialize.argtype(0)
+def _do_dump_rpy_heap(heapdumper):
     heapdumper.process()
     heapdumper.flush()
     heapdumper.finish_processing()
     heapdumper.delete()
+
+def dump_rpy_heap(gc, fd, compact=False):
+    if compact:
+        _do_dump_rpy_heap(CompactHeapDumper(gc, fd))
+    else:
+        _do_dump_rpy_heap(HeapDumper(gc, fd))
     return True
 
 def count_memory_pressure(gc):
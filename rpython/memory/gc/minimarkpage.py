@@ -22,6 +22,8 @@ ARENA = lltype.Struct('ArenaReference',
     # -- The number of free and the total number of pages in the arena
     ('nfreepages', lltype.Signed),
     ('totalpages', lltype.Signed),
+    # -- The number of pages freed since the last release_free_pages()
+    ('nnewfreepages', lltype.Signed),
     # -- A chained list of free pages in the arena.  Ends with NULL.
     ('freepages', llmemory.Address),
     # -- A linked list of arenas.  See below.
@@ -81,6 +83,18 @@ PAGE_HEADER = lltype.Struct('PageHeader',
 PAGE_PTR.TO.become(PAGE_HEADER)
 PAGE_NULL = lltype.nullptr(PAGE_HEADER)
 
+# Each free page starts with the following structure instead.
+FREE_PAGE_HEADER = lltype.Struct('FreePageHeader',
+    # -- The next free page in the chained list 'freepages' of the arena.
+    ('nextpage', llmemory.Address),
+    # -- The number of consecutive free pages starting at this one.  It is
+    #    usually 1.  release_free_pages() puts on the chained list only the
+    #    first page of each run of consecutive free pages, and returns the
+    #    memory of the other pages of the run to the OS.
+    ('npages', lltype.Signed),
+    )
+FREE_PAGE_PTR = lltype.Ptr(FREE_PAGE_HEADER)
+
 # ----------
 
 
@@ -118,6 +132,11 @@ class ArenaCollection(object):
                                           self.max_pages_per_arena,
                                           flavor='raw', zero=True,
                                           immortal=True)
+        # this is used in release_free_pages() only
+        self.free_page_marks = lltype.malloc(rffi.CArray(lltype.Char),
+                                             self.max_pages_per_arena,
+                                             flavor='raw', zero=True,
+                                             immortal=True)
         # this is used in mass_free() only
         self.old_arenas_lists = lltype.malloc(rffi.CArray(ARENA_PTR),
                                               self.max_pages_per_arena,
@@ -137,6 +156,10 @@ class ArenaCollection(object):
         # part of current_arena might still contain uninitialized pages
         self.num_uninitialized_pages = 0
         #
+        # the size class that mass_free_incremental() will sweep next,
+        # or -1 if there is no sweeping in progress
+        self.size_class_with_old_pages = -1
+        #
         # the total memory used, counting every block in use, without
         # the additional bookkeeping stuff.
         self.total_memory_used = r_uint(0)
@@ -194,6 +217,24 @@ class ArenaCollection(object):
         return result
 
 
+    def malloc_while_sweeping(self, size, ok_to_free_func):
+        """Like malloc(), but to be used between mass_free_prepare() and
+        the end of mass_free_incremental().  If there is no page with
+        room for 'size', we first sweep the not-yet-swept pages of the
+        same size class, calling ok_to_free_func() on their objects,
+        until one of them has room.  The swept pages are immediately
+        reused instead of taking a fresh page from an arena.
+        """
+        nsize = llmemory.raw_malloc_usage(size)
+        size_class = nsize >> WORD_POWER_2
+        if size_class <= self.size_class_with_old_pages:
+            while (self.page_for_size[size_class] == PAGE_NULL and
+                   (self.old_full_page_for_size[size_class] != PAGE_NULL or
+                    self.old_page_for_size[size_class] != PAGE_NULL)):
+                self.mass_free_in_pages(size_class, ok_to_free_func, 1)
+        return self.malloc(size)
+
+
     def allocate_new_page(self, size_class):
         """Allocate and return a new page for the given size_class."""
         #
@@ -208,10 +249,17 @@ class ArenaCollection(object):
             #
             # The 'result' was part of the chained list; read the next.
             arena.nfreepages -= 1
-            freepages = result.address[0]
+            freepage = llmemory.cast_adr_to_ptr(result, FREE_PAGE_PTR)
+            freepages = freepage.nextpage
+            npages = freepage.npages
             llarena.arena_reset(result,
-                                llmemory.sizeof(llmemory.Address),
+                                llmemory.sizeof(FREE_PAGE_HEADER),
                                 0)
+            if npages > 1:
+                # 'result' was the first page of a run of free pages:
+                # the rest of the run starts at the next page
+                freepages = self._init_free_page(result + self.page_size,
+                                                 freepages, npages - 1)
             #
         else:
             # The 'result' is part of the uninitialized pages.
@@ -314,6 +362,7 @@ class ArenaCollection(object):
         arena = lltype.malloc(ARENA, flavor='raw', track_allocation=False)
         arena.base = arena_base
         arena.nfreepages = 0        # they are all uninitialized pages
+        arena.nnewfreepages = 0
         arena.totalpages = npages
         arena.freepages = firstpage
         self.num_uninitialized_pages = npages
@@ -344,6 +393,54 @@ class ArenaCollection(object):
             size_class -= 1
 
 
+    def freeze_pages(self, callback):
+        """Forget all the pages that currently contain objects, after
+        calling 'callback(obj)' on each of these objects.  The pages are
+        never swept again, so the objects they contain are immortal, and
+        the free blocks left in them are not reused.  Returns the total
+        size of these objects, which are no longer counted in
+        'total_memory_used'.  Must not be called while sweeping.
+        """
+        ll_assert(self.size_class_with_old_pages < 0,
+                  "freeze_pages() called while sweeping")
+        size_class = self.small_request_threshold >> WORD_POWER_2
+        while size_class >= 1:
+            block_size = size_class << WORD_POWER_2
+            page = self.page_for_size[size_class]
+            while page != PAGE_NULL:
+                self._walk_objects_in_page(page, block_size, callback)
+                page = page.nextpage
+            page = self.full_page_for_size[size_class]
+            while page != PAGE_NULL:
+                self._walk_objects_in_page(page, block_size, callback)
+                page = page.nextpage
+            self.page_for_size[size_class]      = PAGE_NULL
+            self.full_page_for_size[size_class] = PAGE_NULL
+            size_class -= 1
+        self.peak_memory_used = max(self.peak_memory_used,
+                                    self.total_memory_used)
+        result = self.total_memory_used
+        self.total_memory_used = r_uint(0)
+        return result
+
+
+    def _walk_objects_in_page(self, page, block_size, callback):
+        # like walk_page(), but read-only
+        freeblock = page.freeblock
+        obj = llarena.getfakearenaaddress(llmemory.cast_ptr_to_adr(page))
+        obj += self.hdrsize
+        skip_free_blocks = page.nfree
+        while True:
+            if obj == freeblock:
+                if skip_free_blocks == 0:
+                    break     # the first uninitialized block, or the end
+                skip_free_blocks -= 1
+                freeblock = obj.address[0]
+            else:
+                callback(obj)
+            obj += block_size
+
+
     def mass_free_incremental(self, ok_to_free_func, max_pages):
         """For each object, if ok_to_free_func(obj) returns True, then free
         the object.  This returns True if complete, or False if the limit
@@ -496,12 +593,115 @@ class ArenaCollection(object):
         # end of mass_free().
         arena = page.arena
         arena.nfreepages += 1
+        arena.nnewfreepages += 1
         pageaddr = llmemory.cast_ptr_to_adr(page)
         pageaddr = llarena.getfakearenaaddress(pageaddr)
         llarena.arena_reset(pageaddr, self.page_size, 0)
-        llarena.arena_reserve(pageaddr, llmemory.sizeof(llmemory.Address))
-        pageaddr.address[0] = arena.freepages
+        arena.freepages = self._init_free_page(pageaddr, arena.freepages, 1)
+
+
+    def _init_free_page(self, pageaddr, nextpage, npages):
+        llarena.arena_reserve(pageaddr, llmemory.sizeof(FREE_PAGE_HEADER))
+        freepage = llmemory.cast_adr_to_ptr(pageaddr, FREE_PAGE_PTR)
+        freepage.nextpage = nextpage
+        freepage.npages = npages
+        return pageaddr
+
+
+    def count_free_pages(self):
+        """Return the number of free pages in all arenas, not counting
+        the uninitialized pages of the current arena."""
+        result = 0
+        if self.current_arena != ARENA_NULL:
+            result += self.current_arena.nfreepages
+        i = 0
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                result += arena.nfreepages
+                arena = arena.nextarena
+            i += 1
+        return result
+
+
+    def release_free_pages(self):
+        """Return to the OS the memory of the free pages in the arenas
+        that are still partially used.  Only the first page of each run
+        of consecutive free pages is kept, to hold the FREE_PAGE_HEADER
+        of the run; the other pages are only touched again when they are
+        reused.  Returns the number of pages newly released.  The arenas
+        in which no page was freed since the last call are skipped.
+        """
+        result = 0
+        if self.current_arena != ARENA_NULL:
+            result += self._release_free_pages_in_arena(self.current_arena)
+        i = 0
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                result += self._release_free_pages_in_arena(arena)
+                arena = arena.nextarena
+            i += 1
+        return result
+
+
+    def _release_free_pages_in_arena(self, arena):
+        # if no page was freed since the last call, all the free pages
+        # that can be released already are
+        if arena.nnewfreepages == 0 or arena.nfreepages < 2:
+            arena.nnewfreepages = 0
+            return 0
+        arena.nnewfreepages = 0
+        firstpage = start_of_page(arena.base + self.page_size - 1,
+                                  self.page_size)
+        marks = self.free_page_marks
+        #
+        # Mark all the free pages: '\x01' for the pages that are still
+        # in use by the OS, and '\x02' for the ones that were already
+        # released.  The chained list may end with the uninitialized
+        # pages of the current arena, which we keep as they are.
+        pageaddr = arena.freepages
+        n = arena.nfreepages
+        while n > 0:
+            freepage = llmemory.cast_adr_to_ptr(pageaddr, FREE_PAGE_PTR)
+            nextpage = freepage.nextpage
+            npages = freepage.npages
+            llarena.arena_reset(pageaddr, llmemory.sizeof(FREE_PAGE_HEADER), 0)
+            index = (pageaddr - firstpage) // self.page_size
+            n -= npages
+            marks[index] = '\x01'
+            while npages > 1:
+                index += 1
+                marks[index] = '\x02'
+                npages -= 1
+            pageaddr = nextpage
+        ll_assert(n == 0, "inconsistent nfreepages in an arena")
+        #
+        # Chain the runs of consecutive free pages again, in order of
+        # increasing addresses, and release all pages but the first one
+        # of each run.
+        released = 0
+        index = arena.totalpages - 1
+        while index >= 0:
+            if marks[index] == '\x00':
+                index -= 1
+                continue
+            stop = index + 1
+            newly_released = -1     # the first page of the run is kept
+            while index >= 0 and marks[index] != '\x00':
+                if marks[index] == '\x01':
+                    newly_released += 1
+                marks[index] = '\x00'
+                index -= 1
+            start = index + 1
+            runaddr = firstpage + start * self.page_size
+            if newly_released > 0:
+                llarena.arena_reset(runaddr + self.page_size,
+                                    (stop - start - 1) * self.page_size, 4)
+                released += newly_released
+            pageaddr = self._init_free_page(runaddr, pageaddr, stop - start)
         arena.freepages = pageaddr
+        return released
 
 
     def walk_page(self, page, block_size, ok_to_free_func):
@@ -34,6 +34,9 @@ class SimpleArenaCollection(object):
         self.total_memory_used += nsize
         return result
 
+    def malloc_while_sweeping(self, size, ok_to_free_func):
+        return self.malloc(size)
+
     def mass_free_prepare(self):
         self.old_all_objects = self.all_objects
         self.all_objects = []
@@ -53,6 +56,20 @@ class SimpleArenaCollection(object):
                 return False
         return True
 
+    def freeze_pages(self, callback):
+        for rawobj, nsize in self.all_objects:
+            callback(rawobj)
+        result = self.total_memory_used
+        self.all_objects = []
+        self.total_memory_used = 0
+        return result
+
+    def count_free_pages(self):
+        return 0
+
+    def release_free_pages(self):
+        return 0
+
     def mass_free(self, ok_to_free_func):
         self.mass_free_prepare()
         res = self.mass_free_incremental(ok_to_free_func, sys.maxint)
@@ -7,9 +7,10 @@ see as the list of roots (stack and prebuilt objects).
 # XXX VERY INCOMPLETE, low coverage
 
 import py
+import sys
 from rpython.rtyper.lltypesystem import lltype, llmemory
 from rpython.memory.gctypelayout import TypeLayoutBuilder, FIN_HANDLER_ARRAY
-from rpython.rlib.rarithmetic import LONG_BIT, is_valid_int
+from rpython.rlib.rarithmetic import LONG_BIT, is_valid_int, r_uint
 from rpython.memory.gc import minimark, incminimark
 from rpython.memory.gctypelayout import zero_gc_pointers_inside, zero_gc_pointers
 from rpython.rlib.debug import debug_print
@@ -662,6 +663,41 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         newobj1 = oldobj.next
         assert newobj1.x == 1337
 
+    def test_marking_leaves_eagerly(self):
+        LEAF = lltype.GcStruct('LEAF', ('x', lltype.Signed))
+        ARRAY = lltype.GcArray(lltype.Ptr(LEAF))
+        a = self.malloc(ARRAY, 20)
+        self.stackroots.append(a)
+        for i in range(20):
+            leaf = self.malloc(LEAF)
+            leaf.x = i
+            self.writearray(a, i, leaf)
+        self.gc.debug_gc_step_until(incminimark.STATE_MARKING)
+        a = self.stackroots[-1]
+        addr = llmemory.cast_ptr_to_adr(a)
+        assert self.gc.objects_to_trace.tolist() == [addr]
+        #
+        # visiting the array marks all the leaves at once, without
+        # pushing any of them on 'objects_to_trace'
+        self.gc.objects_to_trace.pop()
+        size = self.gc.visit(addr)
+        assert not self.gc.objects_to_trace.non_empty()
+        expected = 0
+        for i in range(20):
+            leafaddr = llmemory.cast_ptr_to_adr(a[i])
+            hdr = self.gc.header(leafaddr)
+            assert hdr.tid & incminimark.GCFLAG_VISITED
+            expected += llmemory.raw_malloc_usage(
+                self.gc.gcheaderbuilder.size_gc_header +
+                self.gc.get_size(leafaddr))
+        expected += llmemory.raw_malloc_usage(
+            self.gc.gcheaderbuilder.size_gc_header + self.gc.get_size(addr))
+        assert size == expected
+        #
+        self.gc.debug_gc_step_until(incminimark.STATE_SCANNING)
+        a = self.stackroots[-1]
+        assert [a[i].x for i in range(20)] == range(20)
+
     def test_obj_on_escapes_on_stack(self):
         obj0 = self.malloc(S)
 
@@ -694,6 +730,169 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         assert adr4 == adr3
         assert obj3.x == 456     # it is populated now
 
+    def test_adaptive_nursery(self):
+        gc = self.gc
+        assert gc.nursery_adaptive
+        assert gc.nursery_size == 128*WORD
+        assert gc.nursery_cur_size == 32*WORD
+        assert gc.nursery_min_size == 16*WORD
+        assert gc.nursery_top == gc.nursery + 32*WORD
+        #
+        # all the objects survive, and the minor collections are much
+        # faster than 'minor_pause_target': the nursery grows up to its
+        # maximum size
+        self.stackroots.append(lltype.nullptr(S))
+        for i in range(200):
+            p = self.malloc(S)
+            p.next = self.stackroots[-1]
+            self.stackroots[-1] = p
+        assert gc.nursery_cur_size == 128*WORD
+        assert gc.nursery_top == gc.nursery + 128*WORD
+        #
+        # no object survives any more: the nursery shrinks back to its
+        # initial size
+        self.stackroots.pop()
+        for i in range(200):
+            self.malloc(S)
+        assert gc.nursery_cur_size == 32*WORD
+        #
+        # explicit minor collections don't change the size
+        self.stackroots.append(self.malloc(S))
+        gc._minor_collection()
+        assert gc.nursery_cur_size == 32*WORD
+        assert gc.nursery_top == gc.nursery + 32*WORD
+    test_adaptive_nursery.GC_PARAMS = {'nursery_max_size': 128*WORD,
+                                       'minor_pause_target': 1000.0}
+
+    def test_adapt_nursery_size(self):
+        gc = self.gc
+        def adapt(cursize, survival, duration):
+            gc.nursery_cur_size = cursize
+            gc.nursery_surviving_size = int(cursize * survival)
+            gc.adapt_nursery_size(duration)
+            return gc.nursery_cur_size
+        # slower than the target: shrink, but never below the minimum
+        assert adapt(64*WORD, 0.5, 0.004) == 32*WORD
+        assert adapt(64*WORD, 0.01, 0.004) == 32*WORD
+        assert adapt(32*WORD, 0.5, 0.010) == 16*WORD
+        # much faster than the target and many survivors: grow, but
+        # never above the maximum
+        assert adapt(32*WORD, 0.5, 0.0005) == 64*WORD
+        assert adapt(32*WORD, 0.5, 0.0008) == 40*WORD
+        assert adapt(96*WORD, 0.5, 0.0) == 128*WORD
+        # close to the target: don't change
+        assert adapt(64*WORD, 0.5, 0.0015) == 64*WORD
+        # few survivors: shrink back towards the initial size
+        assert adapt(128*WORD, 0.01, 0.0) == 96*WORD
+        assert adapt(40*WORD, 0.01, 0.0) == 32*WORD
+        assert adapt(32*WORD, 0.01, 0.0) == 32*WORD
+    test_adapt_nursery_size.GC_PARAMS = {'nursery_max_size': 128*WORD,
+                                         'minor_pause_target': 0.002}
+
+    def test_adaptive_nursery_pacing(self):
+        # the pacing of the major collection and the number of pinned
+        # objects follow the part of the nursery that is really used
+        gc = self.gc
+        bigobj = gc.nonlarge_max + 1
+        assert gc.max_number_of_pinned_objects == 32*WORD // (bigobj * 2)
+        gc.nursery_surviving_size = 16*WORD
+        gc.adapt_nursery_size(0.0008)
+        assert gc.nursery_cur_size == 40*WORD
+        assert gc.max_number_of_pinned_objects == 40*WORD // (bigobj * 2)
+        #
+        assert gc.gc_state == incminimark.STATE_SCANNING
+        gc.major_collection_step()
+        assert gc.threshold_objects_made_old == 20*WORD
+        gc.major_collection_step()
+        assert gc.threshold_objects_made_old == 40*WORD
+    test_adaptive_nursery_pacing.GC_PARAMS = {'nursery_max_size': 128*WORD,
+                                              'minor_pause_target': 0.002}
+
+    def test_work_for_max_pause(self):
+        gc = self.gc
+        gc.max_pause = 0.002
+        # unknown rate: use the default amount of work
+        assert gc.work_for_max_pause(1000, 0.0) == 1000
+        assert gc.work_for_max_pause(1000, 1e6) == 2000
+        assert gc.work_for_max_pause(1000, 1e2) == 1
+        assert gc.work_for_max_pause(1000, 1e300) == sys.maxint
+        #
+        assert gc.updated_work_rate(0.0, 500, 0.001) == 500000.0
+        assert gc.updated_work_rate(1000.0, 500, 0.25) == 1250.0
+        # nothing measured
+        assert gc.updated_work_rate(1000.0, 0, 0.25) == 1000.0
+        assert gc.updated_work_rate(1000.0, 500, 0.0) == 1000.0
+
+    def test_max_pause(self):
+        gc = self.gc
+        gc.max_pause = 0.002
+        self.stackroots.append(lltype.nullptr(S))
+        for i in range(300):
+            p = self.malloc(S)
+            p.x = i
+            p.next = self.stackroots[-1]
+            self.stackroots[-1] = p
+        gc.collect()
+        # the speed of marking and sweeping was measured
+        assert gc.mark_rate > 0.0
+        assert gc.sweep_rate > 0.0
+        p = self.stackroots[-1]
+        for i in range(299, -1, -1):
+            assert p.x == i
+            p = p.next
+
+    def test_max_pause_whole_pause(self, monkeypatch):
+        class FakeTime(object):
+            now = 0.0
+            def time(self):
+                self.now += 0.0005
+                return self.now
+        fake_time = FakeTime()
+        monkeypatch.setattr(incminimark, 'time', fake_time)
+        gc = self.gc
+        gc.max_pause = 0.002
+        gc.mark_rate = 1.0      # very slow: every step gets 1 byte of work
+        self.stackroots.append(lltype.nullptr(S))
+        for i in range(300):
+            p = self.malloc(S)
+            p.next = self.stackroots[-1]
+            self.stackroots[-1] = p
+        gc.collect()
+        gc._minor_collection()
+        gc.major_collection_step()
+        assert gc.gc_state == incminimark.STATE_MARKING
+        for i in range(4):      # these survive the next minor collection
+            p = self.malloc(S)
+            p.next = self.stackroots[-1]
+            self.stackroots[-1] = p
+        #
+        steps = []
+        estimates = []
+        orig_step = gc.major_collection_step
+        orig_visit = gc.visit_all_objects_step
+        def major_collection_step(extrasize=0):
+            steps.append(fake_time.now)
+            orig_step(extrasize)
+        def visit_all_objects_step(size_to_track):
+            estimates.append(size_to_track)
+            return orig_visit(size_to_track)
+        gc.major_collection_step = major_collection_step
+        gc.visit_all_objects_step = visit_all_objects_step
+        gc.threshold_objects_made_old = r_uint(0)
+        start = fake_time.now
+        gc.minor_collection_with_major_progress()
+        # the loop stops when the whole pause is over budget, even
+        # though target (A2) is not reached
+        assert gc.gc_state == incminimark.STATE_MARKING
+        assert 1 <= len(steps) <= 4
+        assert steps[-1] - start < gc.max_pause
+        assert gc.pause_deadline == 0.0
+        # the steps still mark at least twice what survived the minor
+        # collection
+        assert gc.nursery_surviving_size > 0
+        for estimate in estimates:
+            assert estimate >= gc.nursery_surviving_size * 2
+
 
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
@@ -844,3 +1043,99 @@ class TestIncrementalMiniMarkGCFull(DirectGCTest):
             (incminimark.STATE_SWEEPING, incminimark.STATE_FINALIZING),
             (incminimark.STATE_FINALIZING, incminimark.STATE_SCANNING)
             ]
+
+    def test_compact(self):
+        gc = self.gc
+        for i in range(300):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        gc.collect()
+        #
+        # keep only a few objects alive
+        del self.stackroots[10:]
+        gc.collect()
+        free_pages = gc.ac.count_free_pages()
+        assert free_pages > 2
+        released = gc.compact()
+        assert released > 0
+        assert released <= (free_pages - 1) * gc.ac.page_size
+        assert gc.ac.count_free_pages() == free_pages
+        assert gc.compact() == 0
+        for i in range(10):
+            assert self.stackroots[i].x == i
+        #
+        # the released pages can be used again
+        for i in range(300):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        gc.collect()
+        for i in range(10):
+            assert self.stackroots[i].x == i
+        for i in range(300):
+            assert self.stackroots[10 + i].x == i
+    test_compact.GC_PARAMS = {'arena_size': 64*16*WORD}
+
+    def test_compact_threshold(self):
+        gc = self.gc
+        gc.compact_threshold = 0.25
+        for i in range(300):
+            self.stackroots.append(self.malloc(S))
+        gc.collect()
+        del self.stackroots[10:]
+        gc.collect()
+        # the free pages were already released at the end of the major
+        # collection
+        assert gc.ac.count_free_pages() > 2
+        assert gc.compact() == 0
+        # the following major collections don't walk these pages again
+        for arena in gc.ac._all_arenas():
+            assert arena.nnewfreepages == 0
+    test_compact_threshold.GC_PARAMS = {'arena_size': 64*16*WORD}
+
+    def test_freeze(self):
+        from rpython.memory.gc.incminimark import GCFLAG_NO_HEAP_PTRS
+        gc = self.gc
+        self.stackroots.append(lltype.nullptr(S))
+        for i in range(100):
+            p = self.malloc(S)
+            p.x = i
+            p.next = self.stackroots[0]
+            self.stackroots[0] = p
+        self.stackroots.append(self.malloc(VAR, 50))    # raw-malloced
+        self.stackroots[1][3] = self.stackroots[0]
+        frozen = gc.freeze()
+        assert frozen > 100 * llmemory.raw_malloc_usage(llmemory.sizeof(S))
+        assert gc.frozen_memory == frozen
+        assert gc.ac.total_memory_used == 0
+        assert gc.rawmalloced_total_size == 0
+        assert gc.old_rawmalloced_objects.non_empty() == False
+        #
+        frozen_p = self.stackroots[0]
+        frozen_a = self.stackroots[1]
+        for obj in [frozen_p, frozen_a]:
+            hdr = self.gc.header(llmemory.cast_ptr_to_adr(obj))
+            assert hdr.tid & GCFLAG_NO_HEAP_PTRS
+        #
+        # the frozen objects are immortal
+        del self.stackroots[:]
+        gc.collect()
+        gc.collect()
+        p = frozen_a[3]
+        for i in range(99, -1, -1):
+            assert p.x == i
+            p = p.next
+        #
+        # a frozen object which is modified keeps its new referents alive
+        q = self.malloc(S)
+        q.x = 1234
+        self.write(frozen_p, 'next', q)
+        gc.collect()
+        gc.collect()
+        assert frozen_p.next.x == 1234
+        assert gc.frozen_memory == frozen
+        #
+        # freezing again only freezes the new objects
+        assert 0 < gc.freeze() < frozen
+        assert frozen_p.next.x == 1234
@@ -82,6 +82,17 @@ def test_read_from_env():
     finally:
         os.environ = saved
 
+def test_read_time_from_env():
+    saved = os.environ
+    try:
+        for value, expected in [(None, 0.0), ('', 0.0), ('???', 0.0),
+                                ('2', 2.0), ('1.5s', 1.5), ('2ms', 0.002),
+                                ('250us', 0.00025), ('5m', 0.0)]:
+            os.environ = FakeEnviron(value)
+            check_equal(env.read_time_from_env('FOOBAR'), expected)
+    finally:
+        os.environ = saved
+
 def test_get_total_memory_linux2():
     filepath = udir.join('get_total_memory_linux2')
     filepath.write("""\
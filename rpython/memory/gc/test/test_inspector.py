@@ -37,6 +37,52 @@ class InspectorTest(BaseDirectGCTest):
                     adr_q, 1, ASize(), -1]
         assert expected == seen
 
+    def test_dump_rpy_heap_compact(self):
+        p = self.malloc(S)
+        p.x = 5
+        q = self.malloc(S)
+        q.x = 6
+        self.write(p, 'next', q)
+        self.stackroots.append(p)
+        #
+        saved = inspector.CompactHeapDumper.flush.im_func
+        try:
+            seen = []
+            def my_flush(self):
+                for i in range(self.buf_count):
+                    seen.append(self.writebuffer[i])
+                self.buf_count = 0
+            inspector.CompactHeapDumper.flush = my_flush
+            inspector.dump_rpy_heap(self.gc, -123456, compact=True)
+        finally:
+            inspector.CompactHeapDumper.flush = saved
+        #
+        data = ''.join(seen)
+        assert data.startswith('RPYHEAP1')
+        pos = [9]
+        def read_uint():
+            result = shift = 0
+            while True:
+                byte = ord(data[pos[0]])
+                pos[0] += 1
+                result |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    return result
+                shift += 7
+        def unzigzag(value):
+            return (value >> 1) ^ -(value & 1)
+        assert read_uint() == 2               # typeindex of 'p', plus 1
+        adr_p = unzigzag(read_uint())
+        read_uint()                           # size
+        adr_q = adr_p + unzigzag(read_uint() - 1)
+        assert read_uint() == 0               # end of 'p'
+        assert read_uint() == 0               # end of the roots
+        assert read_uint() == 2               # typeindex of 'q', plus 1
+        assert adr_p + unzigzag(read_uint()) == adr_q
+        read_uint()                           # size
+        assert read_uint() == 0               # end of 'q'
+        assert read_uint() == 0               # end of the dump
+        assert pos[0] == len(data)
 
 class TestHybridGC(InspectorTest):
     from rpython.memory.gc.hybrid import HybridGC as GCClass
@@ -2,6 +2,7 @@ import py
 from rpython.memory.gc.minimarkpage import ArenaCollection
 from rpython.memory.gc.minimarkpage import PAGE_HEADER, PAGE_PTR
 from rpython.memory.gc.minimarkpage import PAGE_NULL, WORD
+from rpython.memory.gc.minimarkpage import FREE_PAGE_HEADER, FREE_PAGE_PTR
 from rpython.memory.gc.minimarkpage import _dummy_size
 from rpython.rtyper.lltypesystem import lltype, llmemory, llarena
 from rpython.rtyper.lltypesystem.llmemory import cast_ptr_to_adr
@@ -121,10 +122,10 @@ def arena_collection_for_test(pagesize, pagelayout, fill_with_objects=False):
             nblocks = (pagesize - hdrsize) // size_block
             link(pageaddr, size_class, size_block, nblocks, nblocks-1)
         elif c == '.':    # a free, but initialized, page
-            llarena.arena_reserve(pageaddr, llmemory.sizeof(llmemory.Address))
-            pageaddr.address[0] = ac.current_arena.freepages
-            ac.current_arena.freepages = pageaddr
+            ac.current_arena.freepages = ac._init_free_page(
+                pageaddr, ac.current_arena.freepages, 1)
             ac.current_arena.nfreepages += 1
+            ac.current_arena.nnewfreepages += 1
         elif c == '#':    # a random full page, in the list 'full_pages'
             size_class = fill_with_objects or 1
             size_block = WORD * size_class
@@ -300,7 +301,9 @@ def test_mass_free_emptied_page():
                                hdrsize + 2*WORD: True}
     pageaddr = pagenum(ac, 0)
     assert pageaddr == freepages(ac)
-    assert pageaddr.address[0] == NULL
+    freepage = llmemory.cast_adr_to_ptr(pageaddr, FREE_PAGE_PTR)
+    assert freepage.nextpage == NULL
+    assert freepage.npages == 1
     assert ac.page_for_size[2] == PAGE_NULL
 
 def test_mass_free_full_remains_full():
@@ -477,3 +480,108 @@ def test_random(incremental=False):
 
 def test_random_incremental():
     test_random(incremental=True)
+
+def test_malloc_while_sweeping():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "##3#", fill_with_objects=2)
+    ac.mass_free_prepare()
+    assert ac.page_for_size[2] == PAGE_NULL
+    #
+    # the old pages of size class 2 are swept on demand until one of
+    # them has room, instead of taking a fresh page
+    ok_to_free = OkToFree(ac, lambda obj: obj == pagenum(ac, 1) + hdrsize)
+    obj = ac.malloc_while_sweeping(2*WORD, ok_to_free)
+    chkob(ac, 1, 0*WORD, obj)
+    assert len(ok_to_free.seen) == 6      # only pages 0 and 1 were swept
+    assert ac.full_page_for_size[2] == getpage(ac, 1)
+    assert ac.full_page_for_size[2].nextpage == getpage(ac, 0)
+    #
+    # the same for the other size classes
+    obj = ac.malloc_while_sweeping(3*WORD, ok_to_free)
+    chkob(ac, 2, 3*WORD, obj)
+    assert len(ok_to_free.seen) == 7
+    #
+    # the rest is swept as usual, but the pages swept above are not
+    # swept again
+    assert ac.mass_free_incremental(ok_to_free, 99)
+    assert len(ok_to_free.seen) == 10
+    assert ac.size_class_with_old_pages == -1
+
+def test_release_free_pages():
+    pagesize = hdrsize + 16
+    ac = arena_collection_for_test(pagesize, "#..#...#  ")
+    assert ac.count_free_pages() == 5
+    assert ac.release_free_pages() == 3
+    assert ac.count_free_pages() == 5
+    #
+    # only the first page of each run is left on the chained list
+    freepage = llmemory.cast_adr_to_ptr(freepages(ac), FREE_PAGE_PTR)
+    assert freepages(ac) == pagenum(ac, 1)
+    assert freepage.npages == 2
+    assert freepage.nextpage == pagenum(ac, 4)
+    freepage = llmemory.cast_adr_to_ptr(freepage.nextpage, FREE_PAGE_PTR)
+    assert freepage.npages == 3
+    assert freepage.nextpage == pagenum(ac, 8)    # the uninitialized pages
+    #
+    # the pages of the runs are still handed out in order
+    for i in [1, 2, 4, 5, 6, 8]:
+        page = ac.allocate_new_page(1); checkpage(ac, page, i)
+        ac.page_for_size[1] = PAGE_NULL
+    assert ac.count_free_pages() == 0
+    assert ac.num_uninitialized_pages == 1
+
+def test_release_free_pages_full_arena():
+    pagesize = hdrsize + 16
+    ac = arena_collection_for_test(pagesize, "....#.")
+    assert ac.release_free_pages() == 3
+    assert ac.release_free_pages() == 0     # already done
+    freepage = llmemory.cast_adr_to_ptr(freepages(ac), FREE_PAGE_PTR)
+    assert freepage.npages == 4
+    assert freepage.nextpage == pagenum(ac, 5)
+    freepage = llmemory.cast_adr_to_ptr(freepage.nextpage, FREE_PAGE_PTR)
+    assert freepage.npages == 1
+    assert freepage.nextpage == NULL
+    for i in [0, 1, 2, 3, 5]:
+        page = ac.allocate_new_page(1); checkpage(ac, page, i)
+        ac.page_for_size[1] = PAGE_NULL
+    assert not ac.current_arena
+
+def test_release_free_pages_only_new_ones():
+    pagesize = hdrsize + 16
+    ac = arena_collection_for_test(pagesize, "#..#.#.#  ")
+    assert ac.release_free_pages() == 1
+    arena = ac.current_arena
+    assert arena.nnewfreepages == 0
+    # nothing was freed since: the arena is not walked again
+    saved = arena.freepages
+    arena.freepages = NULL
+    assert ac.release_free_pages() == 0
+    arena.freepages = saved
+    #
+    # free the page 3: the run of pages 1-4 can be released
+    page = llmemory.cast_adr_to_ptr(pagenum(ac, 3), PAGE_PTR)
+    page.arena = arena
+    ac.free_page(page)
+    assert arena.nnewfreepages == 1
+    assert ac.release_free_pages() == 2
+    assert arena.nnewfreepages == 0
+    assert ac.count_free_pages() == 5
+
+def test_freeze_pages():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "/#.  ", fill_with_objects=2)
+    ac.total_memory_used = 1234
+    seen = []
+    assert ac.freeze_pages(seen.append) == 1234
+    # page 0 has 1 object followed by 1 free block, page 1 is full
+    assert seen == [pagenum(ac, 0) + hdrsize,
+                    pagenum(ac, 1) + hdrsize,
+                    pagenum(ac, 1) + hdrsize + 2*WORD,
+                    pagenum(ac, 1) + hdrsize + 4*WORD]
+    assert ac.total_memory_used == 0
+    assert ac.page_for_size[2] == PAGE_NULL
+    assert ac.full_page_for_size[2] == PAGE_NULL
+    #
+    # the free blocks of page 0 are not reused: new objects go to a new page
+    obj = ac.malloc(2*WORD)
+    chkob(ac, 2, 0, obj)
@@ -311,6 +311,10 @@ class BaseFrameworkGCTransformer(GCTransformer):
             [s_gc, annmodel.SomeInteger()], annmodel.s_None)
         self.collect_step_ptr = getfn(GCClass.collect_step.im_func, [s_gc],
                                       annmodel.SomeInteger())
+        self.compact_ptr = getfn(GCClass.compact.im_func, [s_gc],
+                                 annmodel.SomeInteger())
+        self.freeze_ptr = getfn(GCClass.freeze.im_func, [s_gc],
+                                annmodel.SomeInteger())
         self.enable_ptr = getfn(GCClass.enable.im_func, [s_gc], annmodel.s_None)
         self.disable_ptr = getfn(GCClass.disable.im_func, [s_gc], annmodel.s_None)
         self.isenabled_ptr = getfn(GCClass.isenabled.im_func, [s_gc],
@@ -468,7 +472,8 @@ class BaseFrameworkGCTransformer(GCTransformer):
                                          annmodel.SomeBool(),
                                          minimal_transform=False)
         self.dump_rpy_heap_ptr = getfn(inspector.dump_rpy_heap,
-                                       [s_gc, annmodel.SomeInteger()],
+                                       [s_gc, annmodel.SomeInteger(),
+                                        annmodel.s_Bool],
                                        annmodel.s_Bool,
                                        minimal_transform=False)
         self.get_typeids_z_ptr = getfn(inspector.get_typeids_z,
@@ -908,6 +913,20 @@ class BaseFrameworkGCTransformer(GCTransformer):
                   resultvar=op.result)
         self.pop_roots(hop, livevars)
 
+    def gct_gc__compact(self, hop):
+        op = hop.spaceop
+        livevars = self.push_roots(hop)
+        hop.genop("direct_call", [self.compact_ptr, self.c_const_gc],
+                  resultvar=op.result)
+        self.pop_roots(hop, livevars)
+
+    def gct_gc__freeze(self, hop):
+        op = hop.spaceop
+        livevars = self.push_roots(hop)
+        hop.genop("direct_call", [self.freeze_ptr, self.c_const_gc],
+                  resultvar=op.result)
+        self.pop_roots(hop, livevars)
+
     def gct_gc__enable(self, hop):
         op = hop.spaceop
         hop.genop("direct_call", [self.enable_ptr, self.c_const_gc],
@@ -1327,9 +1346,9 @@ class BaseFrameworkGCTransformer(GCTransformer):
 
     def gct_gc_dump_rpy_heap(self, hop):
         livevars = self.push_roots(hop)
-        [v_fd] = hop.spaceop.args
+        [v_fd, v_compact] = hop.spaceop.args
         hop.genop("direct_call",
-                  [self.dump_rpy_heap_ptr, self.c_const_gc, v_fd],
+                  [self.dump_rpy_heap_ptr, self.c_const_gc, v_fd, v_compact],
                   resultvar=hop.spaceop.result)
         self.pop_roots(hop, livevars)
 
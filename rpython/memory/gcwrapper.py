@@ -135,6 +135,12 @@ class GCManagedHeap(object):
     def collect(self, *gen):
         self.gc.collect(*gen)
 
+    def compact(self):
+        return self.gc.compact()
+
+    def freeze(self):
+        return self.gc.freeze()
+
     def can_move(self, addr):
         return self.gc.can_move(addr)
 
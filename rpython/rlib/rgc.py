@@ -30,6 +30,29 @@ def collect_step():
     gc.collect()
     return _encode_states(1, 0)
 
+def compact():
+    """
+    Do a full collection, then give back to the OS the memory of the free
+    pages in the arenas that are still partially used.
+
+    Return the number of bytes given back (0 if the GC does not support
+    it).
+    """
+    gc.collect()
+    return 0
+
+def freeze():
+    """
+    Do a full collection, then make all the surviving objects immortal:
+    the GC will never free them nor write to them again, which keeps
+    their memory shared with the child processes after a fork().
+
+    Return the total size of the objects frozen (0 if the GC does not
+    support it).
+    """
+    gc.collect()
+    return 0
+
 def _encode_states(oldstate, newstate):
     return oldstate << 8 | newstate
 
@@ -213,6 +236,30 @@ class CollectStepEntry(ExtRegistryEntry):
         return hop.genop('gc__collect_step', hop.args_v, resulttype=hop.r_result)
 
 
+class CompactEntry(ExtRegistryEntry):
+    _about_ = compact
+
+    def compute_result_annotation(self):
+        from rpython.annotator import model as annmodel
+        return annmodel.SomeInteger()
+
+    def specialize_call(self, hop):
+        hop.exception_cannot_occur()
+        return hop.genop('gc__compact', hop.args_v, resulttype=hop.r_result)
+
+
+class FreezeEntry(ExtRegistryEntry):
+    _about_ = freeze
+
+    def compute_result_annotation(self):
+        from rpython.annotator import model as annmodel
+        return annmodel.SomeInteger()
+
+    def specialize_call(self, hop):
+        hop.exception_cannot_occur()
+        return hop.genop('gc__freeze', hop.args_v, resulttype=hop.r_result)
+
+
 class SetMaxHeapSizeEntry(ExtRegistryEntry):
     _about_ = set_max_heap_size
 
@@ -854,7 +901,7 @@ def get_stats(stat_no):
     raise NotImplementedError
 
 @not_rpython
-def dump_rpy_heap(fd):
+def dump_rpy_heap(fd, compact=False):
     raise NotImplementedError
 
 @not_rpython
@@ -1104,11 +1151,15 @@ class Entry(ExtRegistryEntry):
 
 class Entry(ExtRegistryEntry):
     _about_ = dump_rpy_heap
-    def compute_result_annotation(self, s_fd):
+    def compute_result_annotation(self, s_fd, s_compact=None):
         from rpython.annotator.model import s_Bool
         return s_Bool
     def specialize_call(self, hop):
-        vlist = hop.inputargs(lltype.Signed)
+        if hop.nb_args == 2:
+            vlist = hop.inputargs(lltype.Signed, lltype.Bool)
+        else:
+            vlist = [hop.inputarg(lltype.Signed, 0),
+                     hop.inputconst(lltype.Bool, False)]
         hop.exception_is_here()
         return hop.genop('gc_dump_rpy_heap', vlist, resulttype = hop.r_result)
 
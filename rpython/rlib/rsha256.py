@@ -0,0 +1,239 @@
+"""
+RPython implementation of SHA-224 and SHA-256, from the text of the NIST
+standard FIPS PUB 180-4.
+
+See also the pure Python implementation in lib_pypy/_sha256.py.
+
+This module follows the API of the CPython _sha256 module.
+"""
+
+from rpython.rlib.rarithmetic import r_uint, r_ulonglong
+
+# We reuse helpers from rsha too
+from rpython.rlib.rsha import _string2uintlist
+
+# the words are stored in r_uints, which may be larger than 32 bits
+MASK = r_uint(0xFFFFFFFF)
+
+
+def _rotateRight(x, n):
+    "Rotate x (32 bit, masked) right n bits circularly."
+    return ((x >> n) | (x << (32 - n))) & MASK
+
+def _state2string(state, count):
+    result = []
+    for i in range(count):
+        x = state[i]
+        result.append(chr((x >> 24) & 0xFF))
+        result.append(chr((x >> 16) & 0xFF))
+        result.append(chr((x >> 8) & 0xFF))
+        result.append(chr(x & 0xFF))
+    return ''.join(result)
+
+def _string2hexstring(s):
+    hx = '0123456789abcdef'
+    result = []
+    for c in s:
+        result.append(hx[(ord(c) >> 4) & 0xF])
+        result.append(hx[ord(c) & 0xF])
+    return ''.join(result)
+
+
+# Constants to be used
+K = map(r_uint, [
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1,
+    0x923f82a4, 0xab1c5ed5, 0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3,
+    0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174, 0xe49b69c1, 0xefbe4786,
+    0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147,
+    0x06ca6351, 0x14292967, 0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13,
+    0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85, 0xa2bfe8a1, 0xa81a664b,
+    0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a,
+    0x5b9cca4f, 0x682e6ff3, 0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208,
+    0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2])
+
+# Initial message digests
+H256 = map(r_uint, [
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+    0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19])
+H224 = map(r_uint, [
+    0xc1059ed8, 0x367cd507, 0x3070dd17, 0xf70e5939,
+    0xffc00b31, 0x68581511, 0x64f98fa7, 0xbefa4fa4])
+
+
+class RSHA256(object):
+    """RPython-level SHA-256 object.
+    """
+    _initial_state = H256
+    digest_size = 32
+
+    def __init__(self, initialdata=''):
+        self._init()
+        self.update(initialdata)
+
+
+    def _init(self):
+        "Initialisation."
+        self.count = r_ulonglong(0)   # total number of bytes
+        self.input = ""   # pending unprocessed data, < 64 bytes
+        self.uintbuffer = [r_uint(0)] * 64
+        self.state = self._initial_state[:]
+
+    def _transform(self, W):
+        for t in range(16, 64):
+            w2 = W[t-2]
+            w15 = W[t-15]
+            s0 = _rotateRight(w15, 7) ^ _rotateRight(w15, 18) ^ (w15 >> 3)
+            s1 = _rotateRight(w2, 17) ^ _rotateRight(w2, 19) ^ (w2 >> 10)
+            W[t] = (W[t-16] + s0 + W[t-7] + s1) & MASK
+
+        state = self.state
+        A = state[0]
+        B = state[1]
+        C = state[2]
+        D = state[3]
+        E = state[4]
+        F = state[5]
+        G = state[6]
+        H = state[7]
+
+        for t in range(64):
+            S1 = _rotateRight(E, 6) ^ _rotateRight(E, 11) ^ _rotateRight(E, 25)
+            ch = G ^ (E & (F ^ G))
+            TEMP1 = H + S1 + ch + K[t] + W[t]
+            S0 = _rotateRight(A, 2) ^ _rotateRight(A, 13) ^ _rotateRight(A, 22)
+            maj = (A & B) | (C & (A | B))
+            TEMP2 = S0 + maj
+            H = G
+            G = F
+            F = E
+            E = (D + TEMP1) & MASK
+            D = C
+            C = B
+            B = A
+            A = (TEMP1 + TEMP2) & MASK
+
+        state[0] = (state[0] + A) & MASK
+        state[1] = (state[1] + B) & MASK
+        state[2] = (state[2] + C) & MASK
+        state[3] = (state[3] + D) & MASK
+        state[4] = (state[4] + E) & MASK
+        state[5] = (state[5] + F) & MASK
+        state[6] = (state[6] + G) & MASK
+        state[7] = (state[7] + H) & MASK
+
+
+    def _finalize(self):
+        """Logic to add the final padding and extract the digest.
+        """
+        # Save the state before adding the padding
+        count = self.count
+        input = self.input
+        state = self.state[:]
+
+        index = len(input)
+        if index < 56:
+            padLen = 56 - index
+        else:
+            padLen = 120 - index
+
+        if padLen:
+            self.update('\200' + '\000' * (padLen-1))
+
+        # Append length (before padding).
+        assert len(self.input) == 56
+        W = self.uintbuffer
+        _string2uintlist(self.input, 0, 14, W)
+        length_in_bits = count << 3
+        W[14] = r_uint(length_in_bits >> 32) & MASK
+        W[15] = r_uint(length_in_bits) & MASK
+        self._transform(W)
+
+        # Store state in digest.
+        digest = _state2string(self.state, self.digest_size // 4)
+
+        # Restore the saved state in case this instance is still used
+        self.count = count
+        self.input = input
+        self.state = state
+
+        return digest
+
+
+    # Down from here all methods follow the Python Standard Library
+    # API of the _sha256 module.
+
+    def update(self, inBuf):
+        """Add to the current message.
+
+        The hash is immediately calculated for all full blocks. The final
+        calculation is made in digest(). It will calculate 1-2 blocks,
+        depending on how much padding we have to add.
+        """
+
+        leninBuf = len(inBuf)
+        self.count += leninBuf
+        index = len(self.input)
+        partLen = 64 - index
+        assert partLen > 0
+
+        if leninBuf >= partLen:
+            W = self.uintbuffer
+            self.input = self.input + inBuf[:partLen]
+            _string2uintlist(self.input, 0, 16, W)
+            self._transform(W)
+            i = partLen
+            while i + 64 <= leninBuf:
+                _string2uintlist(inBuf, i, 16, W)
+                self._transform(W)
+                i = i + 64
+            else:
+                self.input = inBuf[i:leninBuf]
+        else:
+            self.input = self.input + inBuf
+
+
+    def digest(self):
+        """Terminate the message-digest computation and return digest.
+        """
+        return self._finalize()
+
+
+    def hexdigest(self):
+        """Terminate and return digest in HEX form.
+        """
+        return _string2hexstring(self._finalize())
+
+
+    def copy(self):
+        """Return a clone object.
+        """
+        clone = RSHA256()
+        clone._copyfrom(self)
+        return clone
+
+    def _copyfrom(self, other):
+        """Copy all state from 'other' into 'self'.
+        """
+        self.count = other.count
+        self.input = other.input
+        self.state = other.state[:]
+
+
+class RSHA224(RSHA256):
+    """RPython-level SHA-224 object.
+    """
+    _initial_state = H224
+    digest_size = 28
+
+    def copy(self):
+        clone = RSHA224()
+        clone._copyfrom(self)
+        return clone
+
+
+# synonyms to build new RSHA objects, for compatibility with the
+# CPython _sha256 module interface.
+sha256 = RSHA256
+sha224 = RSHA224
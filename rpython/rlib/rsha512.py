@@ -0,0 +1,252 @@
+"""
+RPython implementation of SHA-384 and SHA-512, from the text of the NIST
+standard FIPS PUB 180-4.
+
+See also the pure Python implementation in lib_pypy/_sha512.py.
+
+This module follows the API of the CPython _sha512 module.
+"""
+
+from rpython.rlib.rarithmetic import r_ulonglong, intmask
+
+# We reuse helpers from rsha256 too
+from rpython.rlib.rsha256 import _string2hexstring
+
+
+def _rotateRight(x, n):
+    "Rotate x (64 bit) right n bits circularly."
+    return (x >> n) | (x << (64 - n))
+
+def _state2string(state, count):
+    result = []
+    for i in range(count):
+        x = state[i]
+        for shift in range(56, -8, -8):
+            result.append(chr(intmask((x >> shift) & 0xFF)))
+    return ''.join(result)
+
+def _string2ulonglonglist(s, start, count, result):
+    """Build a list of count r_ulonglong's by unpacking the string
+    s[start:start+8*count] in big-endian order.
+    """
+    for i in range(count):
+        p = start + i * 8
+        x = r_ulonglong(0)
+        for j in range(8):
+            x = (x << 8) | r_ulonglong(ord(s[p+j]))
+        result[i] = x
+
+
+# Constants to be used
+K = map(r_ulonglong, [
+    0x428a2f98d728ae22, 0x7137449123ef65cd, 0xb5c0fbcfec4d3b2f,
+    0xe9b5dba58189dbbc, 0x3956c25bf348b538, 0x59f111f1b605d019,
+    0x923f82a4af194f9b, 0xab1c5ed5da6d8118, 0xd807aa98a3030242,
+    0x12835b0145706fbe, 0x243185be4ee4b28c, 0x550c7dc3d5ffb4e2,
+    0x72be5d74f27b896f, 0x80deb1fe3b1696b1, 0x9bdc06a725c71235,
+    0xc19bf174cf692694, 0xe49b69c19ef14ad2, 0xefbe4786384f25e3,
+    0x0fc19dc68b8cd5b5, 0x240ca1cc77ac9c65, 0x2de92c6f592b0275,
+    0x4a7484aa6ea6e483, 0x5cb0a9dcbd41fbd4, 0x76f988da831153b5,
+    0x983e5152ee66dfab, 0xa831c66d2db43210, 0xb00327c898fb213f,
+    0xbf597fc7beef0ee4, 0xc6e00bf33da88fc2, 0xd5a79147930aa725,
+    0x06ca6351e003826f, 0x142929670a0e6e70, 0x27b70a8546d22ffc,
+    0x2e1b21385c26c926, 0x4d2c6dfc5ac42aed, 0x53380d139d95b3df,
+    0x650a73548baf63de, 0x766a0abb3c77b2a8, 0x81c2c92e47edaee6,
+    0x92722c851482353b, 0xa2bfe8a14cf10364, 0xa81a664bbc423001,
+    0xc24b8b70d0f89791, 0xc76c51a30654be30, 0xd192e819d6ef5218,
+    0xd69906245565a910, 0xf40e35855771202a, 0x106aa07032bbd1b8,
+    0x19a4c116b8d2d0c8, 0x1e376c085141ab53, 0x2748774cdf8eeb99,
+    0x34b0bcb5e19b48a8, 0x391c0cb3c5c95a63, 0x4ed8aa4ae3418acb,
+    0x5b9cca4f7763e373, 0x682e6ff3d6b2b8a3, 0x748f82ee5defb2fc,
+    0x78a5636f43172f60, 0x84c87814a1f0ab72, 0x8cc702081a6439ec,
+    0x90befffa23631e28, 0xa4506cebde82bde9, 0xbef9a3f7b2c67915,
+    0xc67178f2e372532b, 0xca273eceea26619c, 0xd186b8c721c0c207,
+    0xeada7dd6cde0eb1e, 0xf57d4f7fee6ed178, 0x06f067aa72176fba,
+    0x0a637dc5a2c898a6, 0x113f9804bef90dae, 0x1b710b35131c471b,
+    0x28db77f523047d84, 0x32caab7b40c72493, 0x3c9ebe0a15c9bebc,
+    0x431d67c49c100d4c, 0x4cc5d4becb3e42b6, 0x597f299cfc657e2a,
+    0x5fcb6fab3ad6faec, 0x6c44198c4a475817])
+
+# Initial message digests
+H512 = map(r_ulonglong, [
+    0x6a09e667f3bcc908, 0xbb67ae8584caa73b, 0x3c6ef372fe94f82b, 0xa54ff53a5f1d36f1,
+    0x510e527fade682d1, 0x9b05688c2b3e6c1f, 0x1f83d9abfb41bd6b, 0x5be0cd19137e2179])
+H384 = map(r_ulonglong, [
+    0xcbbb9d5dc1059ed8, 0x629a292a367cd507, 0x9159015a3070dd17, 0x152fecd8f70e5939,
+    0x67332667ffc00b31, 0x8eb44a8768581511, 0xdb0c2e0d64f98fa7, 0x47b5481dbefa4fa4])
+
+
+class RSHA512(object):
+    """RPython-level SHA-512 object.
+    """
+    _initial_state = H512
+    digest_size = 64
+
+    def __init__(self, initialdata=''):
+        self._init()
+        self.update(initialdata)
+
+
+    def _init(self):
+        "Initialisation."
+        self.count = r_ulonglong(0)   # total number of bytes
+        self.input = ""   # pending unprocessed data, < 128 bytes
+        self.ulonglongbuffer = [r_ulonglong(0)] * 80
+        self.state = self._initial_state[:]
+
+    def _transform(self, W):
+        for t in range(16, 80):
+            w2 = W[t-2]
+            w15 = W[t-15]
+            s0 = _rotateRight(w15, 1) ^ _rotateRight(w15, 8) ^ (w15 >> 7)
+            s1 = _rotateRight(w2, 19) ^ _rotateRight(w2, 61) ^ (w2 >> 6)
+            W[t] = W[t-16] + s0 + W[t-7] + s1
+
+        state = self.state
+        A = state[0]
+        B = state[1]
+        C = state[2]
+        D = state[3]
+        E = state[4]
+        F = state[5]
+        G = state[6]
+        H = state[7]
+
+        for t in range(80):
+            S1 = _rotateRight(E, 14) ^ _rotateRight(E, 18) ^ _rotateRight(E, 41)
+            ch = G ^ (E & (F ^ G))
+            TEMP1 = H + S1 + ch + K[t] + W[t]
+            S0 = _rotateRight(A, 28) ^ _rotateRight(A, 34) ^ _rotateRight(A, 39)
+            maj = (A & B) | (C & (A | B))
+            TEMP2 = S0 + maj
+            H = G
+            G = F
+            F = E
+            E = D + TEMP1
+            D = C
+            C = B
+            B = A
+            A = TEMP1 + TEMP2
+
+        state[0] += A
+        state[1] += B
+        state[2] += C
+        state[3] += D
+        state[4] += E
+        state[5] += F
+        state[6] += G
+        state[7] += H
+
+
+    def _finalize(self):
+        """Logic to add the final padding and extract the digest.
+        """
+        # Save the state before adding the padding
+        count = self.count
+        input = self.input
+        state = self.state[:]
+
+        index = len(input)
+        if index < 112:
+            padLen = 112 - index
+        else:
+            padLen = 240 - index
+
+        if padLen:
+            self.update('\200' + '\000' * (padLen-1))
+
+        # Append length (before padding), as a 128-bit number.
+        assert len(self.input) == 112
+        W = self.ulonglongbuffer
+        _string2ulonglonglist(self.input, 0, 14, W)
+        W[14] = count >> 61
+        W[15] = count << 3
+        self._transform(W)
+
+        # Store state in digest.
+        digest = _state2string(self.state, self.digest_size // 8)
+
+        # Restore the saved state in case this instance is still used
+        self.count = count
+        self.input = input
+        self.state = state
+
+        return digest
+
+
+    # Down from here all methods follow the Python Standard Library
+    # API of the _sha512 module.
+
+    def update(self, inBuf):
+        """Add to the current message.
+
+        The hash is immediately calculated for all full blocks. The final
+        calculation is made in digest(). It will calculate 1-2 blocks,
+        depending on how much padding we have to add.
+        """
+
+        leninBuf = len(inBuf)
+        self.count += leninBuf
+        index = len(self.input)
+        partLen = 128 - index
+        assert partLen > 0
+
+        if leninBuf >= partLen:
+            W = self.ulonglongbuffer
+            self.input = self.input + inBuf[:partLen]
+            _string2ulonglonglist(self.input, 0, 16, W)
+            self._transform(W)
+            i = partLen
+            while i + 128 <= leninBuf:
+                _string2ulonglonglist(inBuf, i, 16, W)
+                self._transform(W)
+                i = i + 128
+            else:
+                self.input = inBuf[i:leninBuf]
+        else:
+            self.input = self.input + inBuf
+
+
+    def digest(self):
+        """Terminate the message-digest computation and return digest.
+        """
+        return self._finalize()
+
+
+    def hexdigest(self):
+        """Terminate and return digest in HEX form.
+        """
+        return _string2hexstring(self._finalize())
+
+
+    def copy(self):
+        """Return a clone object.
+        """
+        clone = RSHA512()
+        clone._copyfrom(self)
+        return clone
+
+    def _copyfrom(self, other):
+        """Copy all state from 'other' into 'self'.
+        """
+        self.count = other.count
+        self.input = other.input
+        self.state = other.state[:]
+
+
+class RSHA384(RSHA512):
+    """RPython-level SHA-384 object.
+    """
+    _initial_state = H384
+    digest_size = 48
+
+    def copy(self):
+        clone = RSHA384()
+        clone._copyfrom(self)
+        return clone
+
+
+# synonyms to build new RSHA objects, for compatibility with the
+# CPython _sha512 module interface.
+sha512 = RSHA512
+sha384 = RSHA384
@@ -2,6 +2,7 @@ import sys
 from rpython.rlib.debug import check_nonneg
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rsre import rsre_literal
 from rpython.tool.sourcetools import func_with_new_name
 from rpython.rlib.objectmodel import we_are_translated, not_rpython
 from rpython.rlib import jit
@@ -52,6 +53,10 @@ class EndOfString(Exception):
 
 class CompiledPattern(object):
     _immutable_fields_ = ['pattern[*]', 'flags']
+    dfa = None              # see rsre_dfa.get_dfa()
+    dfa_checked = False
+    literal_prefilter = None    # see rsre_literal.get_literal_prefilter()
+    literal_prefilter_checked = False
 
     def __init__(self, pattern, flags):
         self.pattern = pattern
@@ -1301,12 +1306,60 @@ def search_context(ctx, pattern):
         else:
             charset = (flags & consts.SRE_INFO_CHARSET)
         base += 1 + pattern.pat(1)
+    prefilter = get_literal_prefilter(pattern)
+    if prefilter is not None:
+        if prefilter.required is not None:
+            if not find_literal(ctx, prefilter.required):
+                return False
+        if prefilter.prefixes is not None:
+            return prefix_set_search(ctx, pattern, base, prefilter.prefixes)
     if pattern.pat(base) == consts.OPCODE_LITERAL:
         return literal_search(ctx, pattern, base)
     if charset:
         return charset_search(ctx, pattern, base)
     return regular_search(ctx, pattern, base)
 
+@jit.elidable
+def get_literal_prefilter(pattern):
+    return rsre_literal.get_literal_prefilter(pattern)
+
+@specializectx
+@jit.dont_look_inside
+def find_literal(ctx, literal):
+    # like memchr() followed by memcmp(): checks if the list of chars
+    # 'literal' is found from 'ctx.match_start'
+    first = literal[0]
+    start = ctx.match_start
+    while start < ctx.end:
+        if ctx.str(start) == first:
+            ptr = ctx.next(start)
+            i = 1
+            while i < len(literal):
+                if ptr >= ctx.end:
+                    return False
+                if ctx.str(ptr) != literal[i]:
+                    break
+                ptr = ctx.next(ptr)
+                i += 1
+            else:
+                return True
+        start = ctx.next(start)
+    return False
+
+@specializectx
+@jit.dont_look_inside
+def find_prefix(ctx, prefixes, start):
+    # returns the first position from 'start' where one of the literals
+    # of the AhoCorasick automaton 'prefixes' starts, or 'ctx.end'
+    state = 0
+    ptr = start
+    while ptr < ctx.end:
+        state = prefixes.step(state, ctx.str(ptr))
+        ptr = ctx.next(ptr)
+        if prefixes.is_terminal(state):
+            return ctx.prev_n(ptr, prefixes.length, start)
+    return ctx.end
+
 install_jitdriver('RegularSearch',
                   greens=['base', 'pattern'],
                   reds=['start', 'ctx'],
@@ -1347,6 +1400,27 @@ def literal_search(ctx, pattern, base):
         start = start1
     return False
 
+install_jitdriver_spec("PrefixSetSearch",
+                       greens=['base', 'pattern'],
+                       reds=['start', 'ctx', 'prefixes'],
+                       debugprint=(1, 0))
+@specializectx
+def prefix_set_search(ctx, pattern, base, prefixes):
+    # pattern starts with an alternation of literals: only try to match
+    # at the positions found by the AhoCorasick automaton
+    start = ctx.match_start
+    while start < ctx.end:
+        ctx.jitdriver_PrefixSetSearch.jit_merge_point(ctx=ctx, start=start,
+                            base=base, pattern=pattern, prefixes=prefixes)
+        start = find_prefix(ctx, prefixes, start)
+        if start >= ctx.end:
+            return False
+        if sre_match(ctx, pattern, base, start, None) is not None:
+            ctx.match_start = start
+            return True
+        start = ctx.next(start)
+    return False
+
 install_jitdriver_spec("CharsetSearch",
                        greens=['base', 'pattern'],
                        reds=['start', 'ctx'],
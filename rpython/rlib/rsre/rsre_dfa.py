@@ -0,0 +1,319 @@
+"""
+A lazily built DFA, used as a linear-time prefilter in front of the
+backtracking matcher of rsre_core.
+
+The pattern code is turned into a Thompson NFA, and the DFA states (sets
+of NFA states) and their transitions are only built when the input needs
+them, like in RE2.  The DFA only answers "can the pattern match here at
+all?": the real match, with its groups, is still done by rsre_core.  This
+is what makes it safe to over-approximate: the AT assertions (^, $, \\b...)
+are treated as always true, and MODE_FULL or MODE_NONEMPTY are ignored.
+The answer is then "maybe" or "certainly not", and the second one is
+found in a single pass over the string, without backtracking.
+
+Patterns with backreferences, lookarounds or locale-dependent matching
+don't get a DFA.  Neither do the patterns that can't backtrack
+exponentially, which are the ones without a variable repeat around a
+BRANCH or around another variable repeat, like '(a|aa)*' or '(x+x+)+'.
+On the other patterns, like 'foo|bar' or '(\w+)@(\w+)', rsre_core is fast
+enough, and an extra pass over the string would mostly be a loss: most
+calls find a match, and the DFA cannot help them.  When there is a match,
+the DFA pass stops at the first position where a match can end.
+"""
+
+from rpython.rlib import jit
+from rpython.rlib.rsre import rsre_char, rsre_constants as consts
+from rpython.rlib.rsre.rsre_core import specializectx, unroll_char_checker
+
+# kinds of NFA nodes
+N_CHAR = 0      # consumes one character matching the opcode at 'ppos'
+N_SPLIT = 1     # epsilon transitions to 'out1' and 'out2'
+N_MATCH = 2     # the end of the pattern
+N_FAIL = 3      # dead end
+
+MAX_NFA_NODES = 5000
+MAX_DFA_STATES = 2000
+
+
+class Unsupported(Exception):
+    pass
+
+
+class NFA(object):
+    """ A Thompson NFA built from the pattern code.  The nodes are stored
+    in parallel lists. """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.kinds = []
+        self.ppos = []
+        self.out1 = []
+        self.out2 = []
+        self.has_nested_backtracking = False
+        self.repeat_depth = 0     # number of enclosing variable repeats
+        self.start = self.compile_seq(0, self.new_node(N_MATCH))
+
+    def new_node(self, kind, ppos=0, out1=-1, out2=-1):
+        if len(self.kinds) >= MAX_NFA_NODES:
+            raise Unsupported
+        self.kinds.append(kind)
+        self.ppos.append(ppos)
+        self.out1.append(out1)
+        self.out2.append(out2)
+        return len(self.kinds) - 1
+
+    def compile_seq(self, ppos, cont):
+        """ Compile the sequence of opcodes starting at 'ppos', up to the
+        end of a BRANCH alternative, of a REPEAT item or of the pattern,
+        and return its entry node.  The sequence continues to 'cont'. """
+        pattern = self.pattern
+        ops = []
+        while True:
+            op = pattern.pat(ppos)
+            if (op == consts.OPCODE_SUCCESS or op == consts.OPCODE_JUMP or
+                    op == consts.OPCODE_MAX_UNTIL or
+                    op == consts.OPCODE_MIN_UNTIL):
+                break
+            if op == consts.OPCODE_FAILURE:
+                cont = self.new_node(N_FAIL)
+                break
+            ops.append(ppos)
+            ppos = self.next_op(ppos)
+        # build the nodes backwards, from the continuation
+        for i in range(len(ops) - 1, -1, -1):
+            cont = self.compile_op(ops[i], cont)
+        return cont
+
+    def next_op(self, ppos):
+        pattern = self.pattern
+        op = pattern.pat(ppos)
+        if (op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL):
+            return ppos + 1
+        if (op == consts.OPCODE_AT or op == consts.OPCODE_MARK or
+                is_single_char_op(op) and not is_charset_op(op)):
+            return ppos + 2
+        if (op == consts.OPCODE_INFO or op == consts.OPCODE_REPEAT_ONE or
+                op == consts.OPCODE_MIN_REPEAT_ONE or is_charset_op(op)):
+            return ppos + 1 + pattern.pat(ppos + 1)
+        if op == consts.OPCODE_REPEAT:
+            # <REPEAT> <skip> <min> <max> item <UNTIL> tail
+            return ppos + 2 + pattern.pat(ppos + 1)
+        if op == consts.OPCODE_BRANCH:
+            # <BRANCH> <skip> code <JUMP> ... <NULL>
+            ppos += 1
+            while pattern.pat(ppos):
+                ppos += pattern.pat(ppos)
+            return ppos + 1
+        # GROUPREF*, ASSERT*, CATEGORY...
+        raise Unsupported
+
+    def compile_op(self, ppos, cont):
+        pattern = self.pattern
+        op = pattern.pat(ppos)
+        if (op == consts.OPCODE_AT or op == consts.OPCODE_MARK or
+                op == consts.OPCODE_INFO):
+            return cont
+        if is_single_char_op(op):
+            return self.new_node(N_CHAR, ppos, cont)
+        if op == consts.OPCODE_BRANCH:
+            if self.repeat_depth > 0:
+                self.has_nested_backtracking = True
+            alternatives = []
+            ppos += 1
+            while pattern.pat(ppos):
+                alternatives.append(self.compile_seq(ppos + 1, cont))
+                ppos += pattern.pat(ppos)
+            if not alternatives:
+                return self.new_node(N_FAIL)
+            entry = alternatives[-1]
+            for i in range(len(alternatives) - 2, -1, -1):
+                entry = self.new_node(N_SPLIT, 0, alternatives[i], entry)
+            return entry
+        # REPEAT, REPEAT_ONE or MIN_REPEAT_ONE, checked by next_op()
+        mincount = pattern.pat(ppos + 2)
+        maxcount = pattern.pat(ppos + 3)
+        item = ppos + 4
+        if mincount > MAX_NFA_NODES or (maxcount != rsre_char.MAXREPEAT and
+                                        maxcount - mincount > MAX_NFA_NODES):
+            raise Unsupported
+        variable = maxcount != mincount
+        if variable and self.repeat_depth > 0:
+            self.has_nested_backtracking = True
+        if variable:
+            self.repeat_depth += 1
+        if maxcount == rsre_char.MAXREPEAT:
+            loop = self.new_node(N_SPLIT, 0, -1, cont)
+            self.out1[loop] = self.compile_seq(item, loop)
+            cont = loop
+        else:
+            for i in range(maxcount - mincount):
+                entry = self.compile_seq(item, cont)
+                cont = self.new_node(N_SPLIT, 0, entry, cont)
+        for i in range(mincount):
+            cont = self.compile_seq(item, cont)
+        if variable:
+            self.repeat_depth -= 1
+        return cont
+
+
+def is_charset_op(op):
+    return (op == consts.OPCODE_IN or op == consts.OPCODE_IN_IGNORE or
+            consts.eq(op, consts.OPCODE37_IN_UNI_IGNORE))
+
+def is_single_char_op(op):
+    # the opcodes of unroll_char_checker, except the LOC ones, which depend
+    # on the current locale and so can't have their transitions cached
+    if (consts.eq(op, consts.OPCODE37_IN_LOC_IGNORE) or
+            consts.eq(op, consts.OPCODE37_LITERAL_LOC_IGNORE) or
+            consts.eq(op, consts.OPCODE37_NOT_LITERAL_LOC_IGNORE)):
+        return False
+    for op1, checkerfn in unroll_char_checker:
+        if op1 == op:
+            return True
+    return False
+
+@specializectx
+def char_matches(ctx, pattern, ptr, ppos):
+    op = pattern.pat(ppos)
+    for op1, checkerfn in unroll_char_checker:
+        if op1 == op:
+            return checkerfn(ctx, pattern, ptr, ppos)
+    return False
+
+
+class DFAState(object):
+    def __init__(self, nodes, accepting):
+        self.nodes = nodes            # sorted list of N_CHAR nodes
+        self.accepting = accepting
+        self.transitions = None       # lazily built, for chars < 256
+
+
+class DFA(object):
+    """ The lazily built DFA.  If 'anchored' is False, the start node is
+    added to every state, which finds the matches starting anywhere. """
+
+    def __init__(self, nfa, anchored):
+        self.nfa = nfa
+        self.anchored = anchored
+        self.states = {}
+        self.too_big = False
+        self.seen = [0] * len(nfa.kinds)
+        self.generation = 0
+        self.initial = None
+        self.initial = self.get_state([nfa.start])
+
+    def get_state(self, seeds):
+        """ Return the DFA state for the epsilon-closure of 'seeds'. """
+        nfa = self.nfa
+        self.generation += 1
+        generation = self.generation
+        seen = self.seen
+        nodes = []
+        accepting = False
+        todo = seeds
+        while todo:
+            node = todo.pop()
+            if node < 0 or seen[node] == generation:
+                continue
+            seen[node] = generation
+            kind = nfa.kinds[node]
+            if kind == N_CHAR:
+                nodes.append(node)
+            elif kind == N_SPLIT:
+                todo.append(nfa.out2[node])
+                todo.append(nfa.out1[node])
+            elif kind == N_MATCH:
+                accepting = True
+        nodes.sort()
+        key = state_key(nodes, accepting)
+        try:
+            return self.states[key]
+        except KeyError:
+            pass
+        state = DFAState(nodes, accepting)
+        if len(self.states) >= MAX_DFA_STATES:
+            # too many states for this pattern: give up, and let the
+            # states built so far be freed after the current scan
+            self.too_big = True
+            self.states = {}
+            if self.initial is not None:
+                self.initial.transitions = None
+        else:
+            self.states[key] = state
+        return state
+
+def state_key(nodes, accepting):
+    key = ['\x01' if accepting else '\x00']
+    for node in nodes:
+        key.append(chr(node & 0xff))
+        key.append(chr(node >> 8))
+    return ''.join(key)
+
+@specializectx
+def compute_transition(ctx, dfa, state, ptr):
+    nfa = dfa.nfa
+    seeds = []
+    if not dfa.anchored:
+        seeds.append(nfa.start)
+    for node in state.nodes:
+        if char_matches(ctx, nfa.pattern, ptr, nfa.ppos[node]):
+            seeds.append(nfa.out1[node])
+    return dfa.get_state(seeds)
+
+@specializectx
+def transition(ctx, dfa, state, ptr):
+    c = ctx.str(ptr)
+    if c >= 256:
+        return compute_transition(ctx, dfa, state, ptr)
+    if state.transitions is None:
+        state.transitions = [None] * 256
+    next = state.transitions[c]
+    if next is None:
+        next = compute_transition(ctx, dfa, state, ptr)
+        state.transitions[c] = next
+    return next
+
+
+class PatternDFA(object):
+    def __init__(self, nfa):
+        self.search_dfa = DFA(nfa, False)
+        self.match_dfa = DFA(nfa, True)
+
+def get_dfa(pattern):
+    """ Return the PatternDFA of 'pattern', or None if it should not use one.
+    """
+    if not pattern.dfa_checked:
+        pattern.dfa_checked = True
+        if consts.V37 or not pattern.flags & consts.SRE_FLAG_LOCALE:
+            try:
+                nfa = NFA(pattern)
+            except Unsupported:
+                nfa = None
+            if nfa is not None and nfa.has_nested_backtracking:
+                pattern.dfa = PatternDFA(nfa)
+    return pattern.dfa
+
+@specializectx
+@jit.dont_look_inside
+def may_match(ctx, pattern, anchored):
+    """ Return False if the pattern cannot match in 'ctx' from
+    'ctx.match_start' (anchored), or from any position after it (not
+    anchored); True if it may. """
+    patterndfa = get_dfa(pattern)
+    if patterndfa is None:
+        return True
+    if anchored:
+        dfa = patterndfa.match_dfa
+    else:
+        dfa = patterndfa.search_dfa
+    if dfa.too_big:
+        return True
+    state = dfa.initial
+    ptr = ctx.match_start
+    end = ctx.end
+    while not state.accepting:
+        if ptr >= end or not state.nodes:
+            return False
+        state = transition(ctx, dfa, state, ptr)
+        ptr = ctx.next(ptr)
+    return True
@@ -0,0 +1,165 @@
+"""
+Literal prefilters for searching, computed from the pattern code.
+
+Two kinds of literals are looked for at the top level of the pattern:
+
+* the literal prefixes of an alternation that starts the pattern, like in
+  'error|warning|fatal'.  They are put in an Aho-Corasick automaton, and
+  the search only tries to match at the positions where one of them starts,
+  instead of trying every alternative at every position;
+
+* a literal substring that every match must contain, like ' ERROR: ' in
+  '\\d+ ERROR: (.*)'.  If it does not occur in the rest of the string, the
+  search fails without trying to match at all.
+
+The INFO block of the pattern already describes a literal prefix of the
+whole pattern; this is only used when there is none.
+"""
+
+from rpython.rlib.rsre import rsre_constants as consts
+
+MIN_LITERAL_LENGTH = 2
+MAX_LITERALS = 1000
+
+
+class LiteralPrefilter(object):
+    """ What was found in the pattern.  'prefixes' is an AhoCorasick
+    automaton, or None; 'required' is a list of character codes, or None.
+    """
+
+    def __init__(self, prefixes, required):
+        self.prefixes = prefixes
+        self.required = required
+
+
+class AhoCorasick(object):
+    """ An Aho-Corasick automaton for a set of literals that all have the
+    same 'length'.  Because of that, the state reached after a character is
+    terminal only if it is at depth 'length' in the trie, and the literals
+    found while scanning are found in the order of their start positions.
+    """
+
+    def __init__(self, literals, length):
+        self.length = length
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        for literal in literals:
+            state = 0
+            for i in range(length):
+                c = literal[i]
+                next = self.goto[state].get(c, -1)
+                if next < 0:
+                    next = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[state] + 1)
+                    self.goto[state][c] = next
+                state = next
+        # compute the failure links, breadth-first
+        queue = self.goto[0].values()
+        i = 0
+        while i < len(queue):
+            state = queue[i]
+            i += 1
+            for c, next in self.goto[state].items():
+                self.fail[next] = self.step(self.fail[state], c)
+                queue.append(next)
+
+    def step(self, state, c):
+        while True:
+            next = self.goto[state].get(c, -1)
+            if next >= 0:
+                return next
+            if state == 0:
+                return 0
+            state = self.fail[state]
+
+    def is_terminal(self, state):
+        return self.depth[state] == self.length
+
+
+def get_literal_prefilter(pattern):
+    """ Return the LiteralPrefilter of 'pattern', or None if it has nothing
+    that could speed up searching. """
+    if not pattern.literal_prefilter_checked:
+        pattern.literal_prefilter_checked = True
+        ppos = 0
+        if pattern.pat(0) == consts.OPCODE_INFO:
+            if pattern.pat(2) & consts.SRE_INFO_PREFIX and pattern.pat(5) > 1:
+                return None     # fast_search() is used
+            ppos = 1 + pattern.pat(1)
+        prefixes = _find_prefixes(pattern, ppos)
+        required = _find_required(pattern, ppos)
+        if prefixes is not None or required is not None:
+            pattern.literal_prefilter = LiteralPrefilter(prefixes, required)
+    return pattern.literal_prefilter
+
+def _skip_marks(pattern, ppos):
+    while pattern.pat(ppos) == consts.OPCODE_MARK:
+        ppos += 2
+    return ppos
+
+def _literal_run(pattern, ppos, result):
+    """ Append to 'result' the characters of the LITERAL opcodes that start
+    at 'ppos', ignoring the MARKs between them.  Return the position after
+    them. """
+    while True:
+        ppos = _skip_marks(pattern, ppos)
+        if pattern.pat(ppos) != consts.OPCODE_LITERAL:
+            return ppos
+        result.append(pattern.pat(ppos + 1))
+        ppos += 2
+
+def _find_prefixes(pattern, ppos):
+    # <BRANCH> <skip> code <JUMP> ... <NULL>, maybe in a group
+    ppos = _skip_marks(pattern, ppos)
+    if pattern.pat(ppos) != consts.OPCODE_BRANCH:
+        return None
+    literals = []
+    length = -1
+    ppos += 1
+    while pattern.pat(ppos):
+        literal = []
+        _literal_run(pattern, ppos + 1, literal)
+        if len(literal) < MIN_LITERAL_LENGTH or len(literals) >= MAX_LITERALS:
+            return None
+        if length < 0 or len(literal) < length:
+            length = len(literal)
+        literals.append(literal)
+        ppos += pattern.pat(ppos)
+    if len(literals) < 2:
+        return None
+    # the literals are cut to the same length: a match must still start
+    # with one of them
+    return AhoCorasick(literals, length)
+
+def _find_required(pattern, ppos):
+    # the longest run of LITERALs in the sequence of opcodes at the top
+    # level; stops at the first opcode whose size is not known here,
+    # which is fine because all the runs before it are still required
+    best = None
+    while True:
+        op = pattern.pat(ppos)
+        if op == consts.OPCODE_LITERAL:
+            literal = []
+            ppos = _literal_run(pattern, ppos, literal)
+            if len(literal) >= MIN_LITERAL_LENGTH and (
+                    best is None or len(literal) > len(best)):
+                best = literal
+        elif (op == consts.OPCODE_MARK or op == consts.OPCODE_AT or
+                op == consts.OPCODE_NOT_LITERAL or
+                op == consts.OPCODE_CATEGORY):
+            ppos += 2
+        elif op == consts.OPCODE_ANY or op == consts.OPCODE_ANY_ALL:
+            ppos += 1
+        elif (op == consts.OPCODE_IN or op == consts.OPCODE_REPEAT_ONE or
+                op == consts.OPCODE_MIN_REPEAT_ONE):
+            ppos += 1 + pattern.pat(ppos + 1)
+        elif op == consts.OPCODE_BRANCH:
+            ppos += 1
+            while pattern.pat(ppos):
+                ppos += pattern.pat(ppos)
+            ppos += 1
+        else:
+            return best
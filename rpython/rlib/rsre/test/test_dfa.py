@@ -0,0 +1,124 @@
+# encoding: utf-8
+import re, random
+from rpython.rlib.rsre import rsre_core, rsre_dfa, rsre_literal
+from rpython.rlib.rsre.rpy import get_code
+
+
+def may_match(pattern, string, anchored, start=0):
+    ctx = rsre_core.StrMatchContext(string, start, len(string))
+    return rsre_dfa.may_match(ctx, pattern, anchored)
+
+
+def test_no_dfa_for_simple_patterns():
+    for regexp in [r"abc", r"a+b*c", r"[a-z]+\d"]:
+        assert rsre_dfa.get_dfa(get_code(regexp)) is None
+
+def test_no_dfa_without_nested_backtracking():
+    # these can't backtrack exponentially, the DFA would only be overhead
+    for regexp in [r"error|warning", r"(\w+)@(\w+)\.com", r"(ab|cd)x*",
+                   r"(ab){2}", r"(a|b){3}c", r".*(foo|bar).*", r"(a+)b"]:
+        assert rsre_dfa.get_dfa(get_code(regexp)) is None
+    for regexp in [r"(a|aa)*c", r"(x+x+)+y", r"((ab|c)d)+", r"(a{2,3})*",
+                   r"(?:(a|bb)c){1,5}"]:
+        assert rsre_dfa.get_dfa(get_code(regexp)) is not None
+
+def test_literal_alternation_gets_literal_prefilter():
+    # a long alternation of words, like the ones used to scan logs, gets
+    # no DFA: the search is sped up by the prefilter of rsre_literal
+    r = random.Random(42)
+    words = set()
+    while len(words) < 200:
+        words.add(''.join([r.choice('abcdefghijklmnopqrstuvwxyz')
+                           for j in range(r.randrange(5, 11))]))
+    words = sorted(words)
+    regexp = '|'.join(words)
+    pattern = get_code(regexp)
+    assert rsre_dfa.get_dfa(pattern) is None
+    prefilter = rsre_literal.get_literal_prefilter(pattern)
+    assert prefilter is not None
+    assert prefilter.prefixes is not None
+    compiled = re.compile(regexp)
+    for string in ['x' * 50 + words[123] + ' y', 'no match here',
+                   words[5][:4] + words[17]]:
+        match = compiled.search(string)
+        res = rsre_core.search(pattern, string)
+        if match is None:
+            assert res is None
+        else:
+            assert (res.match_start, res.match_end) == match.span()
+
+def test_no_dfa_for_unsupported_patterns():
+    for regexp in [r"(a|b)\1", r"(?=a|b)c", r"(a|b)(?!c)", r"(?<=x)(a|b)",
+                   r"(?L)(a|b)", r"(a)?(?(1)b|c)"]:
+        pattern = get_code(regexp)
+        assert rsre_dfa.get_dfa(pattern) is None
+        assert may_match(pattern, "xyz", False)
+
+def test_alternation():
+    pattern = get_code(r"(error|warning|critical|fatal)+:")
+    assert rsre_dfa.get_dfa(pattern) is not None
+    assert may_match(pattern, "a critical: line", False)
+    assert not may_match(pattern, "a critical: line", True)
+    assert not may_match(pattern, "an info: line", False)
+    assert may_match(pattern, "fatal: line", True)
+    assert not may_match(pattern, "fatal: line", False, start=1)
+
+def test_catastrophic_backtracking():
+    pattern = get_code(r"(a|aa)*c")
+    assert not may_match(pattern, "a" * 5000, False)
+    assert not may_match(pattern, "a" * 5000, True)
+    assert may_match(pattern, "a" * 5000 + "c", True)
+
+def test_stops_at_first_possible_match(monkeypatch):
+    # when there is a match, the DFA pass does not scan the whole string
+    seen = []
+    transition = rsre_dfa.transition
+    def counting_transition(ctx, dfa, state, ptr):
+        seen.append(ptr)
+        return transition(ctx, dfa, state, ptr)
+    monkeypatch.setattr(rsre_dfa, 'transition', counting_transition)
+    pattern = get_code(r"(a|aa)*c")
+    string = "xxaac" + "y" * 10000
+    assert may_match(pattern, string, False)
+    assert seen == [0, 1, 2, 3, 4]
+    del seen[:]
+    assert may_match(pattern, string, True, start=2)
+    assert seen == [2, 3, 4]
+
+def test_counted_repeats():
+    pattern = get_code(r"(ab|cd){2,3}x")
+    assert may_match(pattern, "abcdx", True)
+    assert may_match(pattern, "abcdabx", True)
+    assert not may_match(pattern, "abx", True)
+    assert not may_match(pattern, "abcdabcdx", True)
+    assert may_match(pattern, "abcdabcdx", False)
+
+def test_unicode_chars():
+    pattern = get_code(u"(ሴ|bb)+c")
+    ctx = rsre_core.UnicodeMatchContext(u"xxሴሴc", 0, 5)
+    assert rsre_dfa.may_match(ctx, pattern, False)
+    ctx = rsre_core.UnicodeMatchContext(u"xxሴስc", 0, 5)
+    assert not rsre_dfa.may_match(ctx, pattern, False)
+
+def test_too_many_states(monkeypatch):
+    monkeypatch.setattr(rsre_dfa, 'MAX_DFA_STATES', 3)
+    pattern = get_code(r"(a|bb)*a(a|b)(a|b)(a|b)c")
+    assert not may_match(pattern, "ababbbabab", False)
+    dfa = rsre_dfa.get_dfa(pattern).search_dfa
+    assert dfa.too_big
+    assert may_match(pattern, "xyz", False)
+
+def test_consistent_with_re():
+    r = random.Random(42)
+    regexps = [r"(a|b)*c", r"x(ab|ba)+y", r"^(a|bc)+$", r"(foo|bar)\b",
+               r"[ab]+(c|d){1,2}", r"(a|b|)+", r"(?i)(AB|c)d", r"(a.|b)c",
+               r"(?s)(a.|b)c", r"a(b|c)?d*?e", r"(ab|a)(bc|c)"]
+    for regexp in regexps:
+        pattern = get_code(regexp)
+        compiled = re.compile(regexp)
+        for i in range(300):
+            string = ''.join([r.choice('abcdexy\nAB ') for j in range(8)])
+            if compiled.search(string):
+                assert may_match(pattern, string, False), (regexp, string)
+            if compiled.match(string):
+                assert may_match(pattern, string, True), (regexp, string)
@@ -2,7 +2,7 @@
 import re, py
 from rpython.rlib.rsre.test.test_match import get_code, get_code_and_re
 from rpython.rlib.rsre.test import support
-from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_char
+from rpython.rlib.rsre import rsre_core, rsre_utf8, rsre_char, rsre_literal
 
 def setup_module(mod):
     from rpython.rlib.unicodedata import unicodedb
@@ -230,6 +230,53 @@ class BaseTestSearch:
                     #assert match is None # this is only true on cpy2 (but not on pypy2/3 and cpy3)
                     assert res is None
 
+    def test_literal_alternation(self):
+        r_code, r = get_code_and_re(r'error|warning|fatal|failure')
+        prefilter = rsre_literal.get_literal_prefilter(r_code)
+        assert prefilter.prefixes.length == 5
+        P = self.P
+        for s in ['an error here', 'a warning, then a fatal', 'no failur',
+                  'fatal', 'failure', 'fafatal', 'nothing', 'erro']:
+            match = r.search(s)
+            res = self.search(r_code, s)
+            if match is None:
+                assert res is None
+            else:
+                assert res.span() == (P(match.start()), P(match.end()))
+        res = self.search(r_code, 'a fatal error', 3)
+        assert res.span() == (P(8), P(13))
+
+    def test_literal_alternation_in_group(self):
+        r_code, r = get_code_and_re(r'(abc|bcd)+e')
+        P = self.P
+        for s in ['xabcbcde', 'abcd', 'xxbcde', 'ababcabcf']:
+            match = r.search(s)
+            res = self.search(r_code, s)
+            if match is None:
+                assert res is None
+            else:
+                assert res.span() == (P(match.start()), P(match.end()))
+                assert res.span(1) == (P(match.start(1)), P(match.end(1)))
+
+    def test_required_literal(self):
+        r_code, r = get_code_and_re(r'\d+ ERROR: (\w+)')
+        prefilter = rsre_literal.get_literal_prefilter(r_code)
+        assert prefilter.required == map(ord, ' ERROR: ')
+        P = self.P
+        for s in ['12 ERROR: foo', '12 ERROR:', 'x 12 ERROR: ', '12 ERR',
+                  '1 ERROR; 2 ERROR: bar']:
+            match = r.search(s)
+            res = self.search(r_code, s)
+            if match is None:
+                assert res is None
+            else:
+                assert res.span() == (P(match.start()), P(match.end()))
+
+    def test_no_literal_prefilter(self):
+        for regexp in [r'a|bc', r'foo', r'(?i)abc|def', r'[ab]+c', r'x|']:
+            r_code = get_code(regexp)
+            assert rsre_literal.get_literal_prefilter(r_code) is None
+
 
 class TestSearchCustom(BaseTestSearch):
     search = staticmethod(support.search)
@@ -100,6 +100,11 @@ class TestJitRSre(support.LLJitMixin):
         assert res == 15
         self.check_resops(guard_value=0)
 
+    def test_prefix_set_search(self):
+        res = self.meta_interp_search(r"(warn|fatal|error)\w*:",
+                                      "a warn fatality errors: x", 20)
+        assert res == 16
+
     def test_regular_search(self):
         res = self.meta_interp_search(r"<\w+>", "eiofweoxdiwhdoh<foobar>ua")
         assert res == 15
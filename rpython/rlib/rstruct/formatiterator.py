@@ -81,6 +81,32 @@ class FormatIterator(object):
                 self.operate(fmtdesc, repetitions)
         self.finished()
 
+    def run(self, compiled):
+        """Like interpret(), but follows a CompiledFormat instead of parsing
+        the format string again."""
+        if compiled.standard:
+            table = unroll_standard_fmtdescs
+        else:
+            table = unroll_native_fmtdescs
+        self.bigendian = compiled.bigendian
+        chars = compiled.chars
+        counts = compiled.counts
+        for i in range(len(chars)):
+            c = chars[i]
+            repetitions = counts[i]
+            for fmtdesc in table:
+                if c == fmtdesc.fmtchar:
+                    if self._operate_is_specialized_:
+                        if fmtdesc.alignment > 1:
+                            self.align(fmtdesc.mask)
+                        self.operate(fmtdesc, repetitions)
+                    break
+            if not self._operate_is_specialized_:
+                if fmtdesc.alignment > 1:
+                    self.align(fmtdesc.mask)
+                self.operate(fmtdesc, repetitions)
+        self.finished()
+
     def finished(self):
         pass
 
@@ -103,6 +129,43 @@ class CalcSizeFormatIterator(FormatIterator):
             raise StructError("total struct size too long")
 
 
+class CompileFormatIterator(CalcSizeFormatIterator):
+    """Records the format units, to build a CompiledFormat."""
+
+    def __init__(self):
+        self.chars = []
+        self.counts = []
+
+    def operate(self, fmtdesc, repetitions):
+        CalcSizeFormatIterator.operate(self, fmtdesc, repetitions)
+        self.chars.append(fmtdesc.fmtchar)
+        self.counts.append(repetitions)
+
+
+class CompiledFormat(object):
+    """A format string after parsing: the list of its format units, with
+    their repetition counts, and its total size.  Use compile_format() to
+    build one; the FormatIterators can then run() it."""
+    _immutable_fields_ = ['chars[*]', 'counts[*]', 'standard', 'bigendian',
+                          'size']
+
+    def __init__(self, chars, counts, standard, bigendian, size):
+        self.chars = chars
+        self.counts = counts
+        self.standard = standard
+        self.bigendian = bigendian
+        self.size = size
+
+def compile_format(fmt):
+    """Parse the format string 'fmt' into a CompiledFormat.  Raises
+    StructError if it is invalid."""
+    fmtiter = CompileFormatIterator()
+    fmtiter.interpret(fmt)
+    standard = len(fmt) > 0 and fmt[0] in '=<>!'
+    return CompiledFormat(fmtiter.chars[:], fmtiter.counts[:], standard,
+                          fmtiter.bigendian, fmtiter.totalsize)
+
+
 class FmtDesc(object):
     def __init__(self, fmtchar, attrs):
         self.fmtchar = fmtchar
@@ -159,6 +159,13 @@ def _EndRecData(fpin):
             return EndRecStruct(endrec, comment, filesize - END_BLOCK + start)
     return      # Error, return None
 
+def _read_field(directory, start, length):
+    end = start + length
+    if end > len(directory):
+        raise BadZipfile("Truncated central directory")
+    assert start >= 0 and end >= start
+    return directory[start:end]
+
 class RZipInfo(object):
     def __init__(self, filename, date_time=(1980,1,1,0,0,0)):
         self.orig_filename = filename
@@ -221,24 +228,34 @@ class RZipFile(object):
         x = endrec.filesize - size_cd
         concat = x - offset_cd
         self.start_dir = offset_cd + concat
+        # read the whole central directory at once, and parse it from
+        # memory: this is much faster for archives with many members
         fp.seek(self.start_dir, 0)
+        directory = fp.read(size_cd)
+        if len(directory) != size_cd:
+            raise BadZipfile("Truncated central directory")
         total = 0
         while total < size_cd:
-            centdir = fp.read(46)
+            centdir = _read_field(directory, total, 46)
             total = total + 46
             if centdir[0:4] != stringCentralDir:
                 raise BadZipfile("Bad magic number for central directory")
             centdir = runpack(structCentralDir, centdir)
-            filename = fp.read(centdir[_CD_FILENAME_LENGTH])
+            filename = _read_field(directory, total,
+                                   centdir[_CD_FILENAME_LENGTH])
+            total = total + centdir[_CD_FILENAME_LENGTH]
             # Create ZipInfo instance to store file information
             x = RZipInfo(filename)
-            x.extra = fp.read(centdir[_CD_EXTRA_FIELD_LENGTH])
-            x.comment = fp.read(centdir[_CD_COMMENT_LENGTH])
-            total = (total + centdir[_CD_FILENAME_LENGTH]
-                     + centdir[_CD_EXTRA_FIELD_LENGTH]
-                     + centdir[_CD_COMMENT_LENGTH])
+            x.extra = _read_field(directory, total,
+                                  centdir[_CD_EXTRA_FIELD_LENGTH])
+            total = total + centdir[_CD_EXTRA_FIELD_LENGTH]
+            x.comment = _read_field(directory, total,
+                                    centdir[_CD_COMMENT_LENGTH])
+            total = total + centdir[_CD_COMMENT_LENGTH]
             x.header_offset = centdir[_CD_LOCAL_HEADER_OFFSET] + concat
-            # file_offset must be computed below...
+            # file_offset is computed when the file is first read, see
+            # _get_file_offset()
+            x.file_offset = -1
             (x.create_version, x.create_system, x.extract_version, x.reserved,
                 x.flag_bits, x.compress_type, t, d,
                 crc, x.compress_size, x.file_size) = centdir[1:12]
@@ -251,8 +268,18 @@ class RZipFile(object):
                                      t>>11, (t>>5)&0x3F, (t&0x1F) * 2 )
             self.filelist.append(x)
             self.NameToInfo[x.filename] = x
-        for data in self.filelist:
-            fp.seek(data.header_offset, 0)
+        # the other local file headers are only checked when their file is
+        # read, but checking the first one catches most of the files that
+        # are not really zip archives, for the price of a single read
+        if self.filelist:
+            self._get_file_offset(fp, self.filelist[0])
+
+    def _get_file_offset(self, fp, zinfo):
+        """Return the offset of the data of 'zinfo' in the archive.  It
+        is read from the local file header the first time, instead of
+        reading all the headers when the archive is opened."""
+        if zinfo.file_offset < 0:
+            fp.seek(zinfo.header_offset, 0)
             fheader = fp.read(30)
             if fheader[0:4] != stringFileHeader:
                 raise BadZipfile("Bad magic number for file header")
@@ -261,14 +288,21 @@ class RZipFile(object):
             # the central directory and for the local file header
             # refer to different fields, and they can have different
             # lengths
-            data.file_offset = (data.header_offset + 30
-                                + fheader[_FH_FILENAME_LENGTH]
-                                + fheader[_FH_EXTRA_FIELD_LENGTH])
             fname = fp.read(fheader[_FH_FILENAME_LENGTH])
-            if fname != data.orig_filename:
+            if fname != zinfo.orig_filename:
                 raise BadZipfile('File name in directory "%s" and '
-                    'header "%s" differ.' % (data.orig_filename, fname))
-        fp.seek(self.start_dir, 0)
+                    'header "%s" differ.' % (zinfo.orig_filename, fname))
+            zinfo.file_offset = (zinfo.header_offset + 30
+                                 + fheader[_FH_FILENAME_LENGTH]
+                                 + fheader[_FH_EXTRA_FIELD_LENGTH])
+        return zinfo.file_offset
+
+    def get_file_offset(self, zinfo):
+        fp = self.get_fp()
+        try:
+            return self._get_file_offset(fp, zinfo)
+        finally:
+            fp.close()
 
     def getinfo(self, filename):
         """Return the instance of ZipInfo given 'filename'."""
@@ -278,10 +312,8 @@ class RZipFile(object):
         zinfo = self.getinfo(filename)
         fp = self.get_fp()
         try:
-            filepos = fp.tell()
-            fp.seek(zinfo.file_offset, 0)
+            fp.seek(self._get_file_offset(fp, zinfo), 0)
             bytes = fp.read(intmask(zinfo.compress_size))
-            fp.seek(filepos, 0)
             if zinfo.compress_type == ZIP_STORED:
                 pass
             elif zinfo.compress_type == ZIP_DEFLATED and rzlib is not None:
@@ -299,7 +331,11 @@ class RZipFile(object):
             else:
                 raise BadZipfile("Unsupported compression method %d for "
                                  "file %s" % (zinfo.compress_type, filename))
-            crc = crc32(bytes)
+            assert bytes is not None
+            if rzlib is not None:
+                crc = r_uint(rzlib.crc32(bytes)) & r_uint(0xffffffff)
+            else:
+                crc = crc32(bytes)
             if crc != zinfo.CRC:
                 raise BadZipfile("Bad CRC-32 for file %s" % filename)
             return bytes
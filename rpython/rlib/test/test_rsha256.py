@@ -0,0 +1,53 @@
+# Testing the SHA-224 and SHA-256 implementation, with the examples
+# from FIPS PUB 180-4 and by comparison with the hashlib module
+
+from rpython.rlib import rsha256
+
+class TestSHA256:
+    def check(self, data, digest, cls=rsha256.RSHA256):
+        computed = cls(data).hexdigest()
+        assert computed == digest
+        d = cls()
+        d.update(data)
+        computed = d.digest()
+        assert computed == digest.decode('hex')
+
+    def test_case_1(self):
+        self.check("abc",
+            "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad")
+        self.check("abc",
+            "23097d223405d8228642a477bda255b32aadbce4bda0b3f7e36c9da7",
+            rsha256.RSHA224)
+
+    def test_case_2(self):
+        self.check("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+            "248d6a61d20638b8e5c026930c3e6039a33ce45964ff2167f6ecedd419db06c1")
+        self.check("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+            "75388b16512776cc5dba5da1fd890150b0c6455cb4f58b1952522525",
+            rsha256.RSHA224)
+
+    def test_copy(self):
+        import hashlib
+        for repeat in [1, 10, 100]:
+            for cls, name in [(rsha256.RSHA256, 'sha256'),
+                              (rsha256.RSHA224, 'sha224')]:
+                d1 = cls("abc" * repeat)
+                d2 = d1.copy()
+                assert isinstance(d2, cls)
+                d1.update("def" * repeat)
+                d2.update("gh" * repeat)
+                assert d1.digest() == hashlib.new(
+                    name, "abc"*repeat+"def"*repeat).digest()
+                assert d2.digest() == hashlib.new(
+                    name, "abc"*repeat+"gh"*repeat).digest()
+
+    def test_random(self):
+        import random, hashlib
+        for i in range(20):
+            input = ''.join([chr(random.randrange(256))
+                             for i in range(random.randrange(1000))])
+            m1 = rsha256.RSHA256()
+            m1.update(input)
+            m2 = hashlib.sha256()
+            m2.update(input)
+            assert m2.hexdigest() == m1.hexdigest()
@@ -0,0 +1,59 @@
+# Testing the SHA-384 and SHA-512 implementation, with the examples
+# from FIPS PUB 180-4 and by comparison with the hashlib module
+
+from rpython.rlib import rsha512
+
+class TestSHA512:
+    def check(self, data, digest, cls=rsha512.RSHA512):
+        computed = cls(data).hexdigest()
+        assert computed == digest
+        d = cls()
+        d.update(data)
+        computed = d.digest()
+        assert computed == digest.decode('hex')
+
+    def test_case_1(self):
+        self.check("abc",
+            "ddaf35a193617abacc417349ae20413112e6fa4e89a97ea2"
+            "0a9eeee64b55d39a2192992a274fc1a836ba3c23a3feebbd"
+            "454d4423643ce80e2a9ac94fa54ca49f")
+        self.check("abc",
+            "cb00753f45a35e8bb5a03d699ac65007272c32ab0eded163"
+            "1a8b605a43ff5bed8086072ba1e7cc2358baeca134c825a7",
+            rsha512.RSHA384)
+
+    def test_case_2(self):
+        self.check("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+            "204a8fc6dda82f0a0ced7beb8e08a41657c16ef468b228a8"
+            "279be331a703c33596fd15c13b1b07f9aa1d3bea57789ca0"
+            "31ad85c7a71dd70354ec631238ca3445")
+        self.check("abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+            "3391fdddfc8dc7393707a65b1b4709397cf8b1d162af05ab"
+            "fe8f450de5f36bc6b0455a8520bc4e6f5fe95b1fe3c8452b",
+            rsha512.RSHA384)
+
+    def test_copy(self):
+        import hashlib
+        for repeat in [1, 10, 100]:
+            for cls, name in [(rsha512.RSHA512, 'sha512'),
+                              (rsha512.RSHA384, 'sha384')]:
+                d1 = cls("abc" * repeat)
+                d2 = d1.copy()
+                assert isinstance(d2, cls)
+                d1.update("def" * repeat)
+                d2.update("gh" * repeat)
+                assert d1.digest() == hashlib.new(
+                    name, "abc"*repeat+"def"*repeat).digest()
+                assert d2.digest() == hashlib.new(
+                    name, "abc"*repeat+"gh"*repeat).digest()
+
+    def test_random(self):
+        import random, hashlib
+        for i in range(20):
+            input = ''.join([chr(random.randrange(256))
+                             for i in range(random.randrange(1000))])
+            m1 = rsha512.RSHA512()
+            m1.update(input)
+            m2 = hashlib.sha512()
+            m2.update(input)
+            assert m2.hexdigest() == m1.hexdigest()
@@ -43,6 +43,26 @@ class BaseTestRZipFile(BaseRtypingTest):
         assert one()
         assert self.interpret(one, [])
 
+    def test_bad_file_header(self):
+        from rpython.rlib.rzipfile import BadZipfile
+        data = open(self.zipname, 'rb').read()
+        zipfile = ZipFile(self.zipname)
+        offsets = [info.header_offset for info in zipfile.infolist()]
+        zipfile.close()
+        def corrupt(name, offset):
+            badname = os.path.join(os.path.dirname(self.zipname), name)
+            f = open(badname, 'wb')
+            f.write(data[:offset] + 'XXXX' + data[offset + 4:])
+            f.close()
+            return badname
+        # the first file header is checked when the archive is opened
+        py.test.raises(BadZipfile, RZipFile,
+                       corrupt('bad_first_header.zip', offsets[0]), 'r')
+        # the other ones only when their file is read
+        rzip = RZipFile(corrupt('bad_last_header.zip', offsets[-1]), 'r')
+        assert rzip.read('one') == 'stuff\n'
+        py.test.raises(BadZipfile, rzip.read, 'three')
+
 class TestRZipFile(BaseTestRZipFile):
     compression = ZIP_STORED
 
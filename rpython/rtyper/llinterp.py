@@ -837,6 +837,12 @@ class LLFrame(object):
     def op_gc__collect_step(self):
         return self.heap.collect_step()
 
+    def op_gc__compact(self):
+        return self.heap.compact()
+
+    def op_gc__freeze(self):
+        return self.heap.freeze()
+
     def op_gc__enable(self):
         self.heap.enable()
 
@@ -479,6 +479,8 @@ LL_OPERATIONS = {
 
     'gc__collect':          LLOp(canmallocgc=True),
     'gc__collect_step':     LLOp(canmallocgc=True),
+    'gc__compact':          LLOp(canmallocgc=True),
+    'gc__freeze':           LLOp(canmallocgc=True),
     'gc__enable':           LLOp(),
     'gc__disable':          LLOp(),
     'gc__isenabled':        LLOp(),
@@ -135,6 +135,12 @@ class RefcountingGcPolicy(BasicGcPolicy):
     def OP_GC__COLLECT(self, funcgen, op):
         return ''
 
+    def OP_GC__COMPACT(self, funcgen, op):
+        return '%s = 0;' % (funcgen.expr(op.result),)
+
+    def OP_GC__FREEZE(self, funcgen, op):
+        return '%s = 0;' % (funcgen.expr(op.result),)
+
     def OP_GC__DISABLE_FINALIZERS(self, funcgen, op):
         return ''
 
@@ -252,6 +258,13 @@ class BoehmGcPolicy(BasicGcPolicy):
     def OP_GC__COLLECT(self, funcgen, op):
         return 'GC_gcollect();'
 
+    def OP_GC__COMPACT(self, funcgen, op):
+        return 'GC_gcollect_and_unmap(); %s = 0;' % (
+            funcgen.expr(op.result),)
+
+    def OP_GC__FREEZE(self, funcgen, op):
+        return 'GC_gcollect(); %s = 0;' % (funcgen.expr(op.result),)
+
     def OP_GC_SET_MAX_HEAP_SIZE(self, funcgen, op):
         nbytes = funcgen.expr(op.args[0])
         return 'GC_set_max_heap_size(%s);' % (nbytes,)
@@ -25,6 +25,8 @@ class UsingFrameworkTest(object):
     taggedpointers = False
     GC_CAN_MOVE = False
     GC_CAN_SHRINK_ARRAY = False
+    GC_CAN_COMPACT = False
+    GC_CAN_FREEZE = False
 
     _isolated_func = None
     c_allfuncs = None
@@ -1191,6 +1193,106 @@ class UsingFrameworkTest(object):
         f.close()
         assert data1 == data2
 
+    filename_compact_dump = str(udir.join('test_dump_rpy_heap.compact'))
+    filename_word_dump = str(udir.join('test_dump_rpy_heap.words'))
+    def define_dump_rpy_heap_compact(self):
+        U = lltype.GcForwardReference()
+        U.become(lltype.GcStruct('U', ('next', lltype.Ptr(U)),
+                                 ('x', lltype.Signed)))
+        S = lltype.GcStruct('S', ('u', lltype.Ptr(U)))
+        A = lltype.GcArray(lltype.Ptr(S))
+        filename1 = self.filename_compact_dump
+        filename2 = self.filename_word_dump
+
+        def fn():
+            s = lltype.malloc(S)
+            s.u = lltype.malloc(U)
+            s.u.next = lltype.malloc(U)
+            s.u.next.next = lltype.malloc(U)
+            a = lltype.malloc(A, 100)
+            for i in range(100):
+                a[i] = lltype.malloc(S)
+                a[i].u = s.u
+            fd1 = os.open(filename1, os.O_WRONLY | os.O_CREAT, 0666)
+            fd2 = os.open(filename2, os.O_WRONLY | os.O_CREAT, 0666)
+            # dump the same heap in both formats
+            gc.collect(); gc.collect(); gc.collect()
+            rgc.dump_rpy_heap(fd1, True)
+            rgc.dump_rpy_heap(fd2)
+            keepalive_until_here(s)
+            keepalive_until_here(a)
+            os.close(fd1)
+            os.close(fd2)
+            return 0
+
+        return fn
+
+    def test_dump_rpy_heap_compact(self):
+        import array
+        self.run("dump_rpy_heap_compact")
+        f = open(self.filename_compact_dump, 'rb')
+        compact = f.read()
+        f.close()
+        f = open(self.filename_word_dump, 'rb')
+        words = f.read()
+        f.close()
+        assert compact.startswith('RPYHEAP1')
+        assert len(compact) < len(words) // 3
+        #
+        def read_words():
+            a = array.array('l')
+            a.fromstring(words)
+            result = []
+            i = 0
+            while i < len(a):
+                j = i + 3
+                while a[j] != -1:
+                    j += 1
+                result.append((a[i], a[i+1], a[i+2], list(a[i+3:j])))
+                i = j + 1
+            return result
+        def read_compact():
+            wordsize = ord(compact[8])
+            data = [ord(c) for c in compact[9:]]
+            data.reverse()
+            def read_uint():
+                result = shift = 0
+                while True:
+                    byte = data.pop()
+                    result |= (byte & 0x7f) << shift
+                    if byte < 0x80:
+                        return result
+                    shift += 7
+            def unzigzag(value):
+                return (value >> 1) ^ -(value & 1)
+            result = []
+            prev_addr = 0
+            markers = 0
+            while True:
+                typeindex = read_uint()
+                if typeindex == 0:
+                    markers += 1
+                    if markers == 2:
+                        break         # the end of the dump
+                    result.append((0, 0, 0, []))   # the end of the roots
+                    continue
+                addr = prev_addr + unzigzag(read_uint())
+                size = read_uint()
+                refs = []
+                while True:
+                    ref = read_uint()
+                    if ref == 0:
+                        break
+                    refs.append((addr + unzigzag(ref - 1)) * wordsize)
+                result.append((addr * wordsize, typeindex - 1, size, refs))
+                prev_addr = addr
+            assert not data
+            return result
+        #
+        records = read_compact()
+        assert records == read_words()
+        assert len(records) > 100
+
     filename_dump_typeids_z = str(udir.join('test_typeids_z'))
     def define_write_typeids_z(self):
         U = lltype.GcForwardReference()
@@ -1260,6 +1362,75 @@ class UsingFrameworkTest(object):
     def test_gcflag_extra(self):
         self.run("gcflag_extra")
 
+    def define_compact(self):
+        S = lltype.GcStruct('S', ('x', lltype.Signed))
+        A = lltype.GcArray(lltype.Ptr(S))
+        def fn():
+            a = lltype.malloc(A, 20000)
+            for i in range(20000):
+                a[i] = lltype.malloc(S)
+                a[i].x = i
+            rgc.collect()
+            # keep one object out of 5000, so that there are long runs
+            # of free pages
+            for i in range(20000):
+                if i % 5000 != 0:
+                    a[i] = lltype.nullptr(S)
+            result = rgc.compact()
+            assert result >= 0
+            # the pages just released are not released again
+            assert rgc.compact() == 0
+            for i in range(0, 20000, 5000):
+                assert a[i].x == i
+            for i in range(20000):
+                if not a[i]:
+                    a[i] = lltype.malloc(S)
+                    a[i].x = i
+            for i in range(20000):
+                assert a[i].x == i
+            return result
+        return fn
+
+    def test_compact(self):
+        res = self.run("compact")
+        if self.GC_CAN_COMPACT:
+            # most of the pages of the 20000 objects were freed
+            assert res > 10000 * rffi.sizeof(lltype.Signed)
+        else:
+            assert res == 0
+
+    def define_freeze(self):
+        S = lltype.GcForwardReference()
+        S.become(lltype.GcStruct('S', ('x', lltype.Signed),
+                                 ('next', lltype.Ptr(S))))
+        A = lltype.GcArray(lltype.Ptr(S))
+        def fn():
+            a = lltype.malloc(A, 1000)
+            for i in range(1000):
+                a[i] = lltype.malloc(S)
+                a[i].x = i
+            frozen = rgc.freeze()
+            # modify some frozen objects after freezing
+            for i in range(0, 1000, 10):
+                a[i].next = lltype.malloc(S)
+                a[i].next.x = -i
+            for j in range(3):
+                rgc.collect()
+            for i in range(1000):
+                assert a[i].x == i
+                if i % 10 == 0:
+                    assert a[i].next.x == -i
+            return frozen
+        return fn
+
+    def test_freeze(self):
+        res = self.run("freeze")
+        if self.GC_CAN_FREEZE:
+            # at least the 1000 objects 'S' were frozen
+            assert res > 1000 * 2 * rffi.sizeof(lltype.Signed)
+        else:
+            assert res == 0
+
     def define_check_zero_works(self):
         S = lltype.GcStruct("s", ('x', lltype.Signed))
         S2 = lltype.GcStruct("s2", ('parent',
@@ -1668,6 +1839,8 @@ class TestMiniMarkGC(TestSemiSpaceGC):
 
 class TestIncrementalMiniMarkGC(TestMiniMarkGC):
     gcpolicy = "incminimark"
+    GC_CAN_COMPACT = True
+    GC_CAN_FREEZE = True
 
     def define_total_memory_pressure(cls):
         class A(object):